@@ -0,0 +1,37 @@
+"""
+Scaling of batch.solve_many from 1 to N worker processes
+
+Usage:
+    python -m benchmark.bench_batch --engine man --copies 20 --workers 4
+"""
+import argparse
+import os
+import time
+
+from killer_sudoku import batch
+from benchmark.puzzles import PUZZLES
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--engine", default="man", choices=list(batch.ENGINES))
+    parser.add_argument("--copies", type=int, default=20, help="copies of each benchmark puzzle in the batch")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="largest pool size to try")
+    parser.add_argument("--chunksize", type=int, default=4)
+    args = parser.parse_args()
+
+    puzzles = list(PUZZLES.values()) * args.copies
+    print(f"{len(puzzles)} puzzles, engine {args.engine}, {os.cpu_count()} cpus")
+    print(f"{'workers':>8}{'solved':>8}{'failed':>8}{'puzzles/s':>11}{'speedup':>9}")
+    base = None
+    for workers in range(1, args.workers + 1):
+        start = time.perf_counter()
+        results = list(batch.solve_many(puzzles, engine=args.engine, workers=workers, chunksize=args.chunksize))
+        rate = len(puzzles) / (time.perf_counter() - start)
+        base = base or rate
+        solved = sum(result["solved"] for result in results)
+        print(f"{workers:>8}{solved:>8}{len(results) - solved:>8}{rate:>11.1f}{rate / base:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
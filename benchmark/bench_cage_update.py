@@ -0,0 +1,61 @@
+"""
+Times Cage.update's matching-based pruning against the permutation scan it
+replaced, on cages of 5 to 9 cells with partly eliminated candidates
+
+Usage:
+    python -m benchmark.bench_cage_update --repeat 5
+"""
+import argparse
+import random
+
+from killer_sudoku import man_solver
+from benchmark.common import summarize, time_call
+from benchmark.legacy import permutation_support
+
+
+def random_cage(size, rng):
+    """
+    Returns:
+        (digits, masks): one combination of `size` digits and cell masks that each
+            lost a couple of candidates, but still allow the combination
+    """
+    combinations = [mask for (_, count), masks in man_solver.COMBINATION_TABLE.items() if count == size for mask in masks]
+    digits = man_solver.MASK_DIGITS[rng.choice(combinations)]
+    masks = []
+    for number in rng.sample(digits, size):
+        mask = man_solver.ALL_DIGITS
+        for removed in rng.sample(range(1, 10), 2):
+            if removed != number:
+                mask &= ~(1 << removed)
+        masks.append(mask)
+    return digits, masks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--cages", type=int, default=5, help="random cages per size")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'cells':<8}{'permutations ms':>18}{'matching ms':>14}{'speedup':>10}  same pruning")
+    for size in range(5, 10):
+        cages = [random_cage(size, rng) for _ in range(args.cages)]
+        same = all(permutation_support(d, m) == man_solver.matching_support(d, m) for d, m in cages)
+
+        def permutations():
+            for digits, masks in cages:
+                permutation_support(digits, masks)
+
+        def matching():
+            for digits, masks in cages:
+                man_solver.matching_support(digits, masks)
+
+        repeat = 1 if size >= 8 else args.repeat  # 8! and 9! orderings per cage
+        permutation_ms = summarize(time_call(permutations, repeat))["median_ms"]
+        matching_ms = summarize(time_call(matching, args.repeat))["median_ms"]
+        print(f"{size:<8}{permutation_ms:>18.2f}{matching_ms:>14.2f}{permutation_ms / matching_ms:>9.1f}x  {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Times Cage construction against the per-cage combination search it replaced
+
+Usage:
+    python -m benchmark.bench_cages --repeat 5
+"""
+import argparse
+
+from killer_sudoku import man_solver
+from benchmark.common import summarize, time_call
+from benchmark.legacy import legacy_cage
+from benchmark.puzzles import PUZZLES
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    def cold_table():
+        man_solver.build_combination_table()
+        man_solver.cage_combinations.cache_clear()
+
+    print(f"table build: {summarize(time_call(cold_table, args.repeat))['median_ms']:.2f} ms")
+    print(f"{'puzzle':<8}{'legacy ms':>12}{'table ms':>12}{'speedup':>10}")
+    for name, cage_constraints in PUZZLES.items():
+        cell = [[man_solver.Cell(row, col) for col in range(9)] for row in range(9)]
+        cages = [(sum, {cell[row][col] for row, col in cells}) for sum, cells in cage_constraints]
+
+        def legacy():
+            for sum, cells in cages:
+                legacy_cage(sum, cells)
+
+        def table():
+            for sum, cells in cages:
+                man_solver.Cage.virtual_cage(sum, cells)
+
+        table()  # warm the allowed-digit cache
+        legacy_ms = summarize(time_call(legacy, args.repeat))["median_ms"]
+        table_ms = summarize(time_call(table, args.repeat))["median_ms"]
+        print(f"{name:<8}{legacy_ms:>12.2f}{table_ms:>12.2f}{legacy_ms / table_ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Compares man_solver's set-based and bitmask-based candidate storage
+
+Technique sweeps are timed on the state where logic stalls on 26079, so
+every sweep is repeatable and changes nothing. Full solves run without step
+recording, whose per-step board copies are measured by bench_trace.
+
+Usage:
+    python -m benchmark.bench_candidates --repeat 5
+"""
+import argparse
+
+from killer_sudoku import man_solver
+from benchmark.common import summarize, time_call
+from benchmark.puzzles import PUZZLE_26079, PUZZLES
+
+
+def solve(cage_constraints, bitmask):
+    solver = man_solver.KillerSudokuSolver(cage_constraints, bitmask=bitmask, trace=False)
+    solver.solve(search=False)
+    return solver
+
+
+def technique_sweeps(solver):
+    """
+    Returns:
+        sweeps (dict): name -> zero-argument callable running one sweep of a technique
+    """
+    units = solver.rows + solver.cols + solver.boxes
+
+    def subsets():
+        for unit, cells in enumerate(units):
+            solver.find_subsets(cells, unit)
+
+    def reduce_units():
+        for reduce, unit_cells in (
+            (solver.reduce_in_row, solver.rows),
+            (solver.reduce_in_column, solver.cols),
+            (solver.reduce_in_box, solver.boxes),
+        ):
+            for cells in unit_cells:
+                for number in man_solver.MASK_DIGITS[solver.open_digits(cells)]:
+                    reduce(cells, number)
+
+    def cage_update():
+        for cage in solver.cages:
+            cage.update()
+
+    def rule45():
+        # rule45 skips unchanged boards; forget the last state so every call
+        # re-derives all regions (the derived cages already exist, so nothing changes)
+        solver.rule45_state = None
+        solver.rule45()
+
+    def board():
+        solver.board()
+
+    return {
+        "find_subsets": subsets,
+        "reduce_in_*": reduce_units,
+        "Cage.update": cage_update,
+        "rule45": rule45,
+        "board": board,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print("Technique sweeps on the stalled 26079 state")
+    print(f"{'technique':<18}{'set ms':>10}{'mask ms':>10}{'speedup':>10}")
+    set_sweeps = technique_sweeps(solve(PUZZLE_26079, bitmask=False))
+    mask_sweeps = technique_sweeps(solve(PUZZLE_26079, bitmask=True))
+    for name in set_sweeps:
+        set_ms = summarize(time_call(set_sweeps[name], args.repeat))["median_ms"]
+        mask_ms = summarize(time_call(mask_sweeps[name], args.repeat))["median_ms"]
+        print(f"{name:<18}{set_ms:>10.2f}{mask_ms:>10.2f}{set_ms / mask_ms:>9.2f}x")
+
+    print("\nFull solve")
+    print(f"{'puzzle':<18}{'set ms':>10}{'mask ms':>10}{'speedup':>10}  same result")
+    for name, cage_constraints in PUZZLES.items():
+        set_board = solve(cage_constraints, bitmask=False).board()
+        mask_board = solve(cage_constraints, bitmask=True).board()
+
+        set_ms = summarize(time_call(lambda: solve(cage_constraints, False), args.repeat))["median_ms"]
+        mask_ms = summarize(time_call(lambda: solve(cage_constraints, True), args.repeat))["median_ms"]
+        print(f"{name:<18}{set_ms:>10.1f}{mask_ms:>10.1f}{set_ms / mask_ms:>9.2f}x  {set_board == mask_board}")
+
+
+if __name__ == "__main__":
+    main()
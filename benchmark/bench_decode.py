@@ -0,0 +1,48 @@
+"""
+Decoding a large board_base64 archive: KillerSudoku one board at a time vs decode_boards,
+then checking the solved grids of the whole archive with verify_solutions
+
+Usage:
+    python -m benchmark.bench_decode --count 100000
+"""
+import argparse
+import time
+
+from killer_sudoku import corpus, killer_sudoku, man_solver
+from benchmark.puzzles import PUZZLES
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=100000, help="boards in the archive")
+    args = parser.parse_args()
+
+    samples, solutions = [], []
+    for cages in PUZZLES.values():
+        solver = man_solver.KillerSudokuSolver(cages, bitmask=True, trace=False)
+        solver.solve()
+        samples.append(corpus.encode_board_base64({"cages": cages}))
+        solutions.append(corpus.encode_board_base64({"cages": cages, "givens": solver.solution()}))
+    encodings = [samples[index % len(samples)] for index in range(args.count)]
+    print(f"{len(encodings)} boards")
+
+    start = time.perf_counter()
+    for encoding in encodings:
+        killer_sudoku.KillerSudoku(encoding)
+    loop = time.perf_counter() - start
+    print(f"{'KillerSudoku':<14}{loop:>8.2f} s{len(encodings) / loop:>12.0f} boards/s")
+
+    start = time.perf_counter()
+    boards = killer_sudoku.decode_boards(encodings)
+    bulk = time.perf_counter() - start
+    print(f"{'decode_boards':<14}{bulk:>8.2f} s{len(encodings) / bulk:>12.0f} boards/s{loop / bulk:>8.1f}x")
+
+    start = time.perf_counter()
+    expected = killer_sudoku.decode_solutions(solutions[index % len(solutions)] for index in range(args.count))
+    checks = killer_sudoku.verify_solutions(expected, boards, expected)
+    verify = time.perf_counter() - start
+    print(f"{'verify':<14}{verify:>8.2f} s{len(encodings) / verify:>12.0f} boards/s  {checks['valid'].sum()} valid")
+
+
+if __name__ == "__main__":
+    main()
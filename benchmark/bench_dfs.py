@@ -0,0 +1,47 @@
+"""
+Throughput of the classic sudoku DFS engines on the hard-puzzle corpus
+
+Usage:
+    python -m benchmark.bench_dfs --repeat 3 --engines bitboard,legacy
+"""
+import argparse
+import time
+
+from killer_sudoku import dfs_solver
+from benchmark.puzzles import HARD_SUDOKU, sudoku_grid
+
+ENGINES = {
+    "legacy": dfs_solver.Sukoku,
+    "bitboard": dfs_solver.BitboardSudoku,
+}
+
+
+def run(engine, puzzles):
+    """
+    Returns:
+        (seconds (float): wall time to solve every puzzle once,
+        solved (int): number of puzzles solved
+        )
+    """
+    solved = 0
+    start = time.perf_counter()
+    for puzzle in puzzles:
+        if ENGINES[engine](sudoku_grid(puzzle)).solve() is not None:
+            solved += 1
+    return time.perf_counter() - start, solved
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--engines", default="bitboard", help="comma separated: " + ",".join(ENGINES) + " (legacy takes minutes)")
+    args = parser.parse_args()
+
+    print(f"{'engine':<10}{'solved':>8}{'puzzles/s':>11}")
+    for engine in args.engines.split(","):
+        best = min(run(engine, HARD_SUDOKU) for _ in range(args.repeat))
+        print(f"{engine:<10}{best[1]:>5}/{len(HARD_SUDOKU):<2}{len(HARD_SUDOKU) / best[0]:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+Compares man_solver's full re-sweep propagation with the dirty-unit work queue
+
+Usage:
+    python -m benchmark.bench_propagation --repeat 5
+"""
+import argparse
+
+from killer_sudoku import man_solver
+from benchmark.common import summarize, time_call
+from benchmark.puzzles import PUZZLES
+
+
+def solve(cage_constraints, propagation):
+    solver = man_solver.KillerSudokuSolver(cage_constraints, propagation=propagation)
+    solver.solve(search=False)
+    return solver
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'puzzle':<8}{'mode':<7}{'solved':>8}{'unit scans':>12}{'rule45':>8}{'cages':>7}{'ms':>9}")
+    for name, cage_constraints in PUZZLES.items():
+        for propagation in ("sweep", "queue"):
+            solver = solve(cage_constraints, propagation)
+            ms = summarize(time_call(lambda: solve(cage_constraints, propagation), args.repeat))["median_ms"]
+            print(
+                f"{name:<8}{propagation:<7}{str(solver.is_solved()):>8}{solver.unit_scans():>12}"
+                f"{solver.scan_counts['rule45']:>8}{solver.cages.stats()['registered']:>7}{ms:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
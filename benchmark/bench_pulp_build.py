@@ -0,0 +1,31 @@
+"""
+Per-puzzle PuLP model construction: building the full model vs copying the shared template
+
+Usage:
+    python -m benchmark.bench_pulp_build --repeat 20
+"""
+import argparse
+
+from killer_sudoku import pulp_solver
+from benchmark.common import summarize, time_call
+from benchmark.puzzles import PUZZLES
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    pulp_solver.get_template()
+    print(f"{'puzzle':<8}{'full ms':>9}{'template ms':>13}{'ratio':>8}")
+    for name, cage_constraints in PUZZLES.items():
+        full = summarize(time_call(
+            lambda: pulp_solver.KillerSudokuSolver(cage_constraints, template=pulp_solver.ModelTemplate()),
+            args.repeat,
+        ))["median_ms"]
+        shared = summarize(time_call(lambda: pulp_solver.KillerSudokuSolver(cage_constraints), args.repeat))["median_ms"]
+        print(f"{name:<8}{full:>9.2f}{shared:>13.2f}{shared / full:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Compares the loose and tight PuLP formulations, with and without man_solver presolve:
+CBC branch-and-bound nodes, LP iterations, free choices left and time of each phase
+
+Usage:
+    python -m benchmark.bench_pulp_formulation --time-limit 60
+"""
+import argparse
+import os
+import re
+import tempfile
+import time
+
+import pulp
+
+from killer_sudoku import pulp_solver
+from benchmark.puzzles import PUZZLES
+
+
+def solve(cage_constraints, formulation, time_limit, presolve=False):
+    """
+    Returns:
+        result (dict): status, seconds, nodes and iterations read from the CBC log,
+            presolve seconds and free choices left
+    """
+    solver = pulp_solver.KillerSudokuSolver(cage_constraints, formulation=formulation, presolve=presolve)
+    handle, log_path = tempfile.mkstemp(suffix=".log")
+    os.close(handle)
+    try:
+        start = time.perf_counter()
+        solver.problem.solve(pulp.PULP_CBC_CMD(msg=False, timeLimit=time_limit, logPath=log_path))
+        seconds = time.perf_counter() - start
+        with open(log_path) as file:
+            log = file.read()
+    finally:
+        os.remove(log_path)
+    nodes = re.search(r"Enumerated nodes:\s+(\d+)", log)
+    iterations = re.search(r"Total iterations:\s+(\d+)", log)
+    return {
+        "status": pulp.LpStatus[solver.problem.status],
+        "seconds": seconds,
+        "nodes": int(nodes.group(1)) if nodes else None,
+        "iterations": int(iterations.group(1)) if iterations else None,
+        "presolve": solver.timings["presolve"],
+        "free": solver.free_choices,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--time-limit", type=int, default=60, help="CBC time limit per solve in seconds")
+    args = parser.parse_args()
+
+    print(f"{'puzzle':<8}{'model':<7}{'presolve':<10}{'status':>12}{'free':>6}{'nodes':>8}{'iters':>9}"
+          f"{'presolve s':>12}{'milp s':>9}")
+    for name, cage_constraints in PUZZLES.items():
+        for presolve in (False, True):
+            for formulation in pulp_solver.FORMULATIONS:
+                result = solve(cage_constraints, formulation, args.time_limit, presolve)
+                print(
+                    f"{name:<8}{formulation:<7}{str(presolve):<10}{result['status']:>12}{result['free']:>6}"
+                    f"{str(result['nodes']):>8}{str(result['iterations']):>9}"
+                    f"{result['presolve']:>12.3f}{result['seconds']:>9.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
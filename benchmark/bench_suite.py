@@ -0,0 +1,202 @@
+"""
+Solver benchmark suite: every engine on the difficulty-grouped corpus
+
+For each engine and difficulty group it reports the solve rate, median and p95
+latency, peak traced Python memory and the median steps per puzzle (man_solver:
+trace steps plus search guesses, dfs_solver: search guesses, pulp_solver: none).
+A puzzle counts as solved when verify_solutions accepts the grid and it equals
+the corpus solution. CBC runs in a subprocess, so pulp memory is the model only.
+
+Results go to a JSON file; pass an earlier file as --baseline to flag groups
+whose median latency grew by more than --tolerance or whose solve rate fell.
+
+Usage:
+    python -m benchmark.bench_suite --output results.json
+    python -m benchmark.bench_suite --baseline results.json --engines man,dfs
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import pulp
+
+from killer_sudoku import corpus, dfs_solver, killer_sudoku, man_solver, pulp_solver
+from benchmark.common import percentile
+from benchmark.generate_corpus import OUTPUT as CORPUS
+
+
+def run_man(cages):
+    solver = man_solver.KillerSudokuSolver(cages, bitmask=True, trace="compact")
+    solved, steps = solver.solve()
+    return solver.solution() if solved else None, len(steps) + solver.search_nodes
+
+
+def run_dfs(cages):
+    solver = dfs_solver.KillerBitboardSudoku(cages)
+    return solver.solve(), solver.nodes
+
+
+def run_pulp(cages):
+    solver = pulp_solver.KillerSudokuSolver(cages, formulation="tight", presolve=True)
+    try:
+        return solver.solve(pulp.PULP_CBC_CMD(msg=False)), None
+    except AssertionError:
+        return None, None
+
+
+# engine name -> function(cage_constraints) returning (9x9 solution or None, steps or None)
+ENGINES = {
+    "man": run_man,
+    "dfs": run_dfs,
+    "pulp": run_pulp,
+}
+
+
+def measure(engine, record, repeat, memory):
+    """
+    Returns:
+        result (dict): one puzzle on one engine, seconds is the median of repeat runs
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        solution, steps = ENGINES[engine](record["cages"])
+        timings.append(time.perf_counter() - start)
+    peak = None
+    if memory:
+        tracemalloc.start()
+        ENGINES[engine](record["cages"])
+        peak = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+    return {
+        "engine": engine,
+        "id": record["id"],
+        "name": record.get("name"),
+        "difficulty": record["difficulty"],
+        "seconds": statistics.median(timings),
+        "peak_kib": peak,
+        "steps": steps,
+        "solution": solution,
+    }
+
+
+def check(results, records):
+    """Sets "solved" on each result of one engine with a single verify_solutions call"""
+    boards = killer_sudoku.boards_from_cages([record["cages"] for record in records])
+    grids = [result["solution"] or [[0] * 9 for _ in range(9)] for result in results]
+    expected = [[int(char) for char in record["solution"]] for record in records]
+    valid = killer_sudoku.verify_solutions(grids, boards, expected)["valid"]
+    for result, ok in zip(results, valid):
+        result["solved"] = bool(ok)
+        del result["solution"]
+
+
+def summarize(results):
+    """
+    Returns:
+        summary (list): one dict per (engine, difficulty) in the order first seen
+    """
+    groups = {}
+    for result in results:
+        groups.setdefault((result["engine"], result["difficulty"]), []).append(result)
+    summary = []
+    for (engine, difficulty), group in groups.items():
+        seconds = [result["seconds"] for result in group]
+        peaks = [result["peak_kib"] for result in group if result["peak_kib"] is not None]
+        steps = [result["steps"] for result in group if result["steps"] is not None]
+        summary.append({
+            "engine": engine,
+            "difficulty": difficulty,
+            "puzzles": len(group),
+            "solve_rate": sum(result["solved"] for result in group) / len(group),
+            "median_ms": statistics.median(seconds) * 1000,
+            "p95_ms": percentile(seconds, 95) * 1000,
+            "peak_kib": max(peaks) if peaks else None,
+            "median_steps": statistics.median(steps) if steps else None,
+        })
+    return summary
+
+
+def metadata(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "machine": platform.platform(),
+        "corpus": args.corpus,
+        "repeat": args.repeat,
+    }
+
+
+def compare(summary, baseline, tolerance):
+    """
+    Prints the median latency of each group against the baseline
+
+    Returns:
+        regressions (int): groups slower than 1 + tolerance times the baseline or with a lower solve rate
+    """
+    previous = {(row["engine"], row["difficulty"]): row for row in baseline["summary"]}
+    regressions = 0
+    print(f"\n{'engine':<7}{'group':<8}{'median ms':>11}{'baseline':>10}{'ratio':>7}")
+    for row in summary:
+        old = previous.get((row["engine"], row["difficulty"]))
+        if old is None:
+            continue
+        ratio = row["median_ms"] / old["median_ms"]
+        worse = ratio > 1 + tolerance or row["solve_rate"] < old["solve_rate"]
+        regressions += worse
+        flag = "  REGRESSION" if worse else ""
+        print(f"{row['engine']:<7}{row['difficulty']:<8}{row['median_ms']:>11.1f}{old['median_ms']:>10.1f}{ratio:>7.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=CORPUS, help="JSONL/binary corpus with difficulty and solution fields")
+    parser.add_argument("--engines", default=",".join(ENGINES), help="comma separated: " + ",".join(ENGINES))
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per puzzle")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--baseline", help="earlier --output file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed median slowdown before flagging")
+    args = parser.parse_args()
+
+    records = list(corpus.read_corpus(args.corpus))
+    results = []
+    for engine in args.engines.split(","):
+        engine_results = [measure(engine, record, args.repeat, not args.no_memory) for record in records]
+        check(engine_results, records)
+        results.extend(engine_results)
+    summary = summarize(results)
+
+    print(f"{len(records)} puzzles from {args.corpus}")
+    print(f"{'engine':<7}{'group':<8}{'n':>4}{'solved':>8}{'median ms':>11}{'p95 ms':>9}{'peak KiB':>10}{'steps':>8}")
+    for row in summary:
+        peak = f"{row['peak_kib']:.0f}" if row["peak_kib"] is not None else "-"
+        steps = f"{row['median_steps']:.0f}" if row["median_steps"] is not None else "-"
+        print(
+            f"{row['engine']:<7}{row['difficulty']:<8}{row['puzzles']:>4}{row['solve_rate']:>8.0%}"
+            f"{row['median_ms']:>11.1f}{row['p95_ms']:>9.1f}{peak:>10}{steps:>8}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"meta": metadata(args), "summary": summary, "puzzles": results}, file, indent=1)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(summary, json.load(file), args.tolerance)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Where man_solver spends its time: the profile report of each technique,
+summed over the puzzles of each difficulty group of the benchmark corpus
+
+Usage:
+    python -m benchmark.bench_techniques --propagation queue
+"""
+import argparse
+
+from killer_sudoku import corpus, man_solver
+from benchmark.generate_corpus import OUTPUT as CORPUS
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--corpus", default=CORPUS)
+    parser.add_argument("--propagation", default="sweep", choices=["sweep", "queue"])
+    args = parser.parse_args()
+
+    groups = {}
+    for record in corpus.read_corpus(args.corpus):
+        solver = man_solver.KillerSudokuSolver(record["cages"], bitmask=True, propagation=args.propagation, trace=False, profile=True)
+        _, _, report = solver.solve()
+        totals = groups.setdefault(record.get("difficulty", "all"), {})
+        for name, stats in report["techniques"].items():
+            total = totals.setdefault(name, {"calls": 0, "eliminations": 0, "seconds": 0.0})
+            for key in total:
+                total[key] += stats[key]
+
+    for difficulty, totals in groups.items():
+        seconds = sum(stats["seconds"] for stats in totals.values())
+        eliminations = sum(stats["eliminations"] for stats in totals.values())
+        print(f"\n{difficulty}: {seconds * 1000:.0f} ms, {eliminations} eliminations")
+        print(f"{'technique':<18}{'calls':>8}{'elim':>7}{'ms':>9}{'time %':>8}{'elim/ms':>9}")
+        for name, stats in sorted(totals.items(), key=lambda item: -item[1]["seconds"]):
+            ms = stats["seconds"] * 1000
+            print(
+                f"{name:<18}{stats['calls']:>8}{stats['eliminations']:>7}{ms:>9.1f}"
+                f"{stats['seconds'] / seconds:>8.0%}{stats['eliminations'] / ms if ms else 0:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
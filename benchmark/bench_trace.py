@@ -0,0 +1,43 @@
+"""
+Compares man_solver's step trace modes: full board snapshots, compact deltas and no trace
+
+Usage:
+    python -m benchmark.bench_trace --repeat 5
+"""
+import argparse
+import tracemalloc
+
+from killer_sudoku import man_solver
+from benchmark.common import summarize, time_call
+from benchmark.puzzles import PUZZLES
+
+
+def solve(cage_constraints, trace):
+    solver = man_solver.KillerSudokuSolver(cage_constraints, trace=trace)
+    solver.solve()
+    return solver
+
+
+def peak_kib(cage_constraints, trace):
+    tracemalloc.start()
+    solve(cage_constraints, trace)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'puzzle':<8}{'trace':<9}{'steps':>7}{'ms':>9}{'peak KiB':>10}")
+    for name, cage_constraints in PUZZLES.items():
+        for trace in ("full", "compact", False):
+            steps = len(solve(cage_constraints, trace).steps)
+            ms = summarize(time_call(lambda: solve(cage_constraints, trace), args.repeat))["median_ms"]
+            print(f"{name:<8}{str(trace):<9}{steps:>7}{ms:>9.1f}{peak_kib(cage_constraints, trace):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import statistics
+import time
+
+
+def time_call(func, repeat=5):
+    """
+    Times repeated calls of func
+
+    Args:
+        func (callable): zero-argument callable to time
+        repeat (int): number of timed calls
+
+    Returns:
+        timings (list): wall time of each call in seconds
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def summarize(timings):
+    """
+    Returns:
+        summary (dict): min and median of timings in milliseconds
+    """
+    return {
+        "min_ms": min(timings) * 1000,
+        "median_ms": statistics.median(timings) * 1000,
+    }
+
+
+def percentile(values, q):
+    """
+    Returns:
+        value: nearest-rank q-th percentile of values (0 < q <= 100)
+    """
+    ordered = sorted(values)
+    return ordered[max(0, -(-len(ordered) * q // 100) - 1)]
@@ -0,0 +1,141 @@
+"""
+Generates benchmark/corpus.jsonl, the killer corpus read by bench_suite
+
+Each generated puzzle cuts a random solution grid into random connected cages
+of distinct digits, then splits single cells off cages until the DFS finds no
+second solution, so every puzzle is unique. Larger cages admit more digit
+combinations per cage, so the cage size limit sets the difficulty group.
+The puzzles of benchmark/puzzles.py join the groups they belong to.
+
+Usage:
+    python -m benchmark.generate_corpus --per-group 8 --seed 0
+"""
+import argparse
+import random
+
+from killer_sudoku import corpus, dfs_solver, man_solver
+from benchmark.puzzles import PUZZLES
+
+# difficulty -> largest cage size of generated puzzles
+GROUPS = {"easy": 3, "medium": 5, "hard": 6}
+NAMED = {"test": "easy", "26274": "medium", "26079": "hard"}
+OUTPUT = "benchmark/corpus.jsonl"
+
+
+def random_grid(rng):
+    """
+    Returns:
+        grid (list): 9x9 solved sudoku, a shuffled pattern grid
+    """
+    digits = rng.sample(range(1, 10), 9)
+    rows = [band * 3 + row for band in rng.sample(range(3), 3) for row in rng.sample(range(3), 3)]
+    cols = [stack * 3 + col for stack in rng.sample(range(3), 3) for col in rng.sample(range(3), 3)]
+    grid = [[digits[(3 * (row % 3) + row // 3 + col) % 9] for col in cols] for row in rows]
+    if rng.random() < 0.5:
+        grid = [list(col) for col in zip(*grid)]
+    return grid
+
+
+def random_cages(grid, rng, max_size):
+    """
+    Returns:
+        cage_constraints (list): connected cages of 1 to max_size cells without repeated digits
+    """
+    cage_of = [[None] * 9 for _ in range(9)]
+    cages = []
+    starts = [(row, col) for row in range(9) for col in range(9)]
+    rng.shuffle(starts)
+    for row, col in starts:
+        if cage_of[row][col] is not None:
+            continue
+        size = rng.randint(1, max_size)
+        cells, digits = [(row, col)], {grid[row][col]}
+        cage_of[row][col] = len(cages)
+        while len(cells) < size:
+            options = [
+                (r + dr, c + dc) for r, c in cells for dr, dc in ((0, 1), (1, 0), (0, -1), (-1, 0))
+                if 0 <= r + dr < 9 and 0 <= c + dc < 9 and cage_of[r + dr][c + dc] is None and grid[r + dr][c + dc] not in digits
+            ]
+            if not options:
+                break
+            r, c = rng.choice(options)
+            cells.append((r, c))
+            digits.add(grid[r][c])
+            cage_of[r][c] = len(cages)
+        cages.append((sum(digits), [[r, c] for r, c in cells]))
+    return cages
+
+
+def other_solution(cages, grid):
+    """
+    Returns:
+        other (list): a solution that differs from grid, None if grid is the only one
+    """
+    for index in range(81):
+        candidates = [dfs_solver.ALL_DIGITS] * 81
+        candidates[index] &= ~(1 << (grid[index // 9][index % 9] - 1))
+        other = dfs_solver.KillerBitboardSudoku(cages, candidates=candidates).solve()
+        if other is not None:
+            return other
+    return None
+
+
+def make_unique(cages, grid):
+    """
+    Splits a cell where another solution differs from grid off its cage until none is left
+
+    Returns:
+        cage_constraints (list): cages whose only solution is grid
+    """
+    while True:
+        other = other_solution(cages, grid)
+        if other is None:
+            return cages
+        row, col = next((r, c) for r in range(9) for c in range(9) if other[r][c] != grid[r][c])
+        split = []
+        for total, cells in cages:
+            if [row, col] in cells and len(cells) > 1:
+                split.append((total - grid[row][col], [cell for cell in cells if cell != [row, col]]))
+                split.append((grid[row][col], [[row, col]]))
+            else:
+                split.append((total, cells))
+        cages = split
+
+
+def solution_string(grid):
+    return "".join(str(value) for row in grid for value in row)
+
+
+def records(per_group, seed):
+    """
+    Yields:
+        record (dict): id, name, difficulty, cages and the 81-digit solution of each puzzle
+    """
+    puzzle_id = 0
+    for name, cages in PUZZLES.items():
+        solver = man_solver.KillerSudokuSolver(cages, bitmask=True, trace=False)
+        solver.solve()
+        puzzle_id += 1
+        yield {"id": puzzle_id, "name": name, "difficulty": NAMED[name], "cages": cages, "solution": solution_string(solver.solution())}
+    for difficulty, max_size in GROUPS.items():
+        for number in range(per_group):
+            rng = random.Random(f"{seed}-{difficulty}-{number}")
+            grid = random_grid(rng)
+            cages = make_unique(random_cages(grid, rng, max_size), grid)
+            puzzle_id += 1
+            yield {"id": puzzle_id, "name": f"{difficulty}-{number}", "difficulty": difficulty, "cages": cages, "solution": solution_string(grid)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--per-group", type=int, default=8, help="generated puzzles per difficulty")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=OUTPUT)
+    args = parser.parse_args()
+
+    count = corpus.write_jsonl(args.output, records(args.per_group, args.seed))
+    print(f"Wrote {count} puzzles to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
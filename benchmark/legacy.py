@@ -0,0 +1,83 @@
+"""
+Reference copies of man_solver code paths that have since been replaced,
+kept so the benchmarks can compare against them
+"""
+from itertools import permutations
+
+from killer_sudoku import man_solver
+
+
+def search_combinations(sum, count):
+    """The backtracker every Cage used to run in __init__"""
+    results = set()
+
+    def backtrack(start, path, target):
+        if len(path) == count and target == 0:
+            results.add(tuple(path))
+            return
+        for i in range(start, 10):
+            if i > target:
+                break
+            backtrack(i + 1, path + [i], target - i)
+
+    backtrack(1, [], sum)
+    return results
+
+
+def permutation_support(digits, masks):
+    """
+    Cage.update's former pruning: tries every ordering of the combination and
+    greedily places each digit in the first free cell that allows it
+
+    Returns:
+        support (list): same contract as man_solver.matching_support
+    """
+    support = [0] * len(masks)
+    possible = False
+    for perm in permutations(digits):
+        appeared_numbers = [0] * len(masks)
+        used = 0
+        for number in perm:
+            bit = 1 << number
+            for index, mask in enumerate(masks):
+                if mask & bit and not used >> index & 1:
+                    appeared_numbers[index] = bit
+                    used |= 1 << index
+                    break
+            else:
+                break
+        else:
+            possible = True
+            for index, bit in enumerate(appeared_numbers):
+                support[index] |= bit
+    return support if possible else None
+
+
+def permutation_update(cage):
+    """Cage.update as it was before matching_support"""
+    cells = list(cage.cells)
+    masks = [cell.mask for cell in cells]
+    cell_number = [0] * len(cells)
+    for combination in cage.combinations.copy():
+        support = permutation_support(man_solver.MASK_DIGITS[combination], masks)
+        if support is None:
+            cage.combinations.remove(combination)
+        else:
+            for index, mask in enumerate(support):
+                cell_number[index] |= mask
+    for cell, mask in zip(cells, cell_number):
+        cell.intersection_mask(mask)
+    cage.update_numbers()
+
+
+def legacy_cage(sum, cells):
+    """Builds a cage the way Cage.__init__ did before the shared combination table"""
+    cage = man_solver.Cage.__new__(man_solver.Cage)
+    cage.ID = -1
+    cage.sum = sum
+    cage.cells = cells
+    cage.virtual = True
+    cage.solved = False
+    cage.combinations = {man_solver.digits_to_mask(c) for c in search_combinations(sum, len(cells))}
+    permutation_update(cage)
+    return cage
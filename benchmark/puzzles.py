@@ -0,0 +1,146 @@
+"""
+Puzzle corpus shared by the benchmark scripts
+
+Each killer puzzle is a list of cage constraints, (sum, [[row, col], ...]),
+in the format every solver in killer_sudoku accepts. HARD_SUDOKU holds classic
+(cage-free) sudoku as 81-character strings for the plain DFS engines.
+"""
+
+# Puzzle used by test/test_man_solver.py and test/test_pulp_solver.py
+PUZZLE_TEST = [
+    (8, [[0, 0], [0, 1]]),
+    (9, [[0, 6], [0, 7]]),
+    (8, [[0, 2], [1, 2]]),
+    (12, [[0, 3], [0, 4], [1, 3]]),
+    (15, [[0, 5], [1, 5], [2, 5]]),
+    (19, [[1, 6], [1, 7], [2, 7]]),
+    (16, [[0, 8], [1, 8], [2, 8]]),
+    (14, [[1, 0], [1, 1], [2, 0]]),
+    (15, [[2, 1], [2, 2]]),
+    (10, [[2, 3], [3, 3]]),
+    (12, [[1, 4], [2, 4]]),
+    (7, [[2, 6], [3, 6]]),
+    (24, [[3, 0], [3, 1], [4, 1]]),
+    (17, [[3, 7], [3, 8], [4, 8]]),
+    (8, [[3, 2], [4, 2]]),
+    (12, [[4, 3], [5, 3]]),
+    (19, [[3, 4], [4, 4], [5, 4]]),
+    (4, [[3, 5], [4, 5]]),
+    (15, [[4, 6], [5, 6]]),
+    (12, [[4, 0], [5, 0], [5, 1]]),
+    (7, [[4, 7], [5, 7], [5, 8]]),
+    (8, [[5, 2], [6, 2]]),
+    (10, [[6, 4], [7, 4]]),
+    (14, [[5, 5], [6, 5]]),
+    (12, [[6, 6], [6, 7]]),
+    (18, [[6, 8], [7, 7], [7, 8]]),
+    (15, [[6, 0], [7, 0], [8, 0]]),
+    (13, [[6, 1], [7, 1], [7, 2]]),
+    (12, [[6, 3], [7, 3], [8, 3]]),
+    (15, [[7, 5], [8, 4], [8, 5]]),
+    (7, [[7, 6], [8, 6]]),
+    (10, [[8, 1], [8, 2]]),
+    (8, [[8, 7], [8, 8]]),
+]
+
+# 26274 Difficulty:6
+PUZZLE_26274 = [
+    (26, [[0, 0], [0, 1], [1, 0], [1, 1]]),
+    (13, [[0, 5], [0, 6]]),
+    (17, [[0, 2], [0, 3], [0, 4], [1, 2]]),
+    (8, [[0, 7], [1, 7]]),
+    (23, [[2, 0], [2, 1], [3, 0], [3, 1], [4, 0]]),
+    (11, [[1, 3], [1, 4], [2, 2], [2, 3]]),
+    (30, [[1, 5], [1, 6], [2, 4], [2, 5], [2, 6], [2, 7]]),
+    (17, [[3, 2], [3, 3]]),
+    (4, [[3, 6], [3, 7]]),
+    (23, [[0, 8], [1, 8], [2, 8], [3, 8]]),
+    (11, [[4, 1], [4, 2]]),
+    (9, [[4, 3], [5, 3]]),
+    (11, [[3, 4], [4, 4], [5, 4]]),
+    (8, [[3, 5], [4, 5]]),
+    (16, [[4, 6], [4, 7]]),
+    (11, [[5, 0], [6, 0], [7, 0], [8, 0]]),
+    (8, [[5, 1], [5, 2]]),
+    (11, [[5, 5], [5, 6]]),
+    (39, [[6, 1], [6, 2], [6, 3], [6, 4], [7, 2], [7, 3]]),
+    (15, [[6, 5], [6, 6], [7, 4], [7, 5]]),
+    (28, [[4, 8], [5, 7], [5, 8], [6, 7], [6, 8]]),
+    (16, [[7, 1], [8, 1]]),
+    (22, [[7, 6], [8, 4], [8, 5], [8, 6]]),
+    (10, [[8, 2], [8, 3]]),
+    (18, [[7, 7], [7, 8], [8, 7], [8, 8]]),
+]
+
+# 26079 Difficulty:6, man_solver gives up on it
+PUZZLE_26079 = [
+    (8, [[0, 0], [0, 1]]),
+    (25, [[0, 2], [0, 3], [0, 4], [0, 5], [0, 6]]),
+    (12, [[0, 7], [0, 8]]),
+    (25, [[1, 0], [1, 1], [2, 0], [3, 0]]),
+    (23, [[1, 7], [1, 8], [2, 8], [3, 8]]),
+    (28, [[1, 2], [2, 1], [2, 2], [3, 2], [4, 2]]),
+    (6, [[1, 3], [2, 3]]),
+    (14, [[1, 4], [2, 4]]),
+    (6, [[1, 5], [2, 5]]),
+    (23, [[1, 6], [2, 6], [2, 7], [3, 6], [4, 6]]),
+    (14, [[3, 3], [3, 4], [3, 5]]),
+    (5, [[3, 1], [4, 1]]),
+    (13, [[4, 3], [4, 4], [4, 5]]),
+    (11, [[3, 7], [4, 7]]),
+    (18, [[4, 0], [5, 0], [6, 0]]),
+    (14, [[4, 8], [5, 8], [6, 8]]),
+    (13, [[5, 1], [6, 1]]),
+    (14, [[5, 2], [6, 2]]),
+    (16, [[5, 3], [6, 3], [7, 3]]),
+    (7, [[5, 4], [6, 4]]),
+    (20, [[5, 5], [6, 5], [7, 5]]),
+    (8, [[5, 6], [6, 6]]),
+    (5, [[5, 7], [6, 7]]),
+    (22, [[7, 1], [7, 2], [8, 2], [8, 3]]),
+    (22, [[7, 6], [7, 7], [8, 5], [8, 6]]),
+    (10, [[7, 0], [8, 0], [8, 1]]),
+    (8, [[7, 4], [8, 4]]),
+    (15, [[7, 8], [8, 7], [8, 8]]),
+]
+
+PUZZLES = {
+    "test": PUZZLE_TEST,
+    "26274": PUZZLE_26274,
+    "26079": PUZZLE_26079,
+}
+
+# Well-known hard classic sudoku: Inkala's 2012 puzzle, the "hardest" list used
+# in Norvig's solver essay and a selection of 17-clue puzzles. '.' is an empty cell.
+HARD_SUDOKU = [
+    "8..........36......7..9.2...5...7.......457.....1...3...1....68..85...1..9....4..",
+    "85...24..72......9..4.........1.7..23.5...9...4...........8..7..17..........36.4.",
+    "..53.....8......2..7..1.5..4....53...1..7...6..32...8..6.5....9..4....3......97..",
+    "12..4......5.69.1...9...5.........7.7...52.9..3......2.9.6...5.4..9..8.1..3...9.4",
+    "...57..3.1......2.7...234......8...4..7..4...49....6.5.42...3.....7..9....18.....",
+    "7..1523........92....3.....1....47.8.......6............9...5.6.4.9.7...8....6.1.",
+    "1....7.9..3..2...8..96..5....53..9...1..8...26....4...3......1..4......7..7...3..",
+    "1...34.8....8..5....4.6..21.18......3..1.2..6......81.52..7.9....6..9....9.64...2",
+    "...92......68.3...19..7...623..4.1....1...7....8.3..297...8..91...5.72......64...",
+    ".6.5.4.3.1...9...8.........9...5...6.4.6.2.7.7...4...5.........4...8...1.5.2.3.4.",
+    "7.....4...2..7..8...3..8.799..5..3...6..2..9...1.97..6...3..9...3..4..6...9..1.35",
+    "....7..2.8.......6.1.2.5...9.54....8.........3....85.1...3.2.8.4.......9.7..6....",
+    "4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......",
+    "52...6.........7.13...........4..8..6......5...........418.........3..2...87.....",
+    "6.....8.3.4.7.................5.4.7.3..2.....1.6.......2.....5.....8.6......1....",
+    "48.3............71.2.......7.5....6....2..8.............1.76...3.....4......5....",
+    "....14....3....2...7..........9...3.6.1.............8.2.....1.4....5.6.....7.8...",
+    "......52..8.4......3...9...5.1...6..2..7........3.....6...1..........7.4.......3.",
+    "6.2.5.........3.4..........43...8....1....2........7..5..27...........81...6.....",
+    ".524.........7.1..............8.2...3.....6...9.5.....1.6.3...........897........",
+    "6.2.5.........4.3..........43...8....1....2........7..5..27...........81...6.....",
+    ".923.........8.1...........1.7.4...........658.........6.5.2...4.....7.....9.....",
+]
+
+
+def sudoku_grid(puzzle):
+    """
+    Returns:
+        board (list): 9x9 list of ints, zeros for empty cells
+    """
+    return [[0 if char == "." else int(char) for char in puzzle[row * 9:row * 9 + 9]] for row in range(9)]
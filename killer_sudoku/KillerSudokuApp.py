@@ -1,12 +1,21 @@
 import tkinter as tk
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import matplotlib.pyplot as plt
-from man_solver import KillerSudokuSolver
+try:
+    from .man_solver import KillerSudokuSolver, Trace, MASK_DIGITS, digits_to_mask
+except ImportError:  # run as a script from inside killer_sudoku
+    from man_solver import KillerSudokuSolver, Trace, MASK_DIGITS, digits_to_mask
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
+from matplotlib.transforms import Bbox
 
 class KillerSudokuApp:
     def __init__(self, root, steps, cage_constraints):
+        """
+        Args:
+            steps: 完整记录 [{'board', 'action'}, ...] 或紧凑记录 (man_solver.Trace)
+            cage_constraints (list): [(sum, [[row, col], ...]), ...]
+        """
         self.root = root
         self.root.title("Sudoku Solver Visualization")
         self.steps = steps 
@@ -108,6 +117,17 @@ class KillerSudokuApp:
             borderwidth=2                    # 边框宽度
         )
         self.action_label.grid(row=1, column=0, columnspan=5, padx=20, pady=15, sticky="ew")
+
+        # 拖动浏览全部步骤的进度条
+        self.step_scale = tk.Scale(
+            root,
+            from_=0,
+            to=len(steps) - 1,
+            orient="horizontal",
+            showvalue=False,
+            command=self.on_scale
+        )
+        self.step_scale.grid(row=3, column=0, columnspan=5, padx=20, pady=5, sticky="ew")
         
         # 初始化 matplotlib 图表
         self.figure, self.ax = plt.subplots(figsize=(9, 9))
@@ -119,7 +139,10 @@ class KillerSudokuApp:
         self.update_action_label()
 
     def draw_board(self):
-        """使用 matplotlib 绘制数独棋盘并添加杀手数独的Cage约束"""
+        """
+        使用 matplotlib 绘制数独棋盘并添加杀手数独的Cage约束, 只在初始化时调用一次.
+        单元格文字为 animated 艺术家, 不参与整幅重绘, 切换步骤时只重画并 blit 变化的单元格
+        """
         cell_size = 1
         self.ax.clear()
 
@@ -140,7 +163,9 @@ class KillerSudokuApp:
             first_cell_x, first_cell_y = cells[0][1] * cell_size, 8 - cells[0][0] * cell_size
             self.ax.text(first_cell_x + 0.1, first_cell_y + 0.9, str(target_sum), fontsize=12, color='red', ha='left', va='top')
 
-        # 绘制单元格
+        # 绘制单元格, 每个单元格预先建好一个确定数字和 9 个候选数字的文本, 之后只修改文字和可见性
+        self.value_texts = []
+        self.candidate_texts = []
         for i in range(9):
             for j in range(9):
                 x, y = j * cell_size, 8 - i * cell_size
@@ -148,18 +173,14 @@ class KillerSudokuApp:
                 # 绘制单元格边框
                 self.ax.add_patch(plt.Rectangle((x, y), cell_size, cell_size, fill=False))
                 
-                # 填充数字或候选数字
-                candidates = self.steps[self.step]['board'][i][j]
-                if len(candidates) == 1:
-                    # 已确定的数字，使用较大字体居中显示
-                    self.ax.text(x + 0.5, y + 0.5, str(list(candidates)[0]), fontsize=24, ha='center', va='center')
-                else:
-                    # 未确定的格子，显示候选数字
-                    # 将候选数字按 3x3 排列在单元格内
-                    for idx, candidate in enumerate(candidates):
-                        cx = x + (idx % 3) * 0.3 + 0.2
-                        cy = y + (idx // 3) * 0.3 + 0.2
-                        self.ax.text(cx, cy, str(candidate), fontsize=10, ha='center', va='center', color='blue')
+                # 已确定的数字，使用较大字体居中显示
+                self.value_texts.append(self.ax.text(x + 0.5, y + 0.5, "", fontsize=24, ha='center', va='center', visible=False, animated=True))
+                # 未确定的格子，将候选数字按 3x3 排列在单元格内
+                self.candidate_texts.append([
+                    self.ax.text(x + (idx % 3) * 0.3 + 0.2, y + (idx // 3) * 0.3 + 0.2, "",
+                                 fontsize=10, ha='center', va='center', color='blue', visible=False, animated=True)
+                    for idx in range(9)
+                ])
 
         # 绘制粗线条分隔 3x3 宫
         for i in range(0, 10, 3):
@@ -173,8 +194,71 @@ class KillerSudokuApp:
         self.ax.set_ylim(0, 9)
         self.ax.set_aspect('equal')
         self.figure.tight_layout()
+
+        self.masks = [None] * 81  # 当前显示的候选数掩码
+        self.shown_step = None
+        self.cell_backgrounds = None
+        self.show_step(self.step)
+        self.canvas.mpl_connect("draw_event", self.on_draw)
         self.canvas.draw()
 
+    def on_draw(self, event):
+        """整幅重绘 (初始化或窗口缩放) 后保存每个单元格的背景, 并画出全部单元格文字"""
+        self.cell_backgrounds = []
+        for index in range(81):
+            row, col = divmod(index, 9)
+            corners = self.ax.transData.transform([(col, 8 - row), (col + 1, 9 - row)])
+            self.cell_backgrounds.append(self.canvas.copy_from_bbox(Bbox(corners)))
+        for index in range(81):
+            self.draw_cell(index)
+
+    def draw_cell(self, index):
+        self.canvas.restore_region(self.cell_backgrounds[index])
+        self.ax.draw_artist(self.value_texts[index])
+        for text in self.candidate_texts[index]:
+            self.ax.draw_artist(text)
+
+    def board_masks(self, step):
+        """
+        第 step 步的 81 个候选数掩码. 紧凑记录 (Trace) 在小步前进时只应用增量,
+        否则从最近的检查点重放; 完整记录直接从棋盘转换
+        """
+        if isinstance(self.steps, Trace):
+            shown = self.shown_step
+            if shown is not None and shown <= step <= shown + Trace.CHECKPOINT:
+                masks = list(self.masks)
+                for current in range(shown + 1, step + 1):
+                    for index, removed in self.steps.changes(current):
+                        masks[index] &= ~removed
+                return masks
+            return self.steps.masks_at(step)
+        board = self.steps[step]['board']
+        return [digits_to_mask(board[row][col]) for row in range(9) for col in range(9)]
+
+    def show_step(self, step):
+        """只更新并重画候选数与当前显示不同的单元格"""
+        masks = self.board_masks(step)
+        changed = False
+        for index, mask in enumerate(masks):
+            if mask == self.masks[index]:
+                continue
+            self.masks[index] = mask
+            candidates = MASK_DIGITS[mask]
+            solved = len(candidates) == 1
+            self.value_texts[index].set_text(str(candidates[0]) if solved else "")
+            self.value_texts[index].set_visible(solved)
+            for idx, text in enumerate(self.candidate_texts[index]):
+                visible = not solved and idx < len(candidates)
+                text.set_visible(visible)
+                if visible:
+                    text.set_text(str(candidates[idx]))
+            if self.cell_backgrounds is not None:
+                self.draw_cell(index)
+                changed = True
+        self.shown_step = step
+        if changed:
+            self.canvas.blit(self.ax.bbox)
+
 
     def prev_step(self):
         """切换到上一步"""
@@ -204,19 +288,31 @@ class KillerSudokuApp:
         self.update_board()
 
     def update_board(self):
-        """更新棋盘和操作提示"""
-        self.draw_board()
+        """更新棋盘、进度条和操作提示"""
+        self.show_step(self.step)
+        if self.step_scale.get() != self.step:
+            self.step_scale.set(self.step)
         self.update_action_label()
 
+    def on_scale(self, value):
+        """拖动进度条跳转到任意一步"""
+        step = int(float(value))
+        if step != self.step:
+            self.step = step
+            self.update_board()
+
     def update_action_label(self):
-        """更新操作指令的标签显示"""
-        current_action = self.steps[self.step]['action']
+        """更新操作指令的标签显示; 紧凑记录直接取说明文字, 不重建棋盘"""
+        if isinstance(self.steps, Trace):
+            current_action = self.steps.action(self.step)
+        else:
+            current_action = self.steps[self.step]['action']
         self.action_label.config(text=f"[{self.step}]{current_action}")
 
 if __name__ == "__main__":
     # 26274 Difficulty:6 Success
     cage_constraints = [(26, [[0, 0], [0, 1], [1, 0], [1, 1]]), (13, [[0, 5], [0, 6]]), (17, [[0, 2], [0, 3], [0, 4], [1, 2]]), (8, [[0, 7], [1, 7]]), (23, [[2, 0], [2, 1], [3, 0], [3, 1], [4, 0]]), (11, [[1, 3], [1, 4], [2, 2], [2, 3]]), (30, [[1, 5], [1, 6], [2, 4], [2, 5], [2, 6], [2, 7]]), (17, [[3, 2], [3, 3]]), (4, [[3, 6], [3, 7]]), (23, [[0, 8], [1, 8], [2, 8], [3, 8]]), (11, [[4, 1], [4, 2]]), (9, [[4, 3], [5, 3]]), (11, [[3, 4], [4, 4], [5, 4]]), (8, [[3, 5], [4, 5]]), (16, [[4, 6], [4, 7]]), (11, [[5, 0], [6, 0], [7, 0], [8, 0]]), (8, [[5, 1], [5, 2]]), (11, [[5, 5], [5, 6]]), (39, [[6, 1], [6, 2], [6, 3], [6, 4], [7, 2], [7, 3]]), (15, [[6, 5], [6, 6], [7, 4], [7, 5]]), (28, [[4, 8], [5, 7], [5, 8], [6, 7], [6, 8]]), (16, [[7, 1], [8, 1]]), (22, [[7, 6], [8, 4], [8, 5], [8, 6]]), (10, [[8, 2], [8, 3]]), (18, [[7, 7], [7, 8], [8, 7], [8, 8]])]
-    killer_solver = KillerSudokuSolver(cage_constraints=cage_constraints)
+    killer_solver = KillerSudokuSolver(cage_constraints=cage_constraints, trace="compact")
     _,steps = killer_solver.solve()
 
     root = tk.Tk()
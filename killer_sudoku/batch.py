@@ -0,0 +1,124 @@
+"""
+Batch solving: spread many killer puzzles over a process pool
+
+    for result in solve_many(puzzles, engine="man", workers=4):
+        ...
+
+Results stream back as chunks finish, so they arrive out of order; each one
+carries the index of its puzzle in the input. A puzzle that an engine cannot
+solve, or that raises, is recorded as a failed result and the batch goes on.
+"""
+import os
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+import pulp
+
+try:
+    from . import dfs_solver, man_solver, pulp_solver
+except ImportError:  # run as a script from inside killer_sudoku
+    import dfs_solver
+    import man_solver
+    import pulp_solver
+
+
+def _solve_man(cage_constraints, search=True):
+    solver = man_solver.KillerSudokuSolver(cage_constraints, bitmask=True, trace=False)
+    solved, _ = solver.solve(search=search)
+    return solver.solution() if solved else None
+
+
+def _solve_logic(cage_constraints):
+    return _solve_man(cage_constraints, search=False)
+
+
+def _solve_dfs(cage_constraints):
+    return dfs_solver.KillerBitboardSudoku(cage_constraints).solve()
+
+
+def _solve_pulp(cage_constraints):
+    solver = pulp_solver.KillerSudokuSolver(cage_constraints, formulation="tight", presolve=True)
+    try:
+        return solver.solve(pulp.PULP_CBC_CMD(msg=False))
+    except AssertionError:
+        return None
+
+
+# engine name -> function(cage_constraints) returning the 9x9 solution or None
+ENGINES = {
+    "man": _solve_man,        # man_solver logic, then backtracking search if logic stalls
+    "logic": _solve_logic,    # man_solver logic only, fails when logic stalls
+    "dfs": _solve_dfs,        # dfs_solver.KillerBitboardSudoku
+    "pulp": _solve_pulp,      # pulp_solver, tight formulation with logic presolve
+}
+
+
+def solve_one(index, cage_constraints, engine="man"):
+    """
+    Returns:
+        result (dict): index, solved, solution (9x9 list or None), seconds, error (None or traceback text)
+    """
+    start = time.perf_counter()
+    try:
+        solution = ENGINES[engine](cage_constraints)
+        error = None
+    except Exception:
+        solution = None
+        error = traceback.format_exc()
+    return {
+        "index": index,
+        "solved": solution is not None,
+        "solution": solution,
+        "seconds": time.perf_counter() - start,
+        "error": error,
+    }
+
+
+def _solve_chunk(engine, chunk):
+    return [solve_one(index, cage_constraints, engine) for index, cage_constraints in chunk]
+
+
+def solve_many(puzzles, engine="man", workers=None, chunksize=8):
+    """
+    Solves puzzles in a process pool, yielding results as chunks finish
+
+    puzzles is consumed lazily and at most 2 * workers chunks are in flight,
+    so memory does not grow with the size of the corpus.
+
+    Args:
+        puzzles (iterable): cage constraints of each puzzle, [(sum, [[row, col], ...]), ...]
+        engine (str): one of ENGINES
+        workers (int): number of processes, defaults to os.cpu_count(); 1 solves in this process
+        chunksize (int): puzzles sent to a worker at a time
+
+    Yields:
+        result (dict): see solve_one, in completion order
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}, expected one of {tuple(ENGINES)}")
+    workers = workers or os.cpu_count() or 1
+    chunks = _chunks(enumerate(puzzles), chunksize)
+
+    if workers == 1:
+        for chunk in chunks:
+            yield from _solve_chunk(engine, chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = {executor.submit(_solve_chunk, engine, chunk) for chunk in islice(chunks, 2 * workers)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+                for chunk in islice(chunks, 1):
+                    pending.add(executor.submit(_solve_chunk, engine, chunk))
+
+
+def _chunks(items, size):
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,251 @@
+"""
+Streaming puzzle corpus I/O
+
+Puzzles are read and written one record at a time, so memory stays flat for
+any corpus size. A record is a dict:
+
+    {"id": 26274, "cages": [(sum, [[row, col], ...]), ...], "givens": 9x9 list or None, ...}
+
+"cages" is the cage_constraints format every solver accepts. Other keys
+(difficulty, ...) pass through JSONL untouched.
+
+Formats:
+    .jsonl  one JSON object per line, cages as [sum, cell mask] where bit
+            row * 9 + col of the mask is set for each cell. A line may instead
+            carry "board_base64" as published by dailykillersudoku.com.
+    .bin    "KSC1" then per record: id (uint32), number of cages (uint8),
+            header check byte (uint8), flags (uint8), the givens packed two
+            cells per byte if flags & 1, and per cage its sum (uint8) and
+            11-byte little-endian cell mask.
+"""
+import base64
+import json
+import struct
+
+BINARY_MAGIC = b"KSC1"
+RECORD_HEADER = struct.Struct("<IBBB")
+MASK_BYTES = 11  # 81 bits
+HAS_GIVENS = 1
+KILLER_SUDOKU = 1  # board type code of board_base64
+
+
+def cells_to_mask(cells):
+    mask = 0
+    for row, col in cells:
+        mask |= 1 << (row * 9 + col)
+    return mask
+
+
+def mask_to_cells(mask):
+    cells = []
+    while mask:
+        index = (mask & -mask).bit_length() - 1
+        cells.append([index // 9, index % 9])
+        mask &= mask - 1
+    return cells
+
+
+def decode_board_base64(board_base64):
+    """
+    Parses the board_base64 layout read by killer_sudoku.KillerSudoku:
+    type code, check byte, (given, cage id) for each of the 81 cells, then the cage sums
+
+    Returns:
+        record (dict): cages, givens and check (kept so the board re-encodes identically)
+    """
+    data = base64.b64decode(board_base64)
+    if data[0] != KILLER_SUDOKU:
+        raise ValueError(f"Board type {data[0]} is not KILLER_SUDOKU")
+    givens = [[data[2 + 2 * (row * 9 + col)] for col in range(9)] for row in range(9)]
+    cages = [(cage_sum, []) for cage_sum in data[164:]]
+    for index in range(81):
+        cages[data[3 + 2 * index]][1].append([index // 9, index % 9])
+    return {"cages": cages, "givens": givens, "check": data[1]}
+
+
+def encode_board_base64(record):
+    """
+    Inverse of decode_board_base64: cage ids are the positions in record["cages"]
+    """
+    cage_ids = [0] * 81
+    for cage_id, (_, cells) in enumerate(record["cages"]):
+        for row, col in cells:
+            cage_ids[row * 9 + col] = cage_id
+    givens = record.get("givens") or [[0] * 9 for _ in range(9)]
+    data = bytearray([KILLER_SUDOKU, record.get("check", 0)])
+    for index in range(81):
+        data += bytes([givens[index // 9][index % 9], cage_ids[index]])
+    data += bytes(cage_sum for cage_sum, _ in record["cages"])
+    return base64.b64encode(bytes(data)).decode("ascii")
+
+
+def _record_from_json(line):
+    record = json.loads(line)
+    if "board_base64" in record:
+        record.update(decode_board_base64(record.pop("board_base64")))
+    else:
+        record["cages"] = [(cage_sum, mask_to_cells(mask)) for cage_sum, mask in record["cages"]]
+        givens = record.get("givens")
+        record["givens"] = [[int(char) for char in givens[row * 9:row * 9 + 9]] for row in range(9)] if givens else None
+    return record
+
+
+def _record_to_json(record, board_base64=False):
+    line = {key: value for key, value in record.items() if key not in ("cages", "givens", "check")}
+    if board_base64:
+        line["board_base64"] = encode_board_base64(record)
+    else:
+        line["cages"] = [[cage_sum, cells_to_mask(cells)] for cage_sum, cells in record["cages"]]
+        givens = record.get("givens")
+        if givens and any(any(row) for row in givens):
+            line["givens"] = "".join(str(value) for row in givens for value in row)
+    return json.dumps(line, separators=(",", ":"))
+
+
+def read_jsonl(path):
+    """
+    Yields:
+        record (dict): one puzzle per non-empty line
+    """
+    with open(path) as file:
+        for line in file:
+            if line.strip():
+                yield _record_from_json(line)
+
+
+def write_jsonl(path, records, board_base64=False):
+    """
+    Args:
+        records (iterable): puzzle records, consumed lazily
+        board_base64 (bool): store each board as board_base64 instead of cage masks
+
+    Returns:
+        count (int): number of records written
+    """
+    count = 0
+    with open(path, "w") as file:
+        for record in records:
+            file.write(_record_to_json(record, board_base64) + "\n")
+            count += 1
+    return count
+
+
+def read_binary(path):
+    """
+    Yields:
+        record (dict): id, cages, givens and check of each puzzle
+    """
+    with open(path, "rb") as file:
+        if file.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+            raise ValueError(f"{path} is not a binary puzzle corpus")
+        while True:
+            header = file.read(RECORD_HEADER.size)
+            if not header:
+                return
+            puzzle_id, cage_count, check, flags = RECORD_HEADER.unpack(header)
+            givens = None
+            if flags & HAS_GIVENS:
+                packed = file.read(41)
+                values = [value for byte in packed for value in (byte >> 4, byte & 0xF)]
+                givens = [values[row * 9:row * 9 + 9] for row in range(9)]
+            data = file.read(cage_count * (1 + MASK_BYTES))
+            cages = [
+                (data[offset], mask_to_cells(int.from_bytes(data[offset + 1:offset + 1 + MASK_BYTES], "little")))
+                for offset in range(0, len(data), 1 + MASK_BYTES)
+            ]
+            yield {"id": puzzle_id, "cages": cages, "givens": givens, "check": check}
+
+
+def write_binary(path, records):
+    """
+    Args:
+        records (iterable): puzzle records with integer ids, consumed lazily; other keys are not stored
+
+    Returns:
+        count (int): number of records written
+    """
+    count = 0
+    with open(path, "wb") as file:
+        file.write(BINARY_MAGIC)
+        for record in records:
+            givens = record.get("givens")
+            flags = HAS_GIVENS if givens and any(any(row) for row in givens) else 0
+            file.write(RECORD_HEADER.pack(record["id"], len(record["cages"]), record.get("check", 0), flags))
+            if flags & HAS_GIVENS:
+                values = [value for row in givens for value in row] + [0]
+                file.write(bytes(values[index] << 4 | values[index + 1] for index in range(0, 82, 2)))
+            for cage_sum, cells in record["cages"]:
+                file.write(bytes([cage_sum]) + cells_to_mask(cells).to_bytes(MASK_BYTES, "little"))
+            count += 1
+    return count
+
+
+def read_corpus(path):
+    """Reads .bin files with read_binary and anything else with read_jsonl"""
+    return read_binary(path) if str(path).endswith(".bin") else read_jsonl(path)
+
+
+def write_corpus(path, records):
+    """Writes .bin files with write_binary and anything else with write_jsonl"""
+    return write_binary(path, records) if str(path).endswith(".bin") else write_jsonl(path, records)
+
+
+def cage_constraints(path):
+    """
+    Yields:
+        cage_constraints (list): the cages of each puzzle, ready for the solvers or batch.solve_many
+    """
+    for record in read_corpus(path):
+        yield record["cages"]
+
+
+class ResultWriter:
+    """
+    Streams solver results to a JSONL file, one line per result
+
+        with ResultWriter("results.jsonl") as writer:
+            for result in batch.solve_many(puzzles):
+                writer.write(result)
+
+    9x9 solutions are stored as 81-digit strings, other values as given.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.count = 0
+
+    def __enter__(self):
+        self.file = open(self.path, "w")
+        return self
+
+    def __exit__(self, *exc_info):
+        self.file.close()
+
+    def write(self, result, **extra):
+        """
+        Args:
+            result (dict): e.g. a batch.solve_one result
+            extra: more fields to store, such as the puzzle id
+        """
+        line = dict(result, **extra)
+        if line.get("solution") is not None:
+            line["solution"] = "".join(str(value) for row in line["solution"] for value in row)
+        self.file.write(json.dumps(line, separators=(",", ":")) + "\n")
+        self.count += 1
+
+
+def read_results(path):
+    """
+    Yields:
+        result (dict): results written by ResultWriter, solutions back as 9x9 lists
+    """
+    with open(path) as file:
+        for line in file:
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            solution = result.get("solution")
+            if solution is not None:
+                result["solution"] = [[int(char) for char in solution[row * 9:row * 9 + 9]] for row in range(9)]
+            yield result
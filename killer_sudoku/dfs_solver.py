@@ -1,6 +1,10 @@
 import numpy as np
 from copy import deepcopy
 
+ALL_DIGITS = 0x1FF  # bit d - 1 set means digit d is still free
+POPCOUNT = [bin(mask).count("1") for mask in range(1 << 9)]
+BOX_OF = [(index // 27) * 3 + (index % 9) // 3 for index in range(81)]
+
 
 class Sukoku:
     """
@@ -129,6 +133,7 @@ class Sukoku:
                         # update shortest guess candiate
                         shortest_i = i
                         shortest_j = j
+                        shortest_val = len(self.cands[i][j])
         return shortest_i, shortest_j, self.cands[shortest_i][shortest_j]
 
     def solve(self):
@@ -172,3 +177,265 @@ class Sukoku:
                 # This effectively causes backtracking - higher for-loops continue if no solution found
                 if solution is not None:
                     return solution
+
+
+class BitboardSudoku:
+    """
+    Sudoku solver - backtracking over row/column/box digit bitmasks
+
+    The digits used in every row, column and box are kept as 9-bit masks. A
+    guess sets one bit in three masks and backtracking clears them again, so
+    the search never copies the board. Each level guesses the empty cell with
+    the fewest candidates (minimum remaining values).
+
+    Attributes:
+        solve (method): solves sudoku
+        nodes (int): number of guesses tried by the last solve
+    """
+
+    def __init__(self, input_board):
+        """
+        Args:
+            board (list): list of starting board
+                Each row is list, each value is cell value.
+                Zeros represent missing.
+        """
+        self.board = [list(row) for row in input_board]
+        self.nodes = 0
+
+    def _setup(self):
+        """
+        Builds the digit masks and the list of empty cells from self.board
+
+        Returns:
+            valid_flag (bool): False if a given digit repeats in a row/column/box
+        """
+        self.rows = [0] * 9
+        self.cols = [0] * 9
+        self.boxes = [0] * 9
+        self.cells = [value for row in self.board for value in row]
+        self.empty = []
+        for index, value in enumerate(self.cells):
+            if value == 0:
+                self.empty.append(index)
+                continue
+            bit = 1 << (value - 1)
+            row, col, box = index // 9, index % 9, BOX_OF[index]
+            if (self.rows[row] | self.cols[col] | self.boxes[box]) & bit:
+                return False
+            self.rows[row] |= bit
+            self.cols[col] |= bit
+            self.boxes[box] |= bit
+        return True
+
+    def _search(self, depth):
+        """
+        Fills self.empty[depth:] - recursive
+
+        Returns:
+            solved_flag (bool): True once every empty cell is filled
+        """
+        empty = self.empty
+        if depth == len(empty):
+            return True
+        rows, cols, boxes = self.rows, self.cols, self.boxes
+
+        # Minimum remaining values: pick the empty cell with the fewest free digits
+        best, best_free, best_count = depth, 0, 10
+        for position in range(depth, len(empty)):
+            index = empty[position]
+            free = ALL_DIGITS & ~(rows[index // 9] | cols[index % 9] | boxes[BOX_OF[index]])
+            count = POPCOUNT[free]
+            if count < best_count:
+                best, best_free, best_count = position, free, count
+                if count <= 1:
+                    break
+        if best_count == 0:
+            return False
+
+        empty[depth], empty[best] = empty[best], empty[depth]
+        index = empty[depth]
+        row, col, box = index // 9, index % 9, BOX_OF[index]
+        free = best_free
+        while free:
+            bit = free & -free
+            free ^= bit
+            self.nodes += 1
+            # Make the move in place ...
+            rows[row] |= bit
+            cols[col] |= bit
+            boxes[box] |= bit
+            if self._search(depth + 1):
+                self.cells[index] = bit.bit_length()
+                return True
+            # ... and undo it
+            rows[row] ^= bit
+            cols[col] ^= bit
+            boxes[box] ^= bit
+        return False
+
+    def solve(self):
+        """
+        Solves sudoku
+
+        Returns:
+            solution (list):
+                list of answers to Sudoku, None if there is no solution
+        """
+        self.nodes = 0
+        if not self._setup() or not self._search(0):
+            return None
+        self.board = [self.cells[row * 9:row * 9 + 9] for row in range(9)]
+        return self.board
+
+
+def _cage_digit_table():
+    """
+    Returns:
+        table (list): table[(available * 10 + k) * 46 + total] is the mask of digits that appear in
+            some set of k distinct digits from mask available summing to total
+    """
+    table = [0] * (512 * 10 * 46)
+    for subset in range(512):
+        k = POPCOUNT[subset]
+        total = sum(digit for digit in range(1, 10) if subset >> (digit - 1) & 1)
+        # add subset to every available mask containing it
+        rest = ALL_DIGITS & ~subset
+        extra = rest
+        while True:
+            table[((subset | extra) * 10 + k) * 46 + total] |= subset
+            if extra == 0:
+                break
+            extra = (extra - 1) & rest
+    return table
+
+
+CAGE_DIGITS = _cage_digit_table()
+
+
+class KillerBitboardSudoku(BitboardSudoku):
+    """
+    Killer sudoku solver - BitboardSudoku search with running cage sums
+
+    Each cage keeps its remaining total, the digits already used in it and its
+    number of empty cells. A cell only offers digits that appear in some set of
+    unused digits that fills the cage's empty cells to exactly the remaining
+    total, so a branch is cut as soon as its cage total becomes unreachable.
+
+    Attributes:
+        solve (method): solves sudoku
+        nodes (int): number of guesses tried by the last solve
+    """
+    def __init__(self, cage_constraints, input_board=None, candidates=None):
+        """
+        Args:
+            cage_constraints (list): Lists of tuples 'cage constraints'
+                e.g. if cells [0,0], [0,1], and [0,2] sum to 12 would be
+                (12, [[0,0],[0,1],[0,2]])
+            input_board (list): optional starting board, zeros represent missing
+            candidates (list): optional 81 masks (bit d - 1 for digit d) of the digits
+                each cell may still take, e.g. after logic solving
+        """
+        super().__init__(input_board if input_board is not None else [[0] * 9 for _ in range(9)])
+        self.cage_constraints = cage_constraints
+        self.candidates = list(candidates) if candidates is not None else [ALL_DIGITS] * 81
+
+    def _setup(self):
+        """
+        Builds the digit masks, the cage sums and the list of empty cells
+
+        Returns:
+            valid_flag (bool): False if the givens already break a row/column/box/cage rule
+        """
+        if not super()._setup():
+            return False
+        self.cage_of = [-1] * 81
+        self.cage_left = []
+        self.cage_used = []
+        self.cage_free = []
+        for cage, (target_sum, cells) in enumerate(self.cage_constraints):
+            left, used, free = target_sum, 0, 0
+            for row, col in cells:
+                index = row * 9 + col
+                self.cage_of[index] = cage
+                value = self.cells[index]
+                if value == 0:
+                    free += 1
+                elif used >> (value - 1) & 1:
+                    return False
+                else:
+                    used |= 1 << (value - 1)
+                    left -= value
+            if not 0 <= left <= 45 or (free and not CAGE_DIGITS[((ALL_DIGITS & ~used) * 10 + free) * 46 + left]):
+                return False
+            if not free and left:
+                return False
+            self.cage_left.append(left)
+            self.cage_used.append(used)
+            self.cage_free.append(free)
+        for index, value in enumerate(self.cells):
+            if value and not self.candidates[index] >> (value - 1) & 1:
+                return False
+        return True
+
+    def _free_digits(self, index):
+        """Digits cell index may take: free in its row/column/box and compatible with its cage"""
+        free = self.candidates[index] & ~(
+            self.rows[index // 9] | self.cols[index % 9] | self.boxes[BOX_OF[index]])
+        cage = self.cage_of[index]
+        if cage < 0:
+            return free
+        return free & CAGE_DIGITS[((ALL_DIGITS & ~self.cage_used[cage]) * 10 + self.cage_free[cage]) * 46 + self.cage_left[cage]]
+
+    def _search(self, depth):
+        """
+        Fills self.empty[depth:] - recursive
+
+        Returns:
+            solved_flag (bool): True once every empty cell is filled
+        """
+        empty = self.empty
+        if depth == len(empty):
+            return True
+        rows, cols, boxes = self.rows, self.cols, self.boxes
+        cage_left, cage_used, cage_free = self.cage_left, self.cage_used, self.cage_free
+
+        # Minimum remaining values over the cage-filtered candidates
+        best, best_free, best_count = depth, 0, 10
+        for position in range(depth, len(empty)):
+            free = self._free_digits(empty[position])
+            count = POPCOUNT[free]
+            if count < best_count:
+                best, best_free, best_count = position, free, count
+                if count <= 1:
+                    break
+        if best_count == 0:
+            return False
+
+        empty[depth], empty[best] = empty[best], empty[depth]
+        index = empty[depth]
+        row, col, box, cage = index // 9, index % 9, BOX_OF[index], self.cage_of[index]
+        free = best_free
+        while free:
+            bit = free & -free
+            free ^= bit
+            value = bit.bit_length()
+            self.nodes += 1
+            rows[row] |= bit
+            cols[col] |= bit
+            boxes[box] |= bit
+            if cage >= 0:
+                cage_used[cage] |= bit
+                cage_left[cage] -= value
+                cage_free[cage] -= 1
+            if self._search(depth + 1):
+                self.cells[index] = value
+                return True
+            rows[row] ^= bit
+            cols[col] ^= bit
+            boxes[box] ^= bit
+            if cage >= 0:
+                cage_used[cage] ^= bit
+                cage_left[cage] += value
+                cage_free[cage] += 1
+        return False
@@ -1,29 +1,150 @@
-from killer_sudoku import KillerSudoku
-from man_solver import KillerSudokuSolver
-from KillerSudokuApp import KillerSudokuApp
-import requests
-import re
 import argparse
+import json
+import os
+import re
+import threading
+import time
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
 
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-class KillerCient:
-    def __init__(self):
-        self.baseAddress = "https://www.dailykillersudoku.com"
+try:
+    from .killer_sudoku import KillerSudoku
+    from .man_solver import KillerSudokuSolver
+    from .KillerSudokuApp import KillerSudokuApp
+except ImportError:  # run as a script from inside killer_sudoku
+    from killer_sudoku import KillerSudoku
+    from man_solver import KillerSudokuSolver
+    from KillerSudokuApp import KillerSudokuApp
 
-    def get_killer_sudoku(self, puzzleId):
-        response = requests.get("{}/puzzle/{}".format(self.baseAddress, puzzleId))
+DEFAULT_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "killer_sudoku")
 
-        content = str(response.content)
+# '/' may come JSON-escaped as '\/'
+BOARD_PATTERN = re.compile(r'board_base64":"([A-Za-z\d+/=\\]*)","solution_base64":"([A-Za-z\d+/=\\]*)"')
 
-        matches = re.findall(
-            r'board_base64":"([a-zA-Z\d=]*)","solution_base64":"([a-zA-Z\d=]*)"',
-            content,
-        )
 
-        boardBase64, solutionBase64 = matches[0]
+class RateLimiter:
+    """
+    Spaces out calls to acquire() across threads to at most rate per second
+    """
 
-        killer = KillerSudoku(boardBase64)
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.lock = threading.Lock()
+        self.next_time = 0.0
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            wait = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class KillerCient:
+    """
+    Downloads puzzles from dailykillersudoku.com
+
+    One pooled requests session is shared by all threads, requests are retried
+    on connection errors and 5xx answers, and every downloaded page is stored as
+    <cache>/<id>.json with its board_base64 and solution_base64, so a puzzle is
+    fetched from the network once.
+
+    Args:
+        baseAddress (str): site to download from, e.g. a local stub server in tests
+        cache (str): cache directory, None to disable the cache
+        rate (float): most requests per second over all threads, 0 for no limit
+        workers (int): threads (and pooled connections) used by fetch_many
+        retries (int): retries of a failed request
+        timeout (float): seconds to wait for an answer
+    """
+
+    def __init__(self, baseAddress="https://www.dailykillersudoku.com", cache=DEFAULT_CACHE, rate=2.0, workers=4, retries=3, timeout=10.0):
+        self.baseAddress = baseAddress.rstrip("/")
+        self.cache = cache
+        self.workers = workers
+        self.timeout = timeout
+        self.limiter = RateLimiter(rate)
+        self.session = requests.Session()
+        retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _cache_path(self, puzzleId):
+        return os.path.join(self.cache, f"{puzzleId}.json")
+
+    def _read_cache(self, puzzleId):
+        if self.cache is None:
+            return None
+        try:
+            with open(self._cache_path(puzzleId)) as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return None
+        return entry["board_base64"], entry["solution_base64"]
+
+    def _write_cache(self, puzzleId, boardBase64, solutionBase64):
+        if self.cache is None:
+            return
+        os.makedirs(self.cache, exist_ok=True)
+        path = self._cache_path(puzzleId)
+        # write then rename, so a concurrent or interrupted run never sees half a file
+        temp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp, "w") as file:
+            json.dump({"id": puzzleId, "board_base64": boardBase64, "solution_base64": solutionBase64}, file)
+        os.replace(temp, path)
+
+    def fetch(self, puzzleId):
+        """
+        Returns:
+            boardBase64, solutionBase64 (str): from the cache, or downloaded and cached
+
+        Raises:
+            requests.HTTPError: the site answered with an error status
+            LookupError: the page holds no puzzle
+        """
+        cached = self._read_cache(puzzleId)
+        if cached is not None:
+            return cached
+
+        self.limiter.acquire()
+        response = self.session.get("{}/puzzle/{}".format(self.baseAddress, puzzleId), timeout=self.timeout)
+        response.raise_for_status()
+
+        match = BOARD_PATTERN.search(response.text)
+        if match is None:
+            raise LookupError(f"No board_base64 in puzzle page {puzzleId}")
+        boardBase64, solutionBase64 = (value.replace("\\", "") for value in match.groups())
+
+        self._write_cache(puzzleId, boardBase64, solutionBase64)
+        return boardBase64, solutionBase64
+
+    def fetch_many(self, puzzleIds):
+        """
+        Fetches puzzles on workers threads, e.g. fetch_many(range(26000, 26100))
+
+        Yields:
+            puzzleId, boardBase64, solutionBase64: in the order of puzzleIds; both strings
+            are None for a puzzle that failed to download
+        """
+        def fetch_or_none(puzzleId):
+            try:
+                return (puzzleId, *self.fetch(puzzleId))
+            except (requests.RequestException, LookupError):
+                return puzzleId, None, None
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            yield from executor.map(fetch_or_none, puzzleIds)
+
+    def get_killer_sudoku(self, puzzleId):
+        boardBase64, solutionBase64 = self.fetch(puzzleId)
+
+        killer = KillerSudoku(boardBase64, solutionBase64)
 
         return killer
 
@@ -32,28 +153,53 @@ if __name__ == "__main__":
     # 使用 argparse 读取命令行参数
     parser = argparse.ArgumentParser(description="Solve a Killer Sudoku puzzle by ID.")
     parser.add_argument(
-        "--id", type=int, required=True,
+        "--id", type=int,
         help="The Killer Sudoku puzzle ID"
     )
+    parser.add_argument(
+        "--download", type=int, nargs=2, metavar=("FIRST", "LAST"),
+        help="Download puzzles FIRST..LAST into the cache instead of solving"
+    )
+    parser.add_argument(
+        "--cache", default=DEFAULT_CACHE,
+        help="Directory of downloaded puzzles"
+    )
+    parser.add_argument(
+        "--rate", type=float, default=2.0,
+        help="Most requests per second"
+    )
     args = parser.parse_args()
-    sudoku_id = args.id
+    if args.id is None and args.download is None:
+        parser.error("one of --id or --download is required")
+
+    client = KillerCient(cache=args.cache, rate=args.rate)
 
-    client = KillerCient()
+    if args.download:
+        first, last = args.download
+        fetched = sum(board is not None for _, board, _ in client.fetch_many(range(first, last + 1)))
+        print(f"Downloaded {fetched}/{last - first + 1} puzzles into {args.cache}")
+        raise SystemExit
+
+    sudoku_id = args.id
     killer = client.get_killer_sudoku(sudoku_id)
 
     print(f"Pulling Sudoku: {sudoku_id}")
 
-    killer_solver = KillerSudokuSolver(cage_constraints=killer.cages)
+    killer_solver = KillerSudokuSolver(cage_constraints=killer.cages, trace="compact")
 
     print(f"Solving Sudoku: {sudoku_id}")
     Done, steps = killer_solver.solve()
     if Done:
         print(f"Solved succeed by {len(steps)} steps")
+        if killer.solution is not None:
+            print(f"Matches published solution: {killer.verify(killer_solver.solution())}")
+        elif killer.solutionEncoding:
+            print("Published solution is in an unknown layout, not compared")
     else:
         print(f"Solved failed by {len(steps)} steps")
 
     print("Loading Interface")
     root = tk.Tk()
-    app = KillerSudokuApp(root, steps)
+    app = KillerSudokuApp(root, steps, killer.cages)
     root.mainloop()
 
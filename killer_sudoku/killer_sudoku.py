@@ -1,12 +1,12 @@
 import base64
 
+import numpy as np
+
 boardTypes = {0: "SUDOKU", 1: "KILLER_SUDOKU", 2: "GREATER_THAN_KILLER_SUDOKU"}
 
 
 class KillerSudoku:
-    def __init__(
-        self, boardEncoding
-    ):  # Extend this later to also input and use the solution encoding
+    def __init__(self, boardEncoding, solutionEncoding=None):
         boardDecoded = self.decode_base64_input(boardEncoding)
 
         boardType = self.get_board_type(boardDecoded)
@@ -17,14 +17,19 @@ class KillerSudoku:
 
         self.parse_initial_board_state(boardDecoded)
 
+        # published solution_base64 as scraped, and its 9x9 digits, or None when
+        # missing or not in the layout decode_solution knows
+        self.solutionEncoding = solutionEncoding
+        try:
+            self.solution = decode_solution(solutionEncoding) if solutionEncoding else None
+        except ValueError:
+            self.solution = None
+
     def decode_base64_input(self, base64Input):
         base64_bytes = base64Input.encode("ascii")
         message_bytes = base64.b64decode(base64_bytes)
         # Unpack byte code to integer values
-        t = []
-        for messageByte in message_bytes:
-            t.append(messageByte)
-        return t
+        return list(message_bytes)
 
     def get_board_type(self, boardDecoded):
         typeCode = boardDecoded[0]
@@ -45,7 +50,7 @@ class KillerSudoku:
         cageValues = boardDecoded[164:]
 
         # Now to initial the list of cages
-        self.startingGrid = [[0] * 9] * 9
+        self.startingGrid = [[0] * 9 for _ in range(9)]
         self.cages = [(k, []) for k in cageValues]
         for row in range(9):
             for column in range(9):
@@ -57,6 +62,227 @@ class KillerSudoku:
                 self.cages[cageAssignment][1].append([row, column])
                 self.startingGrid[row][column] = initialValue
 
+    def verify(self, solution):
+        """
+        Returns:
+            valid (bool): solution satisfies the sudoku, cage and given constraints,
+                and equals the published solution when there is one
+        """
+        boards = boards_from_cages([self.cages], [self.startingGrid])
+        expected = None if self.solution is None else [self.solution]
+        return bool(verify_solutions([solution], boards, expected)["valid"][0])
+
+
+BASE64_ALPHABET = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+BASE64_VALUES = np.full(256, 255, dtype=np.uint8)
+BASE64_VALUES[np.frombuffer(BASE64_ALPHABET, dtype=np.uint8)] = np.arange(64, dtype=np.uint8)
+BASE64_VALUES[ord("=")] = 0
+# popcount of cage bit sums: at most 9 cells of 1 << 10 (out-of-range digits are clipped to 10)
+BIT_COUNTS = np.array([bin(value).count("1") for value in range(1 << 14)], dtype=np.int64)
+
+
+def _decode_base64_groups(encodings):
+    """
+    Groups the strings by length and decodes each group as one (rows, bytes) uint8 array
+
+    Returns:
+        groups (list): (rows, data, sizes) with the indices of the strings in the group,
+            their decoded bytes and the number of bytes of each before padding
+    """
+    lengths = np.fromiter(map(len, encodings), dtype=np.int64, count=len(encodings))
+    groups = []
+    for length in np.unique(lengths):
+        rows = np.flatnonzero(lengths == length)
+        text = "".join(encodings[row] for row in rows).encode("ascii")
+        raw = np.frombuffer(text, dtype=np.uint8).reshape(len(rows), length)
+        sextets = BASE64_VALUES[raw]
+        if length % 4 or (sextets == 255).any():
+            raise ValueError("Invalid base64 encoding")
+        quads = sextets.reshape(len(rows), -1, 4).astype(np.uint32)
+        triples = quads[..., 0] << 18 | quads[..., 1] << 12 | quads[..., 2] << 6 | quads[..., 3]
+        data = np.stack([triples >> 16, triples >> 8, triples], axis=-1).astype(np.uint8).reshape(len(rows), -1)
+        padding = (raw[:, -1] == ord("=")).astype(np.int64) + (raw[:, -2] == ord("="))
+        groups.append((rows, data, data.shape[1] - padding))
+    return groups
+
+
+def decode_boards(boardEncodings):
+    """
+    Decodes many board_base64 strings at once with NumPy
+
+    Strings of equal length are stacked into one uint8 array (np.frombuffer)
+    and their base64 is decoded with array operations, so the cost per board
+    is a handful of vectorized steps instead of Python loops over bytes/cells.
+
+    Returns:
+        boards (dict): NumPy arrays over the N boards
+            givens (N, 9, 9): starting values, 0 for empty
+            cage_ids (N, 9, 9): cage index of each cell
+            cage_sums (N, C): cage totals, padded with 0 up to the largest cage count C
+            cage_counts (N,): number of cages of each board
+            check (N,): second header byte
+    """
+    boardEncodings = list(boardEncodings)
+    count = len(boardEncodings)
+    decoded = _decode_base64_groups(boardEncodings)
+
+    type_codes = np.concatenate([data[:, 0] for _, data, _ in decoded]) if count else np.zeros(0)
+    if (type_codes != 1).any():
+        raise ValueError("Only KILLER_SUDOKU boards (type code 1) can be decoded")
+
+    byte_counts = np.zeros(count, dtype=np.int64)
+    for rows, _, sizes in decoded:
+        byte_counts[rows] = sizes
+    cage_counts = byte_counts - 164
+    boards = {
+        "givens": np.zeros((count, 9, 9), dtype=np.uint8),
+        "cage_ids": np.zeros((count, 9, 9), dtype=np.uint8),
+        "cage_sums": np.zeros((count, int(cage_counts.max(initial=0))), dtype=np.uint8),
+        "cage_counts": cage_counts,
+        "check": np.zeros(count, dtype=np.uint8),
+    }
+    for rows, data, sizes in decoded:
+        cells = data[:, 2:164].reshape(len(rows), 81, 2)
+        boards["givens"][rows] = cells[:, :, 0].reshape(-1, 9, 9)
+        boards["cage_ids"][rows] = cells[:, :, 1].reshape(-1, 9, 9)
+        boards["check"][rows] = data[:, 1]
+        width = min(data.shape[1] - 164, boards["cage_sums"].shape[1])
+        sums = data[:, 164:164 + width]
+        # zero the bytes that belong to base64 padding of shorter boards
+        sums = np.where(np.arange(width) < (sizes - 164)[:, None], sums, 0)
+        boards["cage_sums"][rows, :width] = sums
+    return boards
+
+
+def boards_from_cages(cageConstraints, givens=None):
+    """
+    Builds decode_boards arrays from puzzles in the cage_constraints format
+
+    Args:
+        cageConstraints (list): cage constraints of each of the N puzzles
+        givens (list): optional 9x9 starting values of each puzzle
+
+    Returns:
+        boards (dict): same keys as decode_boards, check is 0
+    """
+    count = len(cageConstraints)
+    cage_counts = np.array([len(cages) for cages in cageConstraints], dtype=np.int64)
+    boards = {
+        "givens": np.zeros((count, 9, 9), dtype=np.uint8) if givens is None else np.array(givens, dtype=np.uint8).reshape(count, 9, 9),
+        "cage_ids": np.zeros((count, 9, 9), dtype=np.uint8),
+        "cage_sums": np.zeros((count, int(cage_counts.max(initial=0))), dtype=np.uint8),
+        "cage_counts": cage_counts,
+        "check": np.zeros(count, dtype=np.uint8),
+    }
+    for index, cages in enumerate(cageConstraints):
+        for cageId, (cageSum, cells) in enumerate(cages):
+            boards["cage_sums"][index, cageId] = cageSum
+            for row, column in cells:
+                boards["cage_ids"][index, row, column] = cageId
+    return boards
+
+
+def board_cages(boards, index):
+    """
+    Returns:
+        cages (list): cage constraints [(sum, [[row, col], ...]), ...] of board index of decode_boards
+    """
+    cage_ids = boards["cage_ids"][index].ravel()
+    order = np.argsort(cage_ids, kind="stable")
+    starts = np.searchsorted(cage_ids[order], np.arange(boards["cage_counts"][index] + 1))
+    return [
+        (int(boards["cage_sums"][index][cage]), [[int(cell) // 9, int(cell) % 9] for cell in order[starts[cage]:starts[cage + 1]]])
+        for cage in range(boards["cage_counts"][index])
+    ]
+
+
+def _solution_digits(data, sizes):
+    """
+    Picks the 81 digits out of decoded solution bytes. solution_base64 uses the
+    board_base64 layout (type code, check byte, a (value, cage id) pair per cell,
+    then the cage sums) with every value filled in; anything else is rejected.
+    """
+    if not (sizes > 164).all() or (data[:, 0] != 1).any():
+        raise ValueError("solution_base64 is not in the KILLER_SUDOKU board layout")
+    digits = data[:, 2:164:2]
+    if ((digits < 1) | (digits > 9)).any():
+        raise ValueError("Solution digits must be 1-9")
+    return digits.reshape(-1, 9, 9)
+
+
+def decode_solutions(solutionEncodings):
+    """
+    Decodes many solution_base64 strings at once, see _solution_digits for the layout
+
+    Returns:
+        solutions (np.ndarray): (N, 9, 9) uint8 digits
+    """
+    solutionEncodings = list(solutionEncodings)
+    solutions = np.zeros((len(solutionEncodings), 9, 9), dtype=np.uint8)
+    for rows, data, sizes in _decode_base64_groups(solutionEncodings):
+        # padding lets strings of one length decode to different byte counts
+        for size in np.unique(sizes):
+            same = sizes == size
+            solutions[rows[same]] = _solution_digits(data[same], sizes[same])
+    return solutions
+
+
+def decode_solution(solutionEncoding):
+    """
+    Returns:
+        solution (list): 9x9 list of the digits of one solution_base64 string
+    """
+    return decode_solutions([solutionEncoding])[0].tolist()
+
+
+def verify_solutions(solutions, boards, expected=None):
+    """
+    Checks a batch of solved grids with NumPy, e.g. the output of any solver
+    against decode_boards and decode_solutions of the scraped puzzles
+
+    A digit d is counted as the bit 1 << d. Nine digits are distinct and cover
+    1-9 exactly when their bits add up to 0b1111111110, and the digits of a cage
+    are distinct exactly when the sum of their bits has one set bit per cell
+    (a repeated digit carries into a higher bit and loses one).
+
+    Args:
+        solutions (array-like): (N, 9, 9) grids, unsolved cells as 0
+        boards (dict): decode_boards output for the same N puzzles
+        expected (array-like): (N, 9, 9) published solutions, optional
+
+    Returns:
+        checks (dict): (N,) bool arrays rows, columns, boxes, cages, givens,
+            matches (only with expected) and valid, their conjunction
+    """
+    grids = np.asarray(solutions, dtype=np.int64).reshape(-1, 9, 9)
+    count = len(grids)
+    in_range = ((grids >= 1) & (grids <= 9)).all(axis=(1, 2))
+    bits = np.left_shift(1, np.clip(grids, 0, 10))
+    boxes = bits.reshape(count, 3, 3, 3, 3).transpose(0, 1, 3, 2, 4).reshape(count, 9, 9)
+    checks = {
+        "rows": in_range & (bits.sum(axis=2) == 0b1111111110).all(axis=1),
+        "columns": in_range & (bits.sum(axis=1) == 0b1111111110).all(axis=1),
+        "boxes": in_range & (boxes.sum(axis=2) == 0b1111111110).all(axis=1),
+    }
+
+    width = boards["cage_sums"].shape[1]
+    slots = (boards["cage_ids"].reshape(count, 81).astype(np.int64) + np.arange(count)[:, None] * width).ravel()
+    totals = np.bincount(slots, weights=grids.ravel(), minlength=count * width).reshape(count, width)
+    bit_totals = np.bincount(slots, weights=bits.ravel(), minlength=count * width).astype(np.int64).reshape(count, width)
+    sizes = np.bincount(slots, minlength=count * width).reshape(count, width)
+    used = np.arange(width) < np.asarray(boards["cage_counts"])[:, None]
+    cage_ok = (totals == boards["cage_sums"]) & (BIT_COUNTS[bit_totals] == sizes)
+    checks["cages"] = in_range & (cage_ok | ~used).all(axis=1)
+
+    givens = boards["givens"]
+    checks["givens"] = ((givens == 0) | (givens == grids)).all(axis=(1, 2))
+    valid = checks["rows"] & checks["columns"] & checks["boxes"] & checks["cages"] & checks["givens"]
+    if expected is not None:
+        checks["matches"] = (np.asarray(expected).reshape(-1, 9, 9) == grids).all(axis=(1, 2))
+        valid &= checks["matches"]
+    checks["valid"] = valid
+    return checks
+
 
 if __name__ == "__main__":
     boardEncoding = "AZoAAAAAAAIAAwADAAQAAQABAAYABwAHAAIAAwAKAAQABQAFAAYABwAIAAgACQAKAAQACwAFAAYADAAMAA4ACQAQABEACwANAA0AEwAMAA4ADwAQABEAEgAUAA0AEwATABUADwAQABcAEgAUABQAGgAbABUAHAAWABcAGAAYABkAGgAbABsAHAAWAB0AHgAZABkAGgAfAB8AHAAdAB0AHgAgACAICQgMDxMQDg8KDAcYEQgMEwQPDAcICg4MEg8NDA8HCgg="
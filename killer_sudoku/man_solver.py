@@ -1,30 +1,245 @@
+import time
 import matplotlib.pyplot as plt
-from itertools import permutations
-from typing import List, Set
+import numpy as np
+from array import array
+from bisect import bisect_right
+from collections import Counter, deque
+from functools import lru_cache
+from itertools import combinations
+from operator import attrgetter
+from typing import Iterable, List, Set
+
+try:
+    from .dfs_solver import KillerBitboardSudoku
+except ImportError:  # 以脚本方式在 killer_sudoku 目录下运行
+    from dfs_solver import KillerBitboardSudoku
+
+# 候选数位掩码: 第 n 位表示数字 n (1-9)
+ALL_DIGITS = 0b1111111110
+DIGIT_BITS = [1 << number for number in range(10)]
+POPCOUNT = [bin(mask).count("1") for mask in range(1 << 10)]
+MASK_DIGITS = [tuple(number for number in range(1, 10) if mask >> number & 1) for mask in range(1 << 10)]
+BIT_INDICES = [tuple(index for index in range(10) if mask >> index & 1) for mask in range(1 << 10)]  # 单元内位置掩码的置位下标
+
+# 求解步骤的技巧编号 (紧凑记录中保存编号而非文字)
+TECHNIQUES = ("init", "update", "reduce_in_row", "reduce_in_column", "reduce_in_box", "reduce_in_cage", "naked_subset",
+              "hidden_subset", "search")
+TECHNIQUE_ID = {name: index for index, name in enumerate(TECHNIQUES)}
+
+# 单元格下标 index = row * 9 + col; 行/列/宫 (单元编号 0-26) 的单元格下标, 以及每个单元格所在的 (单元编号, 单元内位置位)
+ROW_CELLS = tuple(tuple(row * 9 + col for col in range(9)) for row in range(9))
+COL_CELLS = tuple(tuple(row * 9 + col for row in range(9)) for col in range(9))
+BOX_CELLS = tuple(tuple(row * 9 + col
+                        for row in range(box_row * 3, box_row * 3 + 3)
+                        for col in range(box_col * 3, box_col * 3 + 3))
+                  for box_row in range(3) for box_col in range(3))
+UNIT_CELLS = ROW_CELLS + COL_CELLS + BOX_CELLS
+CELL_UNITS = tuple(tuple((unit, 1 << cells.index(index)) for unit, cells in enumerate(UNIT_CELLS) if index in cells)
+                   for index in range(81))
+CELL_BOX = tuple(index // 27 * 3 + index % 9 // 3 for index in range(81))
+ALL_CELLS = (1 << 81) - 1
+
+
+def digits_to_mask(numbers:Iterable[int]) -> int:
+    mask = 0
+    for number in numbers:
+        mask |= 1 << number
+    return mask
+
+
+def mask_to_digits(mask:int) -> Set[int]:
+    return set(MASK_DIGITS[mask])
+
+
+def popcount(mask:int) -> int:
+    return POPCOUNT[mask]
+
+
+def lowest_bit(mask:int) -> int:
+    return mask & -mask
+
+
+def lowest_digit(mask:int) -> int:
+    return lowest_bit(mask).bit_length() - 1
+
+
+def count_bits(mask:int) -> int:
+    return bin(mask).count("1")
+
+
+def bit_indices(mask:int):
+    """依次返回掩码中每个置位的下标 (用于 81 位单元格掩码)"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def intersect_masks(masks:Iterable[int]) -> int:
+    result = ALL_DIGITS
+    for mask in masks:
+        result &= mask
+    return result
+
+
+def union_masks(masks:Iterable[int]) -> int:
+    result = 0
+    for mask in masks:
+        result |= mask
+    return result
+
+
+def build_combination_table():
+    """
+    枚举 1-9 的全部 512 个子集, 按 (和, 数字个数) 归类
+
+    Returns:
+        table (dict): (sum, size) -> tuple of combination masks
+    """
+    table = {}
+    for mask in range(0, ALL_DIGITS + 1, 2):
+        digits = MASK_DIGITS[mask]
+        table.setdefault((sum(digits), len(digits)), []).append(mask)
+    return {key: tuple(masks) for key, masks in table.items()}
+
+
+# 所有 Cage 共享的笼子组合表, 模块导入时构建一次
+COMBINATION_TABLE = build_combination_table()
+
+
+@lru_cache(maxsize=None)
+def cage_combinations(sum:int, size:int, allowed:int=ALL_DIGITS):
+    """
+    Returns:
+        combinations (tuple): masks of the digit combinations of `size` distinct
+            digits adding up to `sum`, using only digits in `allowed`
+    """
+    return tuple(mask for mask in COMBINATION_TABLE.get((sum, size), ()) if not mask & ~allowed)
+
+
+def subset_unions(items, max_size):
+    """
+    枚举 2 到 max_size 个元素的子集, 找出掩码并集的位数恰好等于子集大小的子集.
+    并集位数超过 max_size 时剪枝, 不再扩展.
+
+    Args:
+        items (list): (键位, 掩码); 裸子集为 (单元格位置位, 候选数掩码), 隐子集为 (数字位, 位置掩码)
+
+    Returns:
+        subsets (list): (子集键位之并, 掩码之并)
+    """
+    found = []
+    if len(items) < 2:
+        return found
+
+    def extend(start, keys, union, size):
+        for index in range(start, len(items)):
+            key, mask = items[index]
+            merged = union | mask
+            if POPCOUNT[merged] > max_size:
+                continue
+            if size and POPCOUNT[merged] == size + 1:
+                found.append((keys | key, merged))
+            if size + 1 < max_size:
+                extend(index + 1, keys | key, merged, size + 1)
+
+    extend(0, 0, 0, 0)
+    return found
+
+
+def matching_support(digits, masks):
+    """
+    找出组合中每个数字可以放入哪些单元格, 且仍能构成一个完整的分配 (完美匹配)
+
+    按数字逐层对已占用单元格集合做状态压缩 DP, 先正向求可达状态,
+    再从满集合反向保留能走到终点的状态, 不需要枚举排列.
+
+    Args:
+        digits (tuple): 组合中的数字, 个数与单元格数相同
+        masks (list): 每个单元格的候选数掩码
+
+    Returns:
+        support (list): 每个单元格在某个合法分配中可取的数字掩码;
+            组合无法分配时返回 None
+    """
+    size = len(masks)
+    layers = [{0}]
+    for number in digits:
+        bit = 1 << number
+        fits = [1 << index for index in range(size) if masks[index] & bit]
+        layer = {used | cell for used in layers[-1] for cell in fits if not used & cell}
+        if not layer:
+            return None
+        layers.append(layer)
+
+    support = [0] * size
+    alive = layers.pop()
+    for number in reversed(digits):
+        bit = 1 << number
+        layer = layers.pop()
+        previous = set()
+        for used in alive:
+            for index in range(size):
+                cell = 1 << index
+                if used & cell and masks[index] & bit and used ^ cell in layer:
+                    previous.add(used ^ cell)
+                    support[index] |= bit
+        alive = previous
+    return support
+
 
 class Cell:
+    __slots__ = ("row", "col", "index", "box", "cage", "candidates", "solved")
+
     def __init__(self, row, col, cage=None):
         self.row = row
         self.col = col
+        self.index = row * 9 + col
+        self.box = CELL_BOX[self.index]
         self.cage = cage
         self.candidates = set(range(1, 10))
         self.solved = False
 
+    @property
+    def mask(self):
+        return digits_to_mask(self.candidates)
+
+    def has(self, number:int):
+        return number in self.candidates
+
+    def count(self):
+        return len(self.candidates)
+
+    def value(self):
+        return next(iter(self.candidates), -1)  # 与 BitCell 一致, 无候选数 (矛盾) 时为 -1
+
+    def copy_candidates(self):
+        return self.candidates.copy()
+
     def exclude(self, candidates:Set):
         self.candidates -= candidates
 
+    def exclude_number(self, number:int):
+        self.candidates.discard(number)
+
     def set_cage(self, cage:int):
         self.cage = cage
 
     def set_candidates(self, candidates:Set):
         self.candidates = candidates
 
+    def set_mask(self, mask:int):
+        self.candidates = set(MASK_DIGITS[mask])
+
     def solve(self):
         self.solved = True
 
     def intersection_candidates(self,candidates):
         self.candidates &= candidates
 
+    def intersection_mask(self, mask:int):
+        self.candidates &= mask_to_digits(mask)
+
     def __repr__(self):
         if self.solved:
             return f"Cell({self.row+1}, {self.col+1}):{self.candidates}"
@@ -32,129 +247,713 @@ class Cell:
             return f"Cell({self.row+1}, {self.col+1}):{self.candidates}"
 
 
+class BitCell:
+    """候选数以 9 位整数掩码存储的单元格, 接口与 Cell 一致"""
+    __slots__ = ("row", "col", "index", "box", "cage", "mask", "solved")
+
+    def __init__(self, row, col, cage=None):
+        self.row = row
+        self.col = col
+        self.index = row * 9 + col
+        self.box = CELL_BOX[self.index]
+        self.cage = cage
+        self.mask = ALL_DIGITS
+        self.solved = False
+
+    @property
+    def candidates(self):
+        return set(MASK_DIGITS[self.mask])
+
+    @candidates.setter
+    def candidates(self, candidates:Set):
+        self.mask = digits_to_mask(candidates)
+
+    def has(self, number:int):
+        return self.mask & DIGIT_BITS[number]
+
+    def count(self):
+        return POPCOUNT[self.mask]
+
+    def value(self):
+        return lowest_digit(self.mask)
+
+    def copy_candidates(self):
+        return set(MASK_DIGITS[self.mask])
+
+    def exclude(self, candidates:Set):
+        self.mask &= ~digits_to_mask(candidates)
+
+    def exclude_number(self, number:int):
+        self.mask &= ~(1 << number)
+
+    def set_candidates(self, candidates:Set):
+        self.mask = digits_to_mask(candidates)
+
+    def set_mask(self, mask:int):
+        self.mask = mask
+
+    def intersection_candidates(self,candidates):
+        self.mask &= digits_to_mask(candidates)
+
+    def set_cage(self, cage:int):
+        self.cage = cage
+
+    def solve(self):
+        self.solved = True
+
+    def intersection_mask(self, mask:int):
+        self.mask &= mask
+
+    def __repr__(self):
+        return f"Cell({self.row+1}, {self.col+1}):{self.candidates}"
+
+
 class Cage:
+    """笼子: cells 为按单元格下标排序的元组, cell_mask 为单元格下标的 81 位掩码"""
+    __slots__ = ("ID", "sum", "cells", "cell_mask", "virtual", "combinations", "solved", "certain_number")
     instance_count = 0
 
-    def __init__(self, sum, cells:List[Cell], virtual=False):
+    def __init__(self, sum, cells:Iterable[Cell], virtual=False):
         self.ID = Cage.instance_count
         Cage.instance_count += 1
         self.sum = sum
-        self.cells = cells
+        self.cells = tuple(sorted(cells, key=attrgetter("index")))
+        self.cell_mask = union_masks(1 << cell.index for cell in self.cells)
         self.virtual = virtual
 
         if not virtual:
             for cell in self.cells:
                 cell.set_cage(self.ID)
 
-        def set_combinations(sum, count):
-            results = set()
-            def backtrack(start, path, target):
-                if len(path) == count and target == 0:
-                    results.add(tuple(path))
-                    return
-                for i in range(start, 10):
-                    if i > target:
-                        break
-                    backtrack(i + 1, path + [i], target - i)
-            backtrack(1, [], sum)
-            return results
-        self.combinations = set_combinations(self.sum, len(self.cells))  # Cage's possible number combination
-        self.number_dict = {num: self.cells for num in range(1, 10)}  # number's possible position in cage
-        self.certain_number = set()  # certain number in cage
+        masks = {cell.mask for cell in self.cells}
+        # Cage's possible number combination (as digit masks), 不含任何单元格都不允许的数字
+        self.combinations = set(cage_combinations(self.sum, len(self.cells), union_masks(masks)))
         self.solved = False
-        self.update()
+        if len(masks) == 1:
+            # 所有单元格候选数相同时任意排列都可行, 无需枚举排列
+            combination_mask = union_masks(self.combinations)
+            for cell in self.cells:
+                cell.intersection_mask(combination_mask)
+            self.update_numbers()
+        else:
+            self.update()
 
     def solve(self):
         self.solved = True
 
     def split(self, sum, cells):
-        return Cage(sum, cells), Cage(self.sum - sum, self.cells - cells)
+        part = Cage(sum, cells)
+        return part, Cage(self.sum - sum, [cell for cell in self.cells if not part.cell_mask >> cell.index & 1])
 
     @classmethod
     def virtual_cage(cls, sum, cells):
         return cls(sum, cells, virtual=True)
 
     def update(self):
-        def combination_check(combination:Set, cells:List[Cell]):
-            appeared_numbers = {cell: set() for cell in cells}
-            for number in combination:
-                matched = False
-                for cell in cells:
-                    if number in cell.candidates:
-                        matched = True
-                        appeared_numbers[cell].add(number)
-                        cells -= {cell}
-                        break
-                if not matched:
-                    return False, {cell: set() for cell in cells}
-            return True, appeared_numbers
-
-        cell_number = {cell: set() for cell in self.cells}
+        cells = self.cells
+        masks = [cell.mask for cell in cells]  # 每次更新只读取一次候选数
+        cell_number = [0] * len(cells)
 
         for combination in self.combinations.copy():
-            combination_is_possible = False
-            for perm in permutations(combination):
-                valid, appeared_numbers = combination_check(perm, self.cells.copy())
-                if valid:
-                    combination_is_possible = True
-                    for cell in self.cells:
-                        cell_number[cell].update(appeared_numbers[cell])
-            if not combination_is_possible:
+            support = matching_support(MASK_DIGITS[combination], masks)
+            if support is None:
                 self.combinations.remove(combination)
                 if self.combinations == set():
                     print(f"!!!{self}")
+            else:
+                for index, mask in enumerate(support):
+                    cell_number[index] |= mask
+
+        for cell, mask in zip(cells, cell_number):
+            cell.intersection_mask(mask)
+        self.update_numbers()
 
-        for cell in self.cells:
-            cell.intersection_candidates(cell_number[cell])
-        self.number_dict = {number: {cell for cell in self.cells if number in cell.candidates} for number in range(1, 10)}
-        self.certain_number = {number for number in range(1, 10) if all(number in combination for combination in self.combinations)}
+    def update_numbers(self):
+        self.certain_number = mask_to_digits(intersect_masks(self.combinations))  # certain number in cage
+
+    @property
+    def number_dict(self):
+        """number's possible position in cage"""
+        return {number: {cell for cell in self.cells if cell.has(number)} for number in range(1, 10)}
 
     def __repr__(self):
         if self.solved:
-            return f"Cage(ID={self.ID}, target_sum={self.sum}, cells={self.cells}, solution={self.combinations})"
+            return f"Cage(ID={self.ID}, target_sum={self.sum}, cells={self.cells}, solution={self.combination_digits()})"
         else:
-            return f"Cage(ID={self.ID}, target_sum={self.sum}, cells={self.cells}, combinations={self.combinations})"
+            return f"Cage(ID={self.ID}, target_sum={self.sum}, cells={self.cells}, combinations={self.combination_digits()})"
+
+    def combination_digits(self):
+        return {MASK_DIGITS[combination] for combination in self.combinations}
+
+
+class CageRegistry:
+    """
+    按 (单元格掩码, 和) 去重的笼子登记表
+
+    registry[cage_id] 可查到所有登记过的笼子 (包括已退役的), 迭代和 len() 只包含仍参与扫描的笼子.
+    """
+
+    def __init__(self):
+        self.by_id = {}  # cage.ID -> 笼子; 被判为重复的笼子 ID 指向已登记的同一个笼子
+        self.by_key = {}  # (cell mask, sum) -> 笼子
+        self.active = {}  # 仍参与扫描的笼子, 按登记顺序
+        self.cell_index = {}  # cell.index -> {cage.ID: 包含该单元格的活动笼子}
+        self.rejected = 0  # 被拒绝的重复或空笼子数
+        self.retired = 0
+
+    def add(self, cage):
+        """
+        Returns:
+            cage: 新登记的笼子, 或已登记的等价笼子; 空笼子返回 None
+        """
+        if not cage.cells:
+            self.rejected += 1
+            return None
+        existing = self.by_key.get((cage.cell_mask, cage.sum))
+        if existing is not None:
+            self.rejected += 1
+            self.by_id[cage.ID] = existing
+            if not cage.virtual:
+                for cell in cage.cells:
+                    cell.set_cage(existing.ID)
+            return existing
+        self.by_id[cage.ID] = cage
+        self.by_key[(cage.cell_mask, cage.sum)] = cage
+        self.active[cage.ID] = cage
+        for cell in cage.cells:
+            self.cell_index.setdefault(cell.index, {})[cage.ID] = cage
+        return cage
+
+    def retire(self, cage):
+        """不再扫描该笼子 (例如所有单元格都已解出), 但仍可按 ID 查到"""
+        if self.active.pop(cage.ID, None) is None:
+            return
+        self.retired += 1
+        for cell in cage.cells:
+            del self.cell_index[cell.index][cage.ID]
+
+    def cages_of(self, cell):
+        return list(self.cell_index.get(cell.index, {}).values())
+
+    def __getitem__(self, cage_id):
+        return self.by_id[cage_id]
+
+    def __contains__(self, cage):
+        return cage.ID in self.active
+
+    def __iter__(self):
+        return iter(list(self.active.values()))
+
+    def __len__(self):
+        return len(self.active)
+
+    def stats(self):
+        return {"active": len(self.active), "registered": len(self.by_key), "rejected": self.rejected, "retired": self.retired}
+
+
+def build_region_library():
+    """
+    45法则的区域库: 两两不相交的行/列/宫之并, 区域内数字和为 45 的倍数.
+    包括连续行带/列带、单个宫、2-3 个宫之并, 以及一行或一列加一个与之不相交的宫 (L 形).
+
+    Returns:
+        regions (list): (名称, 81 位单元格掩码), 按掩码去重
+    """
+    rows = [union_masks(1 << (row * 9 + col) for col in range(9)) for row in range(9)]
+    cols = [union_masks(1 << (row * 9 + col) for row in range(9)) for col in range(9)]
+    boxes = [union_masks(1 << ((box // 3 * 3 + r) * 9 + box % 3 * 3 + c) for r in range(3) for c in range(3))
+             for box in range(9)]
+    regions = []
+    for first in range(9):
+        for last in range(first, 9):
+            regions.append((f"rows {first+1}-{last+1}", union_masks(rows[first:last + 1])))
+    for first in range(9):
+        for last in range(first, 9):
+            regions.append((f"cols {first+1}-{last+1}", union_masks(cols[first:last + 1])))
+    for size in (1, 2, 3):
+        for group in combinations(range(9), size):
+            regions.append((f"box {'+'.join(str(box + 1) for box in group)}", union_masks(boxes[box] for box in group)))
+    for kind, units in (("row", rows), ("col", cols)):
+        for index, unit in enumerate(units):
+            for box, box_mask in enumerate(boxes):
+                if not unit & box_mask:
+                    regions.append((f"{kind} {index+1} + box {box+1}", unit | box_mask))
+    unique = {}
+    for name, mask in regions:
+        unique.setdefault(mask, name)
+    return [(name, mask) for mask, name in unique.items()]
+
+
+class RegionLibrary:
+    """
+    区域库的矩阵形式: cells[r, i] 表示单元格 i 在区域 r 中, 45 法则用矩阵运算一次算出
+    (需要重算的) 区域被各笼子覆盖的情况
+    """
+
+    def __init__(self, regions):
+        self.names = [name for name, _ in regions]
+        self.masks = [mask for _, mask in regions]
+        self.cells = np.array([[mask >> index & 1 for index in range(81)] for mask in self.masks], dtype=bool)
+        self.matrix = self.cells.astype(np.float32)
+        self.base = 5 * self.cells.sum(axis=1)  # 每 9 个单元格和为 45
+
+    def __len__(self):
+        return len(self.masks)
+
+    def affected(self, cells):
+        """
+        Args:
+            cells (np.ndarray): 81 个单元格的 bool 掩码
+
+        Returns:
+            regions (np.ndarray): 包含其中任一单元格的区域下标
+        """
+        return np.flatnonzero(self.cells[:, cells].any(axis=1))
+
+    def derived_cages(self, cage_of, cage_sums, values, cage_max, regions=None):
+        """
+        Args:
+            cage_of (np.ndarray): 每个单元格所在笼子的序号 0..n-1 (笼子互不重叠, 覆盖全盘)
+            cage_sums (np.ndarray): 每个笼子的和
+            values (np.ndarray): 每个单元格已解出的数字, 未解为 0
+            cage_max (int): 推出的笼子最多包含的未解单元格数
+            regions (np.ndarray): 只计算这些区域 (下标), None 为全部区域
+
+        Returns:
+            cages (list): 这些区域推出的 (sum, 单元格掩码), 去重后按单元格数从少到多排列
+        """
+        region_cells, matrix, base = self.cells, self.matrix, self.base
+        if regions is not None:
+            region_cells, matrix, base = region_cells[regions], matrix[regions], base[regions]
+        members = np.zeros((81, len(cage_sums)), dtype=np.float32)
+        members[np.arange(81), cage_of] = 1
+        counts = matrix @ members  # counts[r, k]: 笼子 k 落在区域 r 内的单元格数
+        touching = counts > 0
+        inside = counts == members.sum(axis=0)
+        # 内: 区域内未被完全包含的笼子覆盖的单元格; 外: 接触区域的笼子伸出区域的单元格
+        inner = region_cells & ~inside[:, cage_of]
+        outer = touching[:, cage_of] & ~region_cells
+        inner_sums = base - inside @ cage_sums - inner @ values
+        outer_sums = touching @ cage_sums - base - outer @ values
+        unsolved = values == 0
+        derived = set()
+        for cells, sums in ((inner, inner_sums), (outer, outer_sums)):
+            cells &= unsolved
+            sizes = cells.sum(axis=1)
+            for region in np.flatnonzero((sizes > 0) & (sizes <= cage_max)):
+                cage_mask = union_masks(1 << int(index) for index in np.flatnonzero(cells[region]))
+                derived.add((int(sums[region]), cage_mask))
+        return sorted(derived, key=lambda cage: (count_bits(cage[1]), cage[1], cage[0]))
+
+
+REGIONS = RegionLibrary(build_region_library())
+
+
+class Trace:
+    """
+    紧凑的求解步骤记录: 每步只保存 (单元格下标, 删去的候选数掩码, 技巧编号, 原因单元格下标),
+    访问某一步时再从初始掩码重放出完整棋盘. 与完整记录一样支持 len()、下标和迭代,
+    每一项为 {'board': 9x9 候选数集合, 'action': 说明文字}
+    """
+    CHECKPOINT = 64  # 每隔多少步缓存一次全部掩码, 随机访问最多重放这么多步
+
+    def __init__(self, masks):
+        self.initial = array("H", masks)
+        self.cells = array("B")
+        self.removed = array("H")
+        self.techniques = array("B")
+        self.numbers = array("B")  # 解出的数字, 0 表示排除
+        self.causes = []
+        self.solved_steps = array("I")  # 解出单元格的步骤号, 用于还原 "[k]Solved" 的序号
+        self.side_effects = {}  # 步骤号 -> ((下标, 删去的掩码), ...): 该步之前未单独记录的变化 (Cage.update 等)
+        self.pending = []
+        self.checkpoints = [self.initial]  # checkpoints[k]: 第 k * CHECKPOINT 步之后的掩码
+
+    def note(self, index:int, removed:int):
+        """记录不单独成步的候选数变化, 并入下一步"""
+        self.pending.append((index, removed))
+
+    def record(self, index:int, removed:int, technique:int, causes, number:int=0):
+        step = len(self.cells) + 1
+        if self.pending:
+            self.side_effects[step] = tuple(self.pending)
+            self.pending = []
+        self.cells.append(index)
+        self.removed.append(removed)
+        self.techniques.append(technique)
+        self.numbers.append(number)
+        self.causes.append(causes)
+        if number:
+            self.solved_steps.append(step)
+
+    def __len__(self):
+        return len(self.cells) + 1
+
+    def normalize(self, step:int) -> int:
+        if step < 0:
+            step += len(self)
+        if not 0 <= step < len(self):
+            raise IndexError(f"step {step} out of range")
+        return step
+
+    def changes(self, step:int):
+        """
+        Returns:
+            list: 第 step - 1 步到第 step 步之间的 [(单元格下标, 删去的掩码), ...]
+        """
+        step = self.normalize(step)
+        if step == 0:
+            return []
+        changes = list(self.side_effects.get(step, ()))
+        changes.append((self.cells[step - 1], self.removed[step - 1]))
+        return changes
+
+    def masks_at(self, step:int) -> List[int]:
+        """第 step 步之后 81 个单元格的候选数掩码, 顺带缓存经过的检查点"""
+        step = self.normalize(step)
+        checkpoint = min(step // self.CHECKPOINT, len(self.checkpoints) - 1)
+        masks = list(self.checkpoints[checkpoint])
+        for current in range(checkpoint * self.CHECKPOINT + 1, step + 1):
+            for index, removed in self.changes(current):
+                masks[index] &= ~removed
+            if current % self.CHECKPOINT == 0 and current // self.CHECKPOINT == len(self.checkpoints):
+                self.checkpoints.append(array("H", masks))
+        return masks
+
+    def action(self, step:int) -> str:
+        step = self.normalize(step)
+        if step == 0:
+            return "Initializing"
+        index, number = self.cells[step - 1], self.numbers[step - 1]
+        causes = [(cause // 9 + 1, cause % 9 + 1) for cause in self.causes[step - 1]]
+        info = f"[{TECHNIQUES[self.techniques[step - 1]]}] {causes}"
+        if number:
+            return f"[{bisect_right(self.solved_steps, step)}]Solved cell at ({index // 9 + 1}, {index % 9 + 1}): {number} \n{info}"
+        return f"Exclude {lowest_digit(self.removed[step - 1])} at ({index // 9 + 1},{index % 9 + 1}) \n{info}"
+
+    @staticmethod
+    def board_from_masks(masks):
+        return [[set(MASK_DIGITS[masks[row * 9 + col]]) for col in range(9)] for row in range(9)]
+
+    def __getitem__(self, step:int):
+        return {'board': self.board_from_masks(self.masks_at(step)), 'action': self.action(step)}
+
+    def __iter__(self):
+        masks = list(self.initial)
+        for step in range(len(self)):
+            for index, removed in self.changes(step):
+                masks[index] &= ~removed
+            yield {'board': self.board_from_masks(masks), 'action': self.action(step)}
+
+
+class Snapshot:
+    """
+    求解器状态的快照 (KillerSudokuSolver.snapshot), 以数组保存:
+    单元格候选数掩码、所属笼子、已解单元格, digit_positions, 活动笼子及其组合 (按 offsets 切分的扁平数组),
+    笼子登记表的大小, 45 法则推出的笼子与待处理队列. 统计、预算计数和步骤记录不属于快照
+    """
+    __slots__ = ("masks", "cage_ids", "solved_mask", "digit_positions", "active", "solved_cages", "offsets",
+                 "combinations", "registered", "keys", "rejected", "retired", "derived_cages", "rule45_state", "queue",
+                 "cage_queue")
+
+
+UNIT_BASE = {"row": 0, "col": 9, "box": 18}  # 行/列/宫在 digit_positions 中的单元编号起点
+SUBSET_MAX_SIZE = 4
+# 单元内位置掩码是否落在同一段: 行/列中同一宫的三个位置 (也是宫中同一行), 宫中还包括同一列
+LINE_SEGMENTS = (0b000000111, 0b000111000, 0b111000000)
+BOX_COLUMNS = (0b001001001, 0b010010010, 0b100100100)
+LINE_ALIGNED = [any(not mask & ~segment for segment in LINE_SEGMENTS) for mask in range(1 << 9)]
+BOX_ALIGNED = [LINE_ALIGNED[mask] or any(not mask & ~column for column in BOX_COLUMNS) for mask in range(1 << 9)]
+
+# 性能剖析时包装的方法 -> 报告中的技巧名
+PROFILED_METHODS = {
+    "rule45": "rule45",
+    "find_subsets": "subsets",
+    "reduce_in_row": "reduce_in_row",
+    "reduce_in_column": "reduce_in_column",
+    "reduce_in_box": "reduce_in_box",
+    "reduce_in_cage": "reduce_in_cage",
+    "update_cage": "cage_update",
+    "search": "search",
+}
+
+
+class Profile:
+    """
+    按技巧统计调用次数、删去的候选数个数与耗时. 只在开启剖析时把求解器实例上的方法替换为
+    计时包装, 关闭时求解器不经过任何包装. 技巧嵌套调用 (如 update_cage 中的 reduce_in_cage)
+    时, 内层的耗时与删除数只记在内层, 各技巧之和即为总量
+    """
+
+    def __init__(self, solver):
+        self.solver = solver
+        self.techniques = {}  # 技巧名 -> [调用次数, 删去的候选数, 耗时]
+        self.stack = []  # 正在运行的各层技巧中, 嵌套技巧累计的 [删去的候选数, 耗时]
+        self.seconds = 0.0
+        for method, name in PROFILED_METHODS.items():
+            setattr(solver, method, self.wrap(name, getattr(solver, method)))
+
+    def wrap(self, name, func):
+        stats = self.techniques.setdefault(name, [0, 0, 0.0])
+        solver, stack = self.solver, self.stack
+
+        def profiled(*args, **kwargs):
+            nested = [0, 0.0]
+            stack.append(nested)
+            eliminated = solver.eliminated
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - start
+                removed = solver.eliminated - eliminated
+                stack.pop()
+                stats[0] += 1
+                stats[1] += removed - nested[0]
+                stats[2] += seconds - nested[1]
+                if stack:
+                    stack[-1][0] += removed
+                    stack[-1][1] += seconds
+        return profiled
+
+    def report(self):
+        """
+        Returns:
+            dict: techniques {技巧名: {calls, eliminations, seconds}}, passes (每轮 update/队列传播的
+                cages, seconds, eliminations, solved), 以及 solve() 的总 seconds、eliminations 与 stop_reason
+        """
+        return {
+            "techniques": {
+                name: {"calls": calls, "eliminations": eliminations, "seconds": seconds}
+                for name, (calls, eliminations, seconds) in self.techniques.items()
+            },
+            "passes": [dict(stats) for stats in self.solver.sweep_stats],
+            "seconds": self.seconds,
+            "eliminations": self.solver.eliminated,
+            "stop_reason": self.solver.stop_reason,
+        }
+
+
+def cause_indices(causes):
+    """把原因 (单元格, 单元格列表或 (row, col) 列表) 转为单元格下标元组"""
+    if causes is None:
+        return ()
+    if not isinstance(causes, (list, tuple, set)):
+        return (causes.index,)
+    return tuple(cause[0] * 9 + cause[1] if isinstance(cause, tuple) else cause.index for cause in causes)
 
 
 class KillerSudokuSolver:
-    def __init__(self, cage_constraints):      
-        self.cell = [[Cell(row, col) for col in range(9)] for row in range(9)]
-        self.cells = {cell for row in self.cell for cell in row}
-        self.rows = [[self.cell[row][col] for col in range(9)] for row in range(9)]
-        self.cols = [[self.cell[row][col] for row in range(9)] for col in range(9)]
-        self.boxes = [[self.cell[r][c] 
-                       for r in range(box_row * 3, box_row * 3 + 3) 
-                       for c in range(box_col * 3, box_col * 3 + 3)] 
-                      for box_row in range(3) for box_col in range(3)]
-        self.cages = [Cage(sum,{self.cell[row][col] for row, col in cells}) for sum, cells in cage_constraints]
+    def __init__(self, cage_constraints, bitmask=False, propagation="sweep", trace="full", profile=False):
+        """
+        Args:
+            cage_constraints (list): [(sum, [[row, col], ...]), ...]
+            bitmask (bool): 以整数掩码 (BitCell) 而非 set 存储候选数
+            propagation (str): "sweep" 每轮扫描全部行/列/宫/笼;
+                "queue" 只处理候选数发生变化的单元格所在的行/列/宫/笼
+            trace (str | bool): "full" (或 True) 每步保存完整棋盘; "compact" 只保存增量 (Trace),
+                按需重建棋盘; False 不记录步骤
+            profile (bool): 按技巧统计调用次数、删去的候选数与耗时 (Profile), solve() 额外返回报告
+        """
+        if propagation not in ("sweep", "queue"):
+            raise ValueError(f"Unknown propagation mode {propagation!r}, expected 'sweep' or 'queue'")
+        if trace is True:
+            trace = "full"
+        if trace not in ("full", "compact", False):
+            raise ValueError(f"Unknown trace mode {trace!r}, expected 'full', 'compact' or False")
+        cell_class = BitCell if bitmask else Cell
+        self.cage_constraints = cage_constraints
+        self.search_nodes = 0
+        self.cell_list = [cell_class(index // 9, index % 9) for index in range(81)]  # 按 cell.index 排列
+        self.cell = [self.cell_list[row * 9:row * 9 + 9] for row in range(9)]
+        self.rows = [tuple(self.cell_list[index] for index in cells) for cells in ROW_CELLS]
+        self.cols = [tuple(self.cell_list[index] for index in cells) for cells in COL_CELLS]
+        self.boxes = [tuple(self.cell_list[index] for index in cells) for cells in BOX_CELLS]
+        self.solved_mask = 0
+        self.cages = CageRegistry()  # Cage.ID 在所有求解器之间全局递增, 按 ID 查找
+        self.propagation = propagation
+        self.queue = deque() if propagation == "queue" else None  # 待处理的 (kind, index, number), number=0 表示子集检查
+        self.cage_queue = deque()  # 待处理的 ("cage", cage.ID, 0)
+        self.queued = set()
+        self.scan_counts = Counter()  # 每类单元被技巧扫描的次数
+        self.sweep_stats = []  # 每轮扫描的活动笼子数、耗时、删去的候选数与已解单元格数
+        self.eliminated = 0  # 初始笼子建立之后删去的候选数总数
+        self.cell_units = CELL_UNITS  # 每个单元格所在的 (行/列/宫编号 0-26, 单元格在该单元内的位置位)
+        self.add_cages(*[Cage(sum, [self.cell_list[row * 9 + col] for row, col in cells]) for sum, cells in cage_constraints])
+        # digit_positions[unit * 10 + number]: 数字在行/列/宫中仍可放置的位置掩码, 随删除候选数增量更新
+        self.digit_positions = [0] * 270
+        for cell in self.cell_list:
+            for unit, bit in self.cell_units[cell.index]:
+                for number in MASK_DIGITS[cell.mask]:
+                    self.digit_positions[unit * 10 + number] |= bit
+        self.regions = REGIONS
+        self.derived_cages = set()  # rule45 已推出的 (sum, cell mask)
+        self.rule45_state = None  # 上次运行 45 法则时的 (已解单元格, 笼子划分)
         self.step = 0
-        self.steps = [{'board':self.board(),'action':"Initializing"}]
-        self.updated = False
+        self.actions = 0  # 排除候选数与填入数字的次数, 每次对应一个求解步骤
+        self.passes = 0  # 完整扫描 (update) 或队列传播的轮数
+        self.deadline = self.action_limit = None  # solve() 的截止时间与 actions 上限
+        self.stop_reason = None  # solve() 停止的原因: solved, fixpoint, time, steps
+        self.trace = trace
+        if trace == "full":
+            self.steps = [{'board':self.board(),'action':"Initializing"}]
+        elif trace == "compact":
+            self.steps = Trace(cell.mask for cell in self.cell_list)
+        else:
+            self.steps = []
+        self.profile = Profile(self) if profile else None
+
+    def add_cages(self, *cages):
+        for cage in cages:
+            if self.cages.add(cage) is cage:
+                self.push_unit("cage", cage.ID, 0)
+
+    def push_unit(self, kind, index, number):
+        unit = (kind, index, number)
+        if self.queue is None or unit in self.queued:
+            return
+        self.queued.add(unit)
+        if kind == "cage":
+            self.cage_queue.append(unit)
+        else:
+            self.queue.append(unit)
+
+    def pop_unit(self):
+        """先处理行/列/宫, 只剩笼子时才更新笼子 (Cage.update 代价最高)"""
+        unit = self.queue.popleft() if self.queue else self.cage_queue.popleft()
+        self.queued.discard(unit)
+        return unit
+
+    def mark_dirty(self, cell, removed:int):
+        """
+        单元格失去 removed 中的候选数后, 只把可能因此产生推论的单元放入队列:
+        删去的数字在行/列/宫中的剩余位置变得可推论 (newly_aligned) 时放入 (单元, 数字);
+        单元格未解且候选数刚降到不超过 SUBSET_MAX_SIZE 个 (裸子集), 或删去的数字的位置刚降到 2 到
+        SUBSET_MAX_SIZE 个 (隐子集) 时放入该单元的子集检查, 继续缩小形成的子集由 propagate 在队列清空后补查;
+        包含它的笼子总是放入
+        """
+        if self.queue is None:
+            return
+        count = cell.count()
+        naked = not cell.solved and count <= SUBSET_MAX_SIZE < count + POPCOUNT[removed]
+        for kind, (unit, bit) in zip(("row", "col", "box"), self.cell_units[cell.index]):
+            index = unit - UNIT_BASE[kind]
+            subsets = naked
+            for number in MASK_DIGITS[removed]:
+                positions = self.digit_positions[unit * 10 + number]
+                if self.newly_aligned(unit, positions, positions | bit):
+                    self.push_unit(kind, index, number)
+                if 2 <= POPCOUNT[positions] <= SUBSET_MAX_SIZE < POPCOUNT[positions | bit]:
+                    subsets = True
+            if subsets:
+                self.push_unit(kind, index, 0)
+        for cage in self.cages.cages_of(cell):
+            self.push_unit("cage", cage.ID, 0)
+
+    def aligned(self, unit, positions):
+        """
+        数字在行/列/宫 unit 中的位置掩码 positions 能否让 reduce_in_* 推出结论:
+        只剩一个位置, 或全部落在同一宫 (行/列) 或同一行/列 (宫), 或全部落在同一笼
+        """
+        if not positions:
+            return False
+        return (BOX_ALIGNED if unit >= UNIT_BASE["box"] else LINE_ALIGNED)[positions] or self.same_cage(unit, positions)
+
+    def newly_aligned(self, unit, positions, previous):
+        """
+        位置掩码从 previous 缩小为 positions 后能否推出新的结论: 只剩一个位置, 或刚刚变为 aligned.
+        之前已经 aligned 的位置在当时已放入队列, 其排除已经做过
+        """
+        if not positions:
+            return False
+        if POPCOUNT[positions] == 1:
+            return True
+        aligned = BOX_ALIGNED if unit >= UNIT_BASE["box"] else LINE_ALIGNED
+        if aligned[positions] and not aligned[previous]:
+            return True
+        return self.same_cage(unit, positions) and not self.same_cage(unit, previous)
+
+    def same_cage(self, unit, positions):
+        """行/列/宫 unit 中位置掩码 positions 的单元格是否都在同一笼"""
+        cells = UNIT_CELLS[unit]
+        indices = BIT_INDICES[positions]
+        cage = self.cell_list[cells[indices[0]]].cage
+        return all(self.cell_list[cells[position]].cage == cage for position in indices)
+
+    def unit_scans(self):
+        """行/列/宫/笼被技巧扫描的总次数"""
+        return sum(self.scan_counts[kind] for kind in ("row", "col", "box", "cage"))
 
     def get_box(self, row, col):
         return (row // 3) * 3 + (col // 3)
 
     def is_solved(self):
-        return all(cell.solved for cell in self.cells)
+        return self.solved_mask == ALL_CELLS
 
-    def solve(self, visualize=False):
-        loop = 0
-        loop_max = 3
-        while not self.is_solved():
-            self.update()
-            loop += 1
-            if loop > loop_max:
-                break
+    def solve(self, visualize=False, search=True, time_budget=None, max_steps=None):
+        """
+        逻辑推理一直进行到不动点 (一整轮前后棋盘指纹相同), 不再限制轮数
+
+        Args:
+            search (bool): 逻辑推理停滞后, 用带笼子和剪枝的回溯搜索 (dfs_solver.KillerBitboardSudoku) 补全
+            time_budget (float): 逻辑推理最多用时 (秒), 超出后停止且不再搜索
+            max_steps (int): 本次调用最多排除/填入的次数 (从调用时的 actions 起算)
+
+            预算在每个单元 (一次技巧调用) 之间检查, 单元内的排除和填入数字后的同行/列/宫/笼排除
+            不会被打断, 因此实际步数可能超出 max_steps, 超出量不超过最后一个单元内的步数
+
+        Returns:
+            (是否解出, 步骤), 开启 profile 时为 (是否解出, 步骤, Profile.report());
+            停止原因见 stop_reason
+        """
+        start = time.perf_counter()
+        self.deadline = None if time_budget is None else start + time_budget
+        self.action_limit = None if max_steps is None else self.actions + max_steps
+        self.stop_reason = None
+        if self.propagation == "queue":
+            self.propagate()
+        else:
+            self.sweep()
+        if search and self.stop_reason is None and not self.is_solved():
+            self.search()
+        if self.is_solved():
+            self.stop_reason = "solved"
+        elif self.stop_reason is None:
+            self.stop_reason = "fixpoint"
+        if self.profile is not None:
+            self.profile.seconds += time.perf_counter() - start
         if visualize:
             self.visualization()
+        if self.profile is not None:
+            return self.is_solved(), self.steps, self.profile.report()
         return self.is_solved(), self.steps
         
+    def search(self):
+        """
+        以当前候选数为起点回溯搜索, 把搜索得到的数字逐个填入 (记为 "search" 步骤)
+
+        Returns:
+            bool: 是否找到解; 推理已出现矛盾 (有单元格没有候选数, 题目无解) 时不搜索, 返回 False
+        """
+        if any(cell.mask == 0 for cell in self.cell_list):
+            return False
+        board = [[cell.value() if cell.solved else 0 for cell in row] for row in self.cell]
+        candidates = [cell.mask >> 1 for cell in self.cell_list]  # dfs_solver 用第 d - 1 位表示数字 d
+        engine = KillerBitboardSudoku(self.cage_constraints, board, candidates)
+        solution = engine.solve()
+        self.search_nodes = engine.nodes
+        if solution is None:
+            return False
+        for cell in self.cell_list:
+            self.set_number(cell, solution[cell.row][cell.col], "search", "Backtracking search")
+        return True
+
     def board(self):
         board_matrix = [[set() for _ in range(9)] for _ in range(9)] 
 
         for row in range(9):
             for col in range(9):
-                board_matrix[row][col] = self.cell[row][col].candidates.copy()
+                board_matrix[row][col] = self.cell[row][col].copy_candidates()
 
         return board_matrix
 
@@ -164,81 +963,292 @@ class KillerSudokuSolver:
         for row in range(9):
             for col in range(9):
                 cell = self.cell[row][col]
-                if cell.solved and len(cell.candidates) == 1:
-                    solution_matrix[row][col] = list(cell.candidates)[0]
+                if cell.solved and cell.count() == 1:
+                    solution_matrix[row][col] = cell.value()
                 else:
                     solution_matrix[row][col] = 0
         return solution_matrix
 
+    def snapshot(self):
+        """
+        保存当前状态, 之后可用 restore() 回到这里 (例如猜测一个数字后回溯). 代价为 O(单元格 + 笼子组合)
+
+        Returns:
+            Snapshot
+        """
+        snapshot = Snapshot()
+        snapshot.masks = array("H", [cell.mask for cell in self.cell_list])
+        snapshot.cage_ids = array("q", [-1 if cell.cage is None else cell.cage for cell in self.cell_list])
+        snapshot.solved_mask = self.solved_mask
+        snapshot.digit_positions = array("H", self.digit_positions)
+        cages = list(self.cages.active.values())
+        snapshot.active = array("Q", [cage.ID for cage in cages])
+        snapshot.solved_cages = array("B", [cage.solved for cage in cages])
+        snapshot.offsets = array("I", [0])
+        snapshot.combinations = array("H")
+        for cage in cages:
+            snapshot.combinations.extend(cage.combinations)
+            snapshot.offsets.append(len(snapshot.combinations))
+        snapshot.registered = len(self.cages.by_id)
+        snapshot.keys = len(self.cages.by_key)
+        snapshot.rejected = self.cages.rejected
+        snapshot.retired = self.cages.retired
+        snapshot.derived_cages = frozenset(self.derived_cages)
+        snapshot.rule45_state = self.rule45_state
+        snapshot.queue = None if self.queue is None else tuple(self.queue)
+        snapshot.cage_queue = tuple(self.cage_queue)
+        return snapshot
+
+    def restore(self, snapshot):
+        """
+        回到 snapshot() 时的状态: 丢弃之后登记的笼子, 恢复候选数、已解单元格、笼子组合与待处理队列.
+        同一个快照可以恢复多次
+        """
+        for cell, mask, cage_id in zip(self.cell_list, snapshot.masks, snapshot.cage_ids):
+            cell.set_mask(mask)
+            cell.solved = bool(snapshot.solved_mask >> cell.index & 1)
+            cell.cage = None if cage_id < 0 else cage_id
+        self.solved_mask = snapshot.solved_mask
+        self.digit_positions[:] = snapshot.digit_positions
+
+        # 笼子只会追加登记, dict 按插入顺序弹出最后登记的笼子
+        registry = self.cages
+        while len(registry.by_id) > snapshot.registered:
+            registry.by_id.popitem()
+        while len(registry.by_key) > snapshot.keys:
+            registry.by_key.popitem()
+        registry.rejected = snapshot.rejected
+        registry.retired = snapshot.retired
+        registry.active = {}
+        registry.cell_index = {}
+        offsets = snapshot.offsets
+        for position, cage_id in enumerate(snapshot.active):
+            cage = registry.by_id[cage_id]
+            cage.combinations = set(snapshot.combinations[offsets[position]:offsets[position + 1]])
+            cage.solved = bool(snapshot.solved_cages[position])
+            cage.update_numbers()
+            registry.active[cage_id] = cage
+            for cell in cage.cells:
+                registry.cell_index.setdefault(cell.index, {})[cage_id] = cage
+
+        self.derived_cages = set(snapshot.derived_cages)
+        self.rule45_state = snapshot.rule45_state
+        if self.queue is not None:
+            self.queue = deque(snapshot.queue)
+            self.cage_queue = deque(snapshot.cage_queue)
+            self.queued = set(snapshot.queue) | set(snapshot.cage_queue)
+
+    def fingerprint(self):
+        """棋盘指纹: 全部候选数掩码与 45 法则推出的笼子数, 一整轮前后相同即到达不动点"""
+        return hash((tuple(cell.mask for cell in self.cell_list), len(self.derived_cages)))
+
+    def out_of_budget(self):
+        """超出 solve() 的时间或步数预算时记下停止原因并返回 True"""
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            self.stop_reason = "time"
+        elif self.action_limit is not None and self.actions >= self.action_limit:
+            self.stop_reason = "steps"
+        else:
+            return False
+        return True
+
+    def sweep(self):
+        """重复完整扫描 (update), 直到解出、超出预算或一整轮没有任何变化"""
+        fingerprint = self.fingerprint()
+        while not self.is_solved() and not self.out_of_budget():
+            self.update()
+            previous, fingerprint = fingerprint, self.fingerprint()
+            if fingerprint == previous:
+                break
+
     def update(self):
-        self.updated = False
+        """一轮完整扫描: 45 法则、子集、唯一性检查与笼子组合, 每个单元之间检查预算"""
+        start = time.perf_counter()
+        eliminated = self.eliminated
+        for technique, args in self.update_tasks():
+            if self.out_of_budget():
+                break
+            technique(*args)
+        self.record_sweep(start, eliminated)
 
+    def update_tasks(self):
+        """按顺序逐个产生一轮扫描中的 (方法, 参数); 惰性产生, 后面的任务看到前面任务的结果"""
         # 45法则
-        self.rule45()
+        yield self.rule45, ()
+        self.scan_counts["rule45"] += 1
 
-        # 裸对检查
-        for cells in self.rows:
-            self.find_naked_pairs(cells)
-        for cells in self.cols:
-            self.find_naked_pairs(cells)
-        for cells in self.boxes:   
-            self.find_naked_pairs(cells) 
+        # 裸子集/隐子集检查
+        for unit, cells in enumerate(self.rows + self.cols + self.boxes):
+            yield self.find_subsets, (cells, unit)
         for cage in self.cages:
-            self.find_naked_pairs(cage.cells) 
+            yield self.find_cage_subsets, (cage,)
+        self.scan_counts.update(row=9, col=9, box=9, cage=len(self.cages))
 
-        # 唯一性检查
+        # 唯一性检查 (只检查仍出现在未解单元格中的数字)
         for cells in self.rows:
-            for number in range(1, 10):
-                self.reduce_in_row(cells,number)
+            yield self.reduce_unit, (self.reduce_in_row, cells, "row")
         for cells in self.cols:
-            for number in range(1, 10):
-                self.reduce_in_column(cells,number)
+            yield self.reduce_unit, (self.reduce_in_column, cells, "col")
         for cells in self.boxes:
-            for number in range(1, 10):
-                self.reduce_in_box(cells,number)
+            yield self.reduce_unit, (self.reduce_in_box, cells, "box")
         for cage in self.cages:
-            if cage.solved and all(cell.solved for cell in cage.cells):
-                continue
-            if (not cage.solved) and len(cage.combinations) == 1:
-                cage.solve()
-            cage.update()
-            if cage.certain_number != set():
-                for number in cage.certain_number:
-                    self.reduce_in_cage(cage.cells, number)
-
-        if self.updated:
-            self.update()
+            yield self.update_cage, (cage,)
+
+    def record_sweep(self, start, eliminated):
+        self.passes += 1
+        self.sweep_stats.append({
+            "cages": len(self.cages),
+            "seconds": time.perf_counter() - start,
+            "eliminations": self.eliminated - eliminated,
+            "solved": count_bits(self.solved_mask),
+        })
+
+    def reduce_unit(self, reduce, cells, kind):
+        numbers = MASK_DIGITS[self.open_digits(cells)]
+        self.scan_counts[kind] += len(numbers)
+        for number in numbers:
+            reduce(cells, number)
+
+    def update_cage(self, cage):
+        """根据组合收缩笼内候选数, 返回被 Cage.update 直接删去候选数的 (单元格, 删去的掩码)"""
+        if not cage.cell_mask & ~self.solved_mask:
+            self.cages.retire(cage)
+            return []
+        self.scan_counts["cage"] += 1
+        if (not cage.solved) and len(cage.combinations) == 1:
+            cage.solve()
+        masks = [(cell, cell.mask) for cell in cage.cells]
+        cage.update()
+        changed = [(cell, mask & ~cell.mask) for cell, mask in masks if cell.mask != mask]
+        for cell, removed in changed:
+            self.eliminate(cell, removed)
+            if self.trace == "compact":
+                self.steps.note(cell.index, removed)
+        if cage.certain_number != set():
+            for number in cage.certain_number:
+                self.reduce_in_cage(cage.cells, number)
+        return changed
 
-    def exclude(self, cell:Cell, number:int, info):
+    def propagate(self):
+        """
+        处理待处理队列直到为空; 队列清空后若棋盘指纹有变化则再运行一次 45 法则,
+        直到 45 法则也不再带来变化 (不动点), 或超出预算
+        """
+        units = {"row": self.rows, "col": self.cols, "box": self.boxes}
+        reduces = {"row": self.reduce_in_row, "col": self.reduce_in_column, "box": self.reduce_in_box}
+        # 子集检查全部放入; (单元, 数字) 只放入已经 aligned 的, 其余在变为 aligned 时由 mark_dirty 放入
+        for kind in units:
+            for index in range(9):
+                unit = UNIT_BASE[kind] + index
+                self.push_unit(kind, index, 0)
+                for number in range(1, 10):
+                    if self.aligned(unit, self.digit_positions[unit * 10 + number]):
+                        self.push_unit(kind, index, number)
+        subsets_checked = self.eliminated
+        fingerprint = self.fingerprint()
+        self.rule45()
+        self.scan_counts["rule45"] += 1
+        while True:
+            start = time.perf_counter()
+            eliminated = self.eliminated
+            while True:
+                while self.queue or self.cage_queue:
+                    if self.out_of_budget():
+                        self.record_sweep(start, eliminated)
+                        return
+                    kind, index, number = self.pop_unit()
+                    if kind == "cage":
+                        cage = self.cages[index]
+                        if cage not in self.cages:
+                            continue
+                        self.scan_counts["cage"] += 1
+                        self.find_cage_subsets(cage)
+                        for cell, removed in self.update_cage(cage):
+                            self.mark_dirty(cell, removed)
+                    elif number == 0:
+                        self.scan_counts[kind] += 1
+                        self.find_subsets(units[kind][index], UNIT_BASE[kind] + index)
+                    elif self.open_digits(units[kind][index]) >> number & 1:
+                        self.scan_counts[kind] += 1
+                        reduces[kind](units[kind][index], number)
+                # mark_dirty 只在候选数/位置数刚降到 SUBSET_MAX_SIZE 时放入子集检查,
+                # 队列清空后若候选数有变化, 再检查一次全部行/列/宫的子集, 以免漏掉继续缩小形成的子集
+                if self.eliminated == subsets_checked:
+                    break
+                subsets_checked = self.eliminated
+                for kind in units:
+                    for index in range(9):
+                        self.push_unit(kind, index, 0)
+            self.record_sweep(start, eliminated)
+            # 队列清空后, 只有棋盘自上次 45 法则以来有变化时才再运行 45 法则
+            previous, fingerprint = fingerprint, self.fingerprint()
+            if fingerprint == previous:
+                break
+            self.rule45()
+            self.scan_counts["rule45"] += 1
+
+    def eliminate(self, cell, removed:int):
+        """单元格已删去 removed 中的候选数: 计数, 并从所在行/列/宫的数字位置掩码中清除该单元格"""
+        self.eliminated += POPCOUNT[removed]
+        positions = self.digit_positions
+        for unit, bit in self.cell_units[cell.index]:
+            for number in MASK_DIGITS[removed]:
+                positions[unit * 10 + number] &= ~bit
+
+    def open_digits(self, cells):
+        """未解单元格的候选数并集 (掩码)"""
+        mask = 0
+        for cell in cells:
+            if not cell.solved:
+                mask |= cell.mask
+        return mask
+
+    def exclude(self, cell:Cell, number:int, technique:str, detail:str, causes=None):
+        """
+        Args:
+            technique (str): TECHNIQUES 中的技巧名
+            detail (str), causes: 说明文字与导致排除的单元格, 只在完整记录时拼成 message
+        """
         if cell.solved:
             return
-        if number in cell.candidates:
-            cell.exclude({number})
-            message = f"Exclude {number} at ({cell.row+1},{cell.col+1}) \n{info}"
-            self.steps.append({'board':self.board(),'action':message})
-            # print(message)
+        if cell.has(number):
+            cell.exclude_number(number)
+            self.actions += 1
+            self.eliminate(cell, 1 << number)
+            self.mark_dirty(cell, 1 << number)
+            if self.trace == "full":
+                message = f"Exclude {number} at ({cell.row+1},{cell.col+1}) \n[{technique}]{detail}{'' if causes is None else causes}"
+                self.steps.append({'board':self.board(),'action':message})
+            elif self.trace == "compact":
+                self.steps.record(cell.index, 1 << number, TECHNIQUE_ID[technique], cause_indices(causes))
 
-    def set_number(self, cell:Cell, number:int, info):
+    def set_number(self, cell:Cell, number:int, technique:str, detail:str, causes=None):
         if cell.solved:
             return
-        cell.set_candidates({number})
+        removed = cell.mask & ~(1 << number)
+        self.eliminate(cell, removed)
+        cell.set_mask(1 << number)
         cell.solve()
+        self.on_solved(cell)
+        self.mark_dirty(cell, removed)
         self.step += 1
-        self.updated = True
-        message = f"[{self.step}]Solved cell at ({cell.row+1}, {cell.col+1}): {number} \n{info}"
-        self.steps.append({'board':self.board(),'action':message})
-        # print(message)
+        self.actions += 1
+        if self.trace == "full":
+            message = f"[{self.step}]Solved cell at ({cell.row+1}, {cell.col+1}): {number} \n[{technique}]{detail}{'' if causes is None else causes}"
+            self.steps.append({'board':self.board(),'action':message})
+        elif self.trace == "compact":
+            self.steps.record(cell.index, removed, TECHNIQUE_ID[technique], cause_indices(causes), number)
 
         row, col, cage_id = cell.row, cell.col, cell.cage
         for peer in self.rows[row]:
-            self.exclude(peer,number,info=f"[update]Same row of {cell}")
+            self.exclude(peer, number, "update", "Same row of ", cell)
         for peer in self.cols[col]:
-            self.exclude(peer,number,info=f"[update]Same col of {cell}")
-        for peer in self.boxes[self.get_box(row, col)]:
-            self.exclude(peer,number,info=f"[update]Same box of {cell}")
+            self.exclude(peer, number, "update", "Same col of ", cell)
+        for peer in self.boxes[cell.box]:
+            self.exclude(peer, number, "update", "Same box of ", cell)
         cage = self.cages[cage_id]
         for peer in cage.cells:
-            self.exclude(peer,number,info=f"[update]Same cage of {cell}")
+            self.exclude(peer, number, "update", "Same cage of ", cell)
 
     def visualization(self):
         """绘制数独棋盘，并在未解的单元格中显示可能的候选数字"""
@@ -281,345 +1291,240 @@ class KillerSudokuSolver:
         plt.show()
 
     def reduce_in_box(self, box_cells, number):
-        # 找出该数字在当前宫格内的候选单元格
-        candidates = [cell for cell in box_cells if number in cell.candidates]
+        # 找出该数字在当前宫格内的候选单元格 (digit_positions 中的位置掩码)
+        positions = self.digit_positions[(UNIT_BASE["box"] + box_cells[0].box) * 10 + number]
+        candidates = [box_cells[position] for position in BIT_INDICES[positions]]
 
         # 如果数字只在一个单元格内出现，则确定其值
         if len(candidates) == 1:
             candidate = candidates.pop()
-            self.set_number(candidate, number, info=f"[info]Only candidate in box({box_cells[0].row//3+1},{box_cells[0].col//3+1})")
+            self.set_number(candidate, number, "reduce_in_box", f"Only candidate in box({box_cells[0].row//3+1},{box_cells[0].col//3+1})")
             return
+        if not candidates:
+            return
+        box, first = box_cells[0].box, candidates[0]
 
         # 如果候选单元格全在同一行, 从该行的其他宫格中排除该数字
-        rows = {cell.row for cell in candidates}
-        if len(rows) == 1:
-            row = rows.pop()
-            for cell in self.rows[row]:
-                if cell not in box_cells:
-                    self.exclude(cell,number,info=f"[reduce_in_box]Same row of {candidates}")
+        if all(cell.row == first.row for cell in candidates):
+            for cell in self.rows[first.row]:
+                if cell.box != box:
+                    self.exclude(cell, number, "reduce_in_box", "Same row of ", candidates)
 
         # 如果候选单元格全在同一列, 从该列的其他宫格中排除该数字
-        cols = {cell.col for cell in candidates}
-        if len(cols) == 1:
-            col = cols.pop()
-            for cell in self.cols[col]:
-                if cell not in box_cells:
-                    self.exclude(cell,number,info=f"[reduce_in_box]Same col of {candidates}")
+        if all(cell.col == first.col for cell in candidates):
+            for cell in self.cols[first.col]:
+                if cell.box != box:
+                    self.exclude(cell, number, "reduce_in_box", "Same col of ", candidates)
 
         # 如果候选单元格全在同一笼, 从该笼的其他宫格中排除该数字
-        cages = {cell.cage for cell in candidates}
-        if len(cages) == 1:
-            cage = cages.pop()
-            for cell in self.cages[cage].cells:
-                if cell not in box_cells:
-                    self.exclude(cell,number,info=f"[reduce_in_box]Same cage of {candidates}")
+        if all(cell.cage == first.cage for cell in candidates):
+            for cell in self.cages[first.cage].cells:
+                if cell.box != box:
+                    self.exclude(cell, number, "reduce_in_box", "Same cage of ", candidates)
 
     def reduce_in_row(self, row_cells, number):
-        # 找出该数字在当前宫格内的候选单元格
-        candidates = [cell for cell in row_cells if number in cell.candidates]
+        # 找出该数字在当前行内的候选单元格 (digit_positions 中的位置掩码)
+        positions = self.digit_positions[(UNIT_BASE["row"] + row_cells[0].row) * 10 + number]
+        candidates = [row_cells[position] for position in BIT_INDICES[positions]]
         
         # 如果数字只在一个单元格内出现，则确定其值
         if len(candidates) == 1:
             candidate = candidates.pop()
-            self.set_number(candidate, number, info=f"[info]Only candidate in row[{row_cells[0].row+1}]")
+            self.set_number(candidate, number, "reduce_in_row", f"Only candidate in row[{row_cells[0].row+1}]")
             return
+        if not candidates:
+            return
+        row, first = row_cells[0].row, candidates[0]
         
         # 如果候选单元格全部在同一个宫格, 从该宫格内的其他行中排除该数字
-        box_ids = {self.get_box(cell.row, cell.col) for cell in candidates}
-        if len(box_ids) == 1:
-            box_id = box_ids.pop()
-            for cell in self.boxes[box_id]:
-                if cell not in row_cells:
-                    self.exclude(cell,number,info=f"[reduce_in_row]Same box of {candidates}")
+        if all(cell.box == first.box for cell in candidates):
+            for cell in self.boxes[first.box]:
+                if cell.row != row:
+                    self.exclude(cell, number, "reduce_in_row", "Same box of ", candidates)
         
         # 如果候选单元格全在同一笼, 从该笼的其他宫格中排除该数字
-        cages = {cell.cage for cell in candidates}
-        if len(cages) == 1:
-            cage = cages.pop()
-            for cell in self.cages[cage].cells:
-                if cell not in row_cells:
-                    self.exclude(cell,number,info=f"[reduce_in_row]Same cage of {candidates}")
+        if all(cell.cage == first.cage for cell in candidates):
+            for cell in self.cages[first.cage].cells:
+                if cell.row != row:
+                    self.exclude(cell, number, "reduce_in_row", "Same cage of ", candidates)
 
     def reduce_in_column(self, col_cells, number):
-        # 找出该数字在当前宫格内的候选单元格
-        candidates = [cell for cell in col_cells if number in cell.candidates]
+        # 找出该数字在当前列内的候选单元格 (digit_positions 中的位置掩码)
+        positions = self.digit_positions[(UNIT_BASE["col"] + col_cells[0].col) * 10 + number]
+        candidates = [col_cells[position] for position in BIT_INDICES[positions]]
 
         # 如果数字只在一个单元格内出现，则确定其值
         if len(candidates) == 1:
             candidate = candidates.pop()
-            self.set_number(candidate, number, info=f"[info]Only candidate in col[{col_cells[0].col+1}]")
+            self.set_number(candidate, number, "reduce_in_column", f"Only candidate in col[{col_cells[0].col+1}]")
             return
+        if not candidates:
+            return
+        col, first = col_cells[0].col, candidates[0]
         
         # 如果候选单元格全部在同一个宫格, 从该宫格内的其他行中排除该数字
-        box_ids = {self.get_box(cell.row, cell.col) for cell in candidates}
-        if len(box_ids) == 1:
-            box_id = box_ids.pop()
-            for cell in self.boxes[box_id]:
-                if cell not in col_cells:
-                    self.exclude(cell,number,info=f"[reduce_in_column]Same box of {candidates}")
+        if all(cell.box == first.box for cell in candidates):
+            for cell in self.boxes[first.box]:
+                if cell.col != col:
+                    self.exclude(cell, number, "reduce_in_column", "Same box of ", candidates)
 
         # 如果候选单元格全在同一笼, 从该笼的其他宫格中排除该数字
-        cages = {cell.cage for cell in candidates}
-        if len(cages) == 1:
-            cage = cages.pop()
-            for cell in self.cages[cage].cells:
-                if cell not in col_cells:
-                    self.exclude(cell,number,info=f"[reduce_in_column]Same cage of {candidates}")
+        if all(cell.cage == first.cage for cell in candidates):
+            for cell in self.cages[first.cage].cells:
+                if cell.col != col:
+                    self.exclude(cell, number, "reduce_in_column", "Same cage of ", candidates)
 
     def reduce_in_cage(self, cage_cells, number):
         # 找出该数字在当前宫格内的候选单元格
-        candidates = [cell for cell in cage_cells if number in cell.candidates]
+        candidates = [cell for cell in cage_cells if cell.has(number)]
 
         # 如果数字只在一个单元格内出现，则确定其值
         if len(candidates) == 1:
             candidate = candidates.pop()
-            self.set_number(candidate, number, info=f"[info]Only candidate in cage[{cage_cells}]")
+            self.set_number(candidate, number, "reduce_in_cage", "Only candidate in cage ", cage_cells)
+            return
+        if not candidates:
             return
+        first = candidates[0]
+        cage_mask = 0
+        for cell in cage_cells:
+            cage_mask |= 1 << cell.index
         
         # 如果候选单元格全在同一行, 从该行的其他宫格中排除该数字
-        rows = {cell.row for cell in candidates}
-        if len(rows) == 1:
-            row = rows.pop()
-            for cell in self.rows[row]:
-                if cell not in cage_cells:
-                    self.exclude(cell,number,info=f"[reduce_in_cage]Same row of {candidates}")
+        if all(cell.row == first.row for cell in candidates):
+            for cell in self.rows[first.row]:
+                if not cage_mask >> cell.index & 1:
+                    self.exclude(cell, number, "reduce_in_cage", "Same row of ", candidates)
 
         # 如果候选单元格全在同一列, 从该列的其他宫格中排除该数字
-        cols = {cell.col for cell in candidates}
-        if len(cols) == 1:
-            col = cols.pop()
-            for cell in self.cols[col]:
-                if cell not in cage_cells:
-                    self.exclude(cell,number,info=f"[reduce_in_cage]Same col of {candidates}")
+        if all(cell.col == first.col for cell in candidates):
+            for cell in self.cols[first.col]:
+                if not cage_mask >> cell.index & 1:
+                    self.exclude(cell, number, "reduce_in_cage", "Same col of ", candidates)
         
         # 如果候选单元格全部在同一个宫格, 从该宫格内的其他行中排除该数字
-        box_ids = {self.get_box(cell.row, cell.col) for cell in candidates}
-        if len(box_ids) == 1:
-            box_id = box_ids.pop()
-            for cell in self.boxes[box_id]:
-                if cell not in cage_cells:
-                    self.exclude(cell,number,info=f"[reduce_in_cage]Same box of {candidates}")
+        if all(cell.box == first.box for cell in candidates):
+            for cell in self.boxes[first.box]:
+                if not cage_mask >> cell.index & 1:
+                    self.exclude(cell, number, "reduce_in_cage", "Same box of ", candidates)
 
-    def find_naked_pairs(self, cells):
+    def find_subsets(self, cells, unit=None, certain=ALL_DIGITS, max_size=SUBSET_MAX_SIZE):
         """
-        检查给定的单元格列表（行、列或宫格）中的“裸对”情况，
-        并从其他单元格的候选解中排除“裸对”数字，同时返回裸对所在单元格的位置。
+        裸子集: k 个未解单元格的候选数并集恰为 k 个数字, 则单元内其他单元格排除这些数字;
+        隐子集: k 个必须出现在单元内的数字只能放在 k 个单元格中, 则这些单元格排除其他数字.
+        k 取 2 到 max_size, 以位掩码并集枚举 (subset_unions).
+
+        Args:
+            cells (list): 行/列/宫或笼子的单元格, 下标即位置位
+            unit (int): 行/列/宫编号 0-26, 读取增量维护的 digit_positions; None 时现算位置掩码
+            certain (int): 一定出现在 cells 中的数字掩码, 行/列/宫为全部数字, 笼子为所有组合共有的数字
         """
-        candidates_count = {}
-        cell_positions = {}
+        masks = [cell.mask for cell in cells]
+        open_positions = 0
+        for position, cell in enumerate(cells):
+            if not cell.solved:
+                open_positions |= 1 << position
+        size = min(max_size, POPCOUNT[open_positions] - 1)
+        if size < 2:
+            return
+
+        naked = [(1 << position, masks[position]) for position in BIT_INDICES[open_positions] if POPCOUNT[masks[position]] <= size]
+        for keys, digits in subset_unions(naked, size):
+            subset = [cells[position] for position in BIT_INDICES[keys]]
+            for position in BIT_INDICES[open_positions & ~keys]:
+                for number in MASK_DIGITS[masks[position] & digits]:
+                    self.exclude(cells[position], number, "naked_subset", f" {MASK_DIGITS[digits]} at ", subset)
+
+        hidden = []
+        for number in MASK_DIGITS[certain]:
+            if unit is None:
+                positions = 0
+                for position in BIT_INDICES[open_positions]:
+                    if masks[position] >> number & 1:
+                        positions |= 1 << position
+            else:
+                positions = self.digit_positions[unit * 10 + number] & open_positions
+            if 2 <= POPCOUNT[positions] <= size:
+                hidden.append((1 << number, positions))
+        for digits, keys in subset_unions(hidden, size):
+            subset = [cells[position] for position in BIT_INDICES[keys]]
+            for cell in subset:
+                for number in MASK_DIGITS[cell.mask & ~digits]:
+                    self.exclude(cell, number, "hidden_subset", f" {MASK_DIGITS[digits]} only at ", subset)
+
+    def find_cage_subsets(self, cage):
+        """
+        笼内数字互不相同, 同样适用子集规则; 隐子集只考虑所有组合都包含, 且尚未被笼内已解单元格
+        占用的数字 (被拆分的笼子仍然有效, 子笼中解出的数字不会从父笼其他单元格中排除)
+        """
+        solved = union_masks(cell.mask for cell in cage.cells if cell.solved)
+        self.find_subsets(cage.cells, certain=intersect_masks(cage.combinations) & ~solved)
 
-        # 统计候选数字为2的单元格
-        for cell in cells:
-            if len(cell.candidates) == 2:
-                candidates_key = tuple(sorted(cell.candidates))
-                candidates_count[candidates_key] = candidates_count.get(candidates_key, 0) + 1
-                
-                # 记录候选数字为2的单元格的位置
-                if candidates_key not in cell_positions:
-                    cell_positions[candidates_key] = []
-                cell_positions[candidates_key].append((cell.row, cell.col))
-
-        # 筛选出“裸对”
-        naked_pairs_info = []
-        for pair, count in candidates_count.items():
-            if count == 2:
-                # 获取裸对的位置
-                positions = cell_positions[pair]
-                naked_pairs_info.append({"pair": pair, "positions": positions})
-
-                # 从其他单元格中排除“裸对”数字
-                for cell in cells:
-                    if cell.candidates != set(pair):
-                        for number in set(pair):
-                            self.exclude(cell, number, info=f"[naked_pairs] {pair} at {positions}")
-    
     def rule45(self, cage_max=3):
-        # 内
-        for row1 in range(9):
-            for row2 in range(row1, 9):
-                cells = set()
-                cages = set()
-                cells_count = 0
-                known_cells_count = 0
-                cage_sum = 45 * (row2 - row1 + 1)
-                for row in range(row1, row2 + 1):
-                    for col in range(9):
-                        cells.add(self.cell[row][col])
-                        cells_count += 1
-                cage_cells = cells.copy()
-                for cell in cells:
-                    cages.add(self.cages[cell.cage])
-                for cage in cages:
-                    if all(cell in cells for cell in cage.cells):
-                        known_cells_count += len(cage.cells)
-                        cage_sum -= cage.sum
-                        cage_cells -= {cell for cell in cage.cells}
-                for cell in cage_cells.copy():
-                    if cell.solved:
-                        known_cells_count += 1
-                        cage_sum -= list(cell.candidates)[0]
-                        cage_cells -= {cell}
-                if abs(known_cells_count - cells_count) <= cage_max and known_cells_count != cells_count:
-                    cell_ = list(cage_cells)[0]
-                    if all(cell.cage == cell_.cage for cell in cage_cells):
-                        self.cages.extend(self.cages[cell_.cage].split(cage_sum, cage_cells))
-                    elif all(cell.row == cell_.row for cell in cage_cells) or all(
-                            cell.col == cell_.col for cell in cage_cells) or all(
-                        cell in self.boxes[self.get_box(cell_.row, cell_.col)] for cell in cage_cells):
-                        self.cages.append(Cage.virtual_cage(cage_sum, cage_cells))  
-                        # print(f"{row1} to {row2}: {cells_count} cages:{[cage.ID for cage in cages]} known_cells_count:{known_cells_count}")
-        for col1 in range(9):
-            for col2 in range(col1, 9):
-                cells = set()
-                cages = set()
-                cells_count = 0
-                known_cells_count = 0
-                cage_sum = 45 * (col2 - col1 + 1)
-                for col in range(col1, col2 + 1):
-                    for row in range(9):
-                        cells.add(self.cell[row][col])
-                        cells_count += 1
-                cage_cells = cells.copy()
-                for cell in cells:
-                    cages.add(self.cages[cell.cage])
-                for cage in cages:
-                    if all(cell in cells for cell in cage.cells):
-                        known_cells_count += len(cage.cells)
-                        cage_sum -= cage.sum
-                        cage_cells -= {cell for cell in cage.cells}
-                for cell in cage_cells.copy():
-                    if cell.solved:
-                        known_cells_count += 1
-                        cage_sum -= list(cell.candidates)[0]
-                        cage_cells -= {cell}
-                if abs(known_cells_count - cells_count) <= cage_max and known_cells_count != cells_count:  # cage_constraint = [cage_sum, [[cell.row - 1, cell.col - 1] for cell in cage_cells]]
-                    cell_ = list(cage_cells)[0]
-                    if all(cell.cage == cell_.cage for cell in cage_cells):
-                        self.cages.extend(self.cages[cell_.cage].split(cage_sum, cage_cells))
-                    elif all(cell.row == cell_.row for cell in cage_cells) or all(
-                            cell.col == cell_.col for cell in cage_cells) or all(
-                        cell in self.boxes[self.get_box(cell_.row,cell_.col)] for cell in cage_cells):
-                        self.cages.append(Cage.virtual_cage(cage_sum,
-                                                            cage_cells))  # print(f"{col1} to {col2}: {cells_count} cages:{[cage.ID for cage in cages]} known_cells_count:{known_cells_count}")
-        for box_index in range(9):
-            cells = set(self.boxes[box_index])
-            cages = set()
-            cells_count = 9
-            known_cells_count = 0
-            cage_sum = 45
-            cage_cells = cells.copy()
-            for cell in cells:
-                cages.add(self.cages[cell.cage])
-            for cage in cages:
-                if all(cell in cells for cell in cage.cells):
-                    known_cells_count += len(cage.cells)
-                    cage_sum -= cage.sum
-                    cage_cells -= {cell for cell in cage.cells}
-            for cell in cage_cells.copy():
-                if cell.solved:
-                    known_cells_count += 1
-                    cage_sum -= list(cell.candidates)[0]
-                    cage_cells -= {cell}
-            if abs(known_cells_count - cells_count) <= cage_max and known_cells_count != cells_count:
-                cell_ = list(cage_cells)[0]
-                if all(cell.cage == cell_.cage for cell in cage_cells):
-                    self.cages.extend(self.cages[cell_.cage].split(cage_sum, cage_cells))
-                elif all(cell.row == cell_.row for cell in cage_cells) or all(
-                        cell.col == cell_.col for cell in cage_cells) or all(
-                    cell in self.boxes[self.get_box(cell_.row,cell_.col)] for cell in cage_cells):
-                    self.cages.append(Cage.virtual_cage(cage_sum, cage_cells))
-        # 外
-        for row1 in range(9):
-            for row2 in range(row1, 9):
-                cells = set()
-                cages = set()
-                cage_cells = set()
-                cells_count = 0
-                known_cells_count = 0
-                cage_sum = - 45 * (row2 - row1 + 1)
-                for col in range(row1, row2 + 1):
-                    for row in range(9):
-                        cells.add(self.cell[row][col])
-                        cells_count += 1
-                for cell in cells:
-                    cages.add(self.cages[cell.cage])
-                for cage in cages:
-                    known_cells_count += len(cage.cells)
-                    cage_sum += cage.sum
-                    cage_cells.update(cage.cells)
-                cage_cells -= cells
-                for cell in cage_cells.copy():
-                    if cell.solved:
-                        known_cells_count -= 1
-                        cage_sum -= list(cell.candidates)[0]
-                        cage_cells -= {cell}
-                if abs(known_cells_count - cells_count) <= cage_max and known_cells_count != cells_count:  # cage_constraint = [cage_sum, [[cell.row - 1, cell.col - 1] for cell in cage_cells]]
-                    cell_ = list(cage_cells)[0]
-                    if all(cell.cage == cell_.cage for cell in cage_cells):
-                        self.cages.extend(self.cages[cell_.cage].split(cage_sum, cage_cells))
-                    elif all(cell.row == cell_.row for cell in cage_cells) or all(
-                            cell.col == cell_.col for cell in cage_cells) or all(
-                        cell in self.boxes[self.get_box(cell_.row,cell_.col)] for cell in cage_cells):
-                        self.cages.append(Cage.virtual_cage(cage_sum, cage_cells))
-        for col1 in range(9):
-            for col2 in range(col1, 9):
-                cells = set()
-                cages = set()
-                cage_cells = set()
-                cells_count = 0
-                known_cells_count = 0
-                cage_sum = - 45 * (col2 - col1 + 1)
-                for col in range(col1, col2 + 1):
-                    for row in range(9):
-                        cells.add(self.cell[row][col])
-                        cells_count += 1
-                for cell in cells:
-                    cages.add(self.cages[cell.cage])
-                for cage in cages:
-                    known_cells_count += len(cage.cells)
-                    cage_sum += cage.sum
-                    cage_cells.update(cage.cells)
-                cage_cells -= cells
-                for cell in cage_cells.copy():
-                    if cell.solved:
-                        known_cells_count -= 1
-                        cage_sum -= list(cell.candidates)[0]
-                        cage_cells -= {cell}
-                if abs(known_cells_count - cells_count) <= cage_max and known_cells_count != cells_count:  # cage_constraint = [cage_sum, [[cell.row - 1, cell.col - 1] for cell in cage_cells]]
-                    cell_ = list(cage_cells)[0]
-                    if all(cell.cage == cell_.cage for cell in cage_cells):
-                        self.cages.extend(self.cages[cell_.cage].split(cage_sum, cage_cells))
-                    elif all(cell.row == cell_.row for cell in cage_cells) or all(
-                            cell.col == cell_.col for cell in cage_cells) or all(
-                        cell in self.boxes[self.get_box(cell_.row,cell_.col)] for cell in cage_cells):
-                        self.cages.append(Cage.virtual_cage(cage_sum, cage_cells))
-        for box_index in range(9):
-            cells = set(self.boxes[box_index])
-            cages = set()
-            cells_count = 9
-            known_cells_count = 0
-            cage_sum = -45
-            cage_cells = cells.copy()
-            for cell in cells:
-                cages.add(self.cages[cell.cage])
-            for cage in cages:
-                known_cells_count += len(cage.cells)
-                cage_sum += cage.sum
-                cage_cells.update(cage.cells)
-            cage_cells -= cells
-            for cell in cage_cells.copy():
-                if cell.solved:
-                    known_cells_count -= 1
-                    cage_sum -= list(cell.candidates)[0]
-                    cage_cells -= {cell}
-            if abs(known_cells_count - cells_count) <= cage_max and known_cells_count != cells_count:
-                cell_ = list(cage_cells)[0]
-                if all(cell.cage == cell_.cage for cell in cage_cells):
-                    self.cages.extend(self.cages[cell_.cage].split(cage_sum, cage_cells))
-                elif all(cell.row == cell_.row for cell in cage_cells) or all(
-                        cell.col == cell_.col for cell in cage_cells) or all(
-                    cell in self.boxes[self.get_box(cell_.row,cell_.col)] for cell in cage_cells):
-                    self.cages.append(Cage.virtual_cage(cage_sum, cage_cells))
+        """
+        45法则: 区域库中每个区域的数字和为 45 的倍数, 减去完全落在区域内(内)或加上伸出区域(外)
+        的笼子, 剩下不超过 cage_max 个未解单元格时推出一个新笼子, 单元格少的先处理.
+
+        推导只取决于笼子划分与已解单元格, 两者都未变化时不再重算; 否则只重算被拆分的笼子或
+        新解出单元格所在的笼子接触的区域, 其他区域的推导与上次相同, 已在 derived_cages 中.
+        """
+        cage_ids = [cell.cage for cell in self.cell_list]
+        state = (self.solved_mask, tuple(cage_ids))
+        if state == self.rule45_state:
+            return
+        regions = None if self.rule45_state is None else self.changed_regions(self.rule45_state, state)
+        self.rule45_state = state
+        if regions is not None and not len(regions):
+            return
+        ids, cage_of = np.unique(cage_ids, return_inverse=True)
+        cage_sums = np.array([self.cages[cage_id].sum for cage_id in ids])
+        values = np.array([cell.value() if cell.solved else 0 for cell in self.cell_list])
+        for derived in self.regions.derived_cages(cage_of, cage_sums, values, cage_max, regions):
+            if derived in self.derived_cages:
+                continue
+            self.derived_cages.add(derived)
+            cage_sum, cage_mask = derived
+            cage_cells = [self.cell_list[index] for index in bit_indices(cage_mask)]
+            cell_ = cage_cells[0]
+            if all(cell.cage == cell_.cage for cell in cage_cells):
+                parent = self.cages[cell_.cage]
+                masks = [(cell, cell.mask) for cell in parent.cells]
+                children = parent.split(cage_sum, cage_cells)
+                self.add_cages(*children)
+                self.note_changes(masks)
+            elif all(cell.row == cell_.row for cell in cage_cells) or all(
+                    cell.col == cell_.col for cell in cage_cells) or all(cell.box == cell_.box for cell in cage_cells):
+                masks = [(cell, cell.mask) for cell in cage_cells]
+                self.add_cages(Cage.virtual_cage(cage_sum, cage_cells))
+                self.note_changes(masks)
+
+    def changed_regions(self, previous, state):
+        """
+        Args:
+            previous, state: 上次与本次 45 法则的 (已解单元格掩码, 每个单元格的笼子 ID)
+
+        Returns:
+            regions (np.ndarray): 接触到变化的笼子 (拆分前后的笼子, 新解出单元格所在的笼子) 的区域下标
+        """
+        before, now = np.array(previous[1]), np.array(state[1])
+        changed = before != now
+        changed[list(bit_indices(previous[0] ^ state[0]))] = True
+        cells = np.isin(before, before[changed]) | np.isin(now, now[changed])
+        return self.regions.affected(cells)
+
+    def note_changes(self, masks):
+        """
+        新建笼子时 Cage.update 直接收缩的候选数不经过 exclude, 计入删除数并放入队列, 紧凑记录时补记到下一步
+        """
+        for cell, mask in masks:
+            if cell.mask != mask:
+                self.eliminate(cell, mask & ~cell.mask)
+                self.mark_dirty(cell, mask & ~cell.mask)
+                if self.trace == "compact":
+                    self.steps.note(cell.index, mask & ~cell.mask)
+
+    def on_solved(self, cell):
+        self.solved_mask |= 1 << cell.index
 
 
 if __name__ == "__main__":
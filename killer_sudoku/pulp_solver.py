@@ -1,24 +1,41 @@
+import time
+
 import pulp
 
+try:
+    from . import man_solver
+except ImportError:  # run as a script from inside killer_sudoku
+    import man_solver
 
-class KillerSudokuSolver:
+# "loose": the original model, <= 1 per cell/group and >= target per cage
+# "tight": equalities everywhere plus cuts from each cage's allowed digit combinations
+FORMULATIONS = ("loose", "tight")
+
+
+class ModelTemplate:
     """
-    Solve Killer Sudokus 
+    The puzzle independent part of the killer sudoku model
 
-    https://en.wikipedia.org/wiki/Killer_sudoku
+    The 729 binary variables, the one-value-per-cell constraints and the
+    row/column/box constraints are the same for every 9x9 puzzle. They are
+    built once (see get_template) and each puzzle copies the problem and
+    adds only its own cage constraints.
 
     Attributes:
-        solve (method): solves sudoku
+        problem (pulp.LpProblem): problem without cage constraints
+        choices (dict): choices[i][j][n] is 1 if cell i,j holds n
+        distinct_groups (list): rows, columns and boxes
+        formulation (str): one of FORMULATIONS
     """
 
-    def __init__(self, cage_constraints):
+    def __init__(self, formulation="loose"):
         """
         Args:
-            cage_constraints (list): Lists of tuples 'cage constraints'
-                e.g. if cells [0,0], [0,1], and [0,2] sum to 12 would be
-                (12, [[0,0],[0,1],[0,2]])
+            formulation (str): "loose" or "tight", see FORMULATIONS
         """
-        self.cage_constraints = cage_constraints
+        if formulation not in FORMULATIONS:
+            raise ValueError(f"Unknown formulation {formulation!r}, expected one of {FORMULATIONS}")
+        self.formulation = formulation
         self.problem = pulp.LpProblem("Killer_Sudoku_Problem")
         self.choices = pulp.LpVariable.dicts(
             "Choice", (range(9), range(9), range(1, 10),), cat="Binary"
@@ -46,53 +63,182 @@ class KillerSudokuSolver:
 
     def _add_constraints(self):
         """
-        Adds constraints to problem
-
-        NOTE - not sure why equality constraints don't work, wierd!
+        Adds the puzzle independent constraints to problem
 
         a) arbitrary objective
 
-        b) Each cell can have at most 1 value
+        b) Each cell can have at most 1 value (exactly 1 when tight)
 
-        c) each 'distinct_group' must have at most 1 of each number
-
-        d) each cage must sum to at least target
+        c) each 'distinct_group' must have at most 1 of each number (exactly 1 when tight)
         """
+        sense = pulp.LpConstraintEQ if self.formulation == "tight" else pulp.LpConstraintLE
+
         # Arbitrary objective. Only aim is to satisfy constraints
         self.problem += (0, "Arbitrary Objective Function")
 
         # One value per cell.
         for i in range(9):
             for j in range(9):
-                one_val_per_cell = (
-                    pulp.lpSum([self.choices[i][j][n] for n in range(1, 10)]) <= 1
-                )
-                self.problem += one_val_per_cell
+                one_val_per_cell = pulp.LpAffineExpression([(self.choices[i][j][n], 1) for n in range(1, 10)])
+                self.problem += pulp.LpConstraint(one_val_per_cell, sense, f"Cell_{i}_{j}", 1)
 
         # No repeates in 'distinct_groups' row, col & box
         for n in range(1, 10):
-            for distinct_group in self.distinct_groups:
-                for i, j in distinct_group:
-                    group_count_number = [
-                        self.choices[i][j][n] for i, j in distinct_group
-                    ]
-                self.problem += pulp.lpSum(group_count_number) <= 1
-
-        # Cages add up to cage totals
-        for target, cells in self.cage_constraints:
-            cage_cells_constraint = [
-                self.choices[i][j][n] * n for i, j in cells for n in range(1, 10)
-            ]
-            self.problem += pulp.lpSum(cage_cells_constraint) >= target
+            for index, distinct_group in enumerate(self.distinct_groups):
+                group_count_number = pulp.LpAffineExpression(
+                    [(self.choices[i][j][n], 1) for i, j in distinct_group]
+                )
+                self.problem += pulp.LpConstraint(group_count_number, sense, f"Group_{index}_{n}", 1)
+
+    def instantiate(self, cage_constraints):
+        """
+        Copies the template problem and adds cage constraints
+
+        Args:
+            cage_constraints (list): Lists of tuples 'cage constraints'
 
-    def solve(self):
+        Returns:
+            problem (pulp.LpProblem): problem for one puzzle, sharing variables with the template
+        """
+        problem = self.problem.copy()
+        sense = pulp.LpConstraintEQ if self.formulation == "tight" else pulp.LpConstraintGE
+        # Cages add up to cage totals, built straight from (variable, coefficient) terms
+        for index, (target, cells) in enumerate(cage_constraints):
+            cage_cells_constraint = pulp.LpAffineExpression(
+                [(self.choices[i][j][n], n) for i, j in cells for n in range(1, 10)]
+            )
+            problem.addConstraint(pulp.LpConstraint(cage_cells_constraint, sense, f"Cage_{index}", target))
+            if self.formulation == "tight":
+                self._add_cage_cuts(problem, index, target, cells)
+        return problem
+
+    def _add_cage_cuts(self, problem, index, target, cells):
+        """
+        The digits of a cage must be one of the combinations allowed for its (sum, size):
+        one binary per combination, exactly one chosen, and each digit is used by the
+        cage exactly as often as the chosen combination contains it. A digit in every
+        combination is simply used once, a digit in none is never used. The combinations
+        are digit masks from man_solver's shared combination table.
+        """
+        allowed = man_solver.cage_combinations(target, len(cells))
+        if len(allowed) > 1:
+            chosen = pulp.LpVariable.dicts(f"Cage_{index}_combination", range(len(allowed)), cat="Binary")
+            problem.addConstraint(pulp.LpConstraint(
+                pulp.LpAffineExpression([(variable, 1) for variable in chosen.values()]),
+                pulp.LpConstraintEQ, f"Cage_{index}_combination", 1,
+            ))
+        for n in range(1, 10):
+            digit_count = [(self.choices[i][j][n], 1) for i, j in cells]
+            containing = [k for k, mask in enumerate(allowed) if mask >> n & 1]
+            if len(allowed) > 1 and 0 < len(containing) < len(allowed):
+                digit_count += [(chosen[k], -1) for k in containing]
+                rhs = 0
+            else:
+                rhs = 1 if allowed and len(containing) == len(allowed) else 0
+            problem.addConstraint(pulp.LpConstraint(
+                pulp.LpAffineExpression(digit_count), pulp.LpConstraintEQ, f"Cage_{index}_digit_{n}", rhs,
+            ))
+
+    def write(self, path):
+        """
+        Writes the template problem to an MPS file if path ends with .mps, otherwise to an LP file
+
+        Args:
+            path (str): output file path
+        """
+        if str(path).lower().endswith(".mps"):
+            self.problem.writeMPS(path)
+        else:
+            self.problem.writeLP(path)
+
+
+_TEMPLATES = {}
+
+
+def get_template(formulation="loose"):
+    """
+    Returns:
+        template (ModelTemplate): the template of formulation shared by every solver in this process
+    """
+    if formulation not in _TEMPLATES:
+        _TEMPLATES[formulation] = ModelTemplate(formulation)
+    return _TEMPLATES[formulation]
+
+
+class KillerSudokuSolver:
+    """
+    Solve Killer Sudokus 
+
+    https://en.wikipedia.org/wiki/Killer_sudoku
+
+    Attributes:
+        solve (method): solves sudoku
+    """
+
+    def __init__(self, cage_constraints, template=None, formulation="loose", presolve=False):
+        """
+        Args:
+            cage_constraints (list): Lists of tuples 'cage constraints'
+                e.g. if cells [0,0], [0,1], and [0,2] sum to 12 would be
+                (12, [[0,0],[0,1],[0,2]])
+            template (ModelTemplate): model to copy, defaults to the shared get_template(formulation)
+            formulation (str): "loose" or "tight", see FORMULATIONS; ignored when template is given
+            presolve (bool): run man_solver's candidate elimination first and fix the
+                eliminated choices to 0 and solved cells to their value
+        """
+        self.cage_constraints = cage_constraints
+        self.template = template if template is not None else get_template(formulation)
+        self.choices = self.template.choices
+        self.distinct_groups = self.template.distinct_groups
+        self.problem = self.template.instantiate(cage_constraints)
+        self.timings = {"presolve": 0.0, "milp": 0.0}
+        self.free_choices = 729
+        if presolve:
+            self._presolve()
+
+    def _presolve(self):
+        """
+        Runs logic only (no search) and adds the result to problem:
+            a) the choices logic eliminated in a cell sum to 0
+            b) a solved cell's choice is 1
+
+        Fixing is done with constraints on this puzzle's problem, the
+        variables themselves are shared with the template and are left alone.
+        CBC's own presolve then drops the fixed columns.
+        """
+        start = time.perf_counter()
+        logic = man_solver.KillerSudokuSolver(self.cage_constraints, bitmask=True, trace=False)
+        logic.solve(search=False)
+        self.free_choices = 0
+        for cell in logic.cell_list:
+            i, j, mask = cell.row, cell.col, cell.mask
+            eliminated = [(self.choices[i][j][n], 1) for n in range(1, 10) if not mask >> n & 1]
+            if eliminated:
+                self.problem.addConstraint(pulp.LpConstraint(
+                    pulp.LpAffineExpression(eliminated), pulp.LpConstraintEQ, f"Presolve_{i}_{j}", 0,
+                ))
+            if cell.solved:
+                self.problem.addConstraint(pulp.LpConstraint(
+                    pulp.LpAffineExpression([(self.choices[i][j][cell.value()], 1)]),
+                    pulp.LpConstraintEQ, f"Presolve_{i}_{j}_solved", 1,
+                ))
+            else:
+                self.free_choices += man_solver.popcount(mask)
+        self.timings["presolve"] = time.perf_counter() - start
+
+    def solve(self, solver=None):
         """
         Solves the problem
 
+        Args:
+            solver (pulp.LpSolver): solver to use, defaults to PuLP's default (CBC)
+
         Returns:
             parsed_result (list): list of row values for parsed solution
         """
-        self.problem.solve()
+        start = time.perf_counter()
+        self.problem.solve(solver)
+        self.timings["milp"] = time.perf_counter() - start
         if self.problem.status != 1:
             raise AssertionError("Problem not sucessfully solved")
         self.parsed_result = [
@@ -0,0 +1,28 @@
+import pytest
+from killer_sudoku import batch
+from test.test_man_solver import CAGE_CONSTRAINTS
+
+# Not a valid killer puzzle: no three distinct digits sum to 5
+BROKEN = [(5, [[0, 0], [0, 1], [0, 2]])]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_solve_many(workers):
+    puzzles = iter([CAGE_CONSTRAINTS, BROKEN, CAGE_CONSTRAINTS])
+
+    results = sorted(batch.solve_many(puzzles, engine="man", workers=workers, chunksize=1), key=lambda r: r["index"])
+
+    assert [result["index"] for result in results] == [0, 1, 2]
+    assert [result["solved"] for result in results] == [True, False, True]
+    assert results[0]["solution"] == results[2]["solution"]
+    assert results[1]["solution"] is None
+
+
+def test_solve_many_records_unsolved():
+    result = next(batch.solve_many([BROKEN], engine="dfs", workers=1))
+    assert not result["solved"] and result["error"] is None
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        list(batch.solve_many([CAGE_CONSTRAINTS], engine="sat"))
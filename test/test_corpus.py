@@ -0,0 +1,140 @@
+import base64
+
+import pytest
+
+from killer_sudoku import corpus, killer_sudoku
+from test.test_man_solver import CAGE_CONSTRAINTS
+
+# BOARD_BASE64 is a board captured from dailykillersudoku.com. SOLUTION_BASE64 is the same
+# encoding with every given slot holding its solved digit, the layout decode_solutions accepts
+BOARD_BASE64 = "AZoAAAAAAAIAAwADAAQAAQABAAYABwAHAAIAAwAKAAQABQAFAAYABwAIAAgACQAKAAQACwAFAAYADAAMAA4ACQAQABEACwANAA0AEwAMAA4ADwAQABEAEgAUAA0AEwATABUADwAQABcAEgAUABQAGgAbABUAHAAWABcAGAAYABkAGgAbABsAHAAWAB0AHgAZABkAGgAfAB8AHAAdAB0AHgAgACAICQgMDxMQDg8KDAcYEQgMEwQPDAcICg4MEg8NDA8HCgg="
+SOLUTION_BASE64 = "AZoGAAIAAwIIAwEDCQQEAQUBBwYBBwQHBQIDAwcKAgQJBQgFBgYJBwcICAgGCQUKBAQBCwIFAwYHDAkMAg4ECQgQAREGCwMNBQ0EEwgMBg4FDwIQAxEHEgEUCQ0DEwUTARUHDwkQBhcIEgQUAhQFGgEbBxUCHAYWCBcDGAkYBBkCGgMbCRsBHAQWBx0FHgYZCBkIGgYfBB8JHAMdBR0CHgcgASAICQgMDxMQDg8KDAcYEQgMEwQPDAcICg4MEg8NDA8HCgg="
+
+
+def normalized(cages):
+    return sorted((cage_sum, sorted(map(tuple, cells))) for cage_sum, cells in cages)
+
+
+def test_board_base64_round_trip():
+    record = corpus.decode_board_base64(BOARD_BASE64)
+
+    assert corpus.encode_board_base64(record) == BOARD_BASE64
+    assert record["cages"] == killer_sudoku.KillerSudoku(BOARD_BASE64).cages
+    assert sum(cage_sum for cage_sum, _ in record["cages"]) == 405
+
+
+def test_cell_masks():
+    cells = [[0, 0], [4, 5], [8, 8]]
+    mask = corpus.cells_to_mask(cells)
+    assert mask == 1 | 1 << 41 | 1 << 80
+    assert corpus.mask_to_cells(mask) == cells
+
+
+def test_jsonl_round_trip(tmp_path):
+    givens = [[0] * 9 for _ in range(9)]
+    givens[4][4] = 7
+    records = [
+        {"id": 1, "cages": CAGE_CONSTRAINTS, "givens": givens, "difficulty": 3},
+        {"id": 2, **corpus.decode_board_base64(BOARD_BASE64)},
+    ]
+    path = tmp_path / "puzzles.jsonl"
+
+    assert corpus.write_jsonl(path, iter(records)) == 2
+    first, second = corpus.read_corpus(path)
+
+    assert normalized(first["cages"]) == normalized(CAGE_CONSTRAINTS)
+    assert first["givens"] == givens and first["difficulty"] == 3
+    assert second["cages"] == records[1]["cages"]
+
+    corpus.write_jsonl(path, records[1:], board_base64=True)
+    assert (next(corpus.read_jsonl(path))["cages"]) == records[1]["cages"]
+    assert '"board_base64":"' + BOARD_BASE64 in path.read_text()
+
+
+def test_binary_round_trip(tmp_path):
+    record = {"id": 26274, **corpus.decode_board_base64(BOARD_BASE64)}
+    path = tmp_path / "puzzles.bin"
+
+    assert corpus.write_corpus(path, [record, {"id": 7, "cages": CAGE_CONSTRAINTS}]) == 2
+    first, second = corpus.read_corpus(path)
+
+    assert corpus.encode_board_base64(first) == BOARD_BASE64
+    assert first["id"] == 26274
+    assert second["givens"] is None
+    assert normalized(next(corpus.cage_constraints(path))) == normalized(record["cages"])
+    assert normalized(second["cages"]) == normalized(CAGE_CONSTRAINTS)
+
+
+def test_result_writer(tmp_path):
+    solution = [[(row * 3 + row // 3 + col) % 9 + 1 for col in range(9)] for row in range(9)]
+    path = tmp_path / "results.jsonl"
+
+    with corpus.ResultWriter(path) as writer:
+        writer.write({"index": 0, "solved": True, "solution": solution}, id=26274)
+        writer.write({"index": 1, "solved": False, "solution": None}, id=26079)
+
+    results = list(corpus.read_results(path))
+    assert writer.count == 2
+    assert results[0] == {"index": 0, "solved": True, "solution": solution, "id": 26274}
+    assert results[1]["solution"] is None
+
+
+def test_decode_boards_matches_killer_sudoku():
+    encodings = [BOARD_BASE64, corpus.encode_board_base64({"cages": CAGE_CONSTRAINTS, "check": 7})] * 2
+    boards = killer_sudoku.decode_boards(encodings)
+
+    assert boards["givens"].shape == boards["cage_ids"].shape == (4, 9, 9)
+    for index, encoding in enumerate(encodings):
+        board = killer_sudoku.KillerSudoku(encoding)
+        assert boards["givens"][index].tolist() == board.startingGrid
+        assert killer_sudoku.board_cages(boards, index) == board.cages
+    assert boards["cage_counts"].tolist() == [33, len(CAGE_CONSTRAINTS)] * 2
+    assert boards["check"][1] == 7
+    assert boards["cage_sums"][1, len(CAGE_CONSTRAINTS):].sum() == 0
+
+
+def test_starting_grid_rows_are_independent():
+    grid = killer_sudoku.KillerSudoku(BOARD_BASE64).startingGrid
+    grid[0][0] = 5
+    assert [row[0] for row in grid[1:]] == [0] * 8
+
+
+def test_verify_solutions():
+    board = killer_sudoku.KillerSudoku(BOARD_BASE64, SOLUTION_BASE64)
+    solution = board.solution
+    boards = killer_sudoku.decode_boards([BOARD_BASE64] * 4)
+    swapped = [row[:] for row in solution]
+    # swapping columns 0 and 3 keeps rows and columns permutations but breaks boxes
+    for row in swapped:
+        row[0], row[3] = row[3], row[0]
+    repeated = [row[:] for row in solution]
+    repeated[0][0] = repeated[0][1]
+
+    checks = killer_sudoku.verify_solutions(
+        [solution, swapped, repeated, [[0] * 9] * 9], boards, killer_sudoku.decode_solutions([SOLUTION_BASE64] * 4)
+    )
+
+    assert checks["valid"].tolist() == [True, False, False, False]
+    assert checks["rows"].tolist() == [True, True, False, False]
+    assert checks["columns"].tolist() == [True, True, False, False]
+    assert not checks["boxes"][1] and not checks["cages"][1]
+    assert not checks["matches"][1]
+    assert board.verify(solution) and not board.verify(swapped)
+
+
+def test_solution_base64_layout():
+    board = base64.b64decode(BOARD_BASE64)
+    solution = base64.b64decode(SOLUTION_BASE64)
+    # only the given slots differ from the captured board
+    assert solution[:2] == board[:2] and solution[3:164:2] == board[3:164:2] and solution[164:] == board[164:]
+    digits = killer_sudoku.decode_solution(SOLUTION_BASE64)
+    assert [digit for row in digits for digit in row] == list(solution[2:164:2])
+
+    flat = bytes(digit for row in digits for digit in row)
+    ascii_digits = "".join(str(digit) for digit in flat).encode()
+    for encoded in (flat, ascii_digits, b"\x01\x9a" + flat, bytes([0]) + solution[1:]):
+        with pytest.raises(ValueError):
+            killer_sudoku.decode_solution(base64.b64encode(encoded).decode())
+        # an unknown solution layout does not stop the board from loading
+        killer = killer_sudoku.KillerSudoku(BOARD_BASE64, base64.b64encode(encoded).decode())
+        assert killer.solution is None and killer.cages == killer_sudoku.KillerSudoku(BOARD_BASE64).cages
@@ -33,3 +33,47 @@ def test_solve():
     flat_solution = [item for sublist in solution for item in sublist]
     flat_expected = [item for sublist in EXPECTED_OUTPUT for item in sublist]
     assert all([a == b for a, b in zip(flat_expected, flat_solution)])
+
+
+def test_bitboard_solve():
+    puz = dfs_solver.BitboardSudoku(TEST_INPUT)
+    solution = puz.solve()
+    assert solution == EXPECTED_OUTPUT
+    assert puz.nodes > 0
+    assert TEST_INPUT[0] == [0] * 9
+
+
+def test_bitboard_unsolvable():
+    board = [row[:] for row in TEST_INPUT]
+    board[0][0] = 1  # 1 already in column 0
+    assert dfs_solver.BitboardSudoku(board).solve() is None
+
+    board = [[0] * 9 for _ in range(9)]
+    board[0] = [0, 2, 3, 4, 5, 6, 7, 8, 9]
+    board[1][0] = 1  # (0, 0) has no candidate left
+    assert dfs_solver.BitboardSudoku(board).solve() is None
+
+
+def _triple_cages(solution):
+    """Cages covering each row in three horizontal triples, summed from solution"""
+    return [
+        (sum(solution[row][col] for col in range(start, start + 3)), [[row, col] for col in range(start, start + 3)])
+        for row in range(9)
+        for start in (0, 3, 6)
+    ]
+
+
+def test_killer_bitboard_solve():
+    cages = _triple_cages(EXPECTED_OUTPUT)
+    puz = dfs_solver.KillerBitboardSudoku(cages, TEST_INPUT)
+    assert puz.solve() == EXPECTED_OUTPUT
+
+    solution = dfs_solver.KillerBitboardSudoku(cages).solve()
+    assert all(sum(solution[row][col] for row, col in cells) == total for total, cells in cages)
+    assert all(sorted(row) == list(range(1, 10)) for row in solution)
+
+
+def test_killer_bitboard_unreachable_cage():
+    cages = _triple_cages(EXPECTED_OUTPUT)
+    cages[0] = (5, cages[0][1])  # three distinct digits sum to at least 6
+    assert dfs_solver.KillerBitboardSudoku(cages).solve() is None
@@ -0,0 +1,75 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from killer_sudoku import killer_client
+from test.test_corpus import BOARD_BASE64, SOLUTION_BASE64
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.hits.append(self.path)
+        puzzle_id = int(self.path.rsplit("/", 1)[-1])
+        if puzzle_id in self.server.missing:
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = f'<script>{{"board_base64":"{BOARD_BASE64}","solution_base64":"{SOLUTION_BASE64}"}}</script>'.encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.hits = []
+    server.missing = {404}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def client(server, cache, **kwargs):
+    return killer_client.KillerCient(f"http://127.0.0.1:{server.server_port}", cache=cache, retries=0, **kwargs)
+
+
+def test_fetch_is_cached(server, tmp_path):
+    board, solution = client(server, tmp_path, rate=0).fetch(7)
+    assert board == BOARD_BASE64
+    assert solution == SOLUTION_BASE64
+
+    # a new client on the same cache does not touch the network
+    killer = client(server, tmp_path, rate=0).get_killer_sudoku(7)
+    assert killer.verify(killer.solution)
+    assert server.hits == ["/puzzle/7"]
+
+
+def test_fetch_many(server, tmp_path):
+    results = list(client(server, tmp_path, rate=0, workers=4).fetch_many([1, 2, 404, 3]))
+
+    assert [puzzle_id for puzzle_id, _, _ in results] == [1, 2, 404, 3]
+    assert results[2] == (404, None, None)
+    assert all(board == BOARD_BASE64 for puzzle_id, board, _ in results if puzzle_id != 404)
+    assert sorted(path for path in server.hits) == ["/puzzle/1", "/puzzle/2", "/puzzle/3", "/puzzle/404"]
+
+
+def test_rate_limit(server):
+    start = time.monotonic()
+    list(client(server, None, rate=20, workers=4).fetch_many(range(5)))
+    # 5 requests at 20 per second need at least 4 intervals of 50 ms
+    assert time.monotonic() - start >= 0.2
+    assert len(server.hits) == 5
+
+
+def test_board_pattern_accepts_escaped_slashes():
+    page = '"board_base64":"ab\\/+=","solution_base64":"cd\\/="'
+    assert killer_client.BOARD_PATTERN.search(page).groups() == ("ab\\/+=", "cd\\/=")
@@ -1,3 +1,7 @@
+import random
+from itertools import permutations
+
+import pytest
 from killer_sudoku import man_solver
 import numpy as np
 
@@ -53,3 +57,393 @@ def test_solve():
     solution_array = np.array(solution)
     assert (solution_array.sum(axis=1) == 45).all()
     assert (solution_array.sum(axis=0) == 45).all()
+
+
+def test_mask_helpers():
+    mask = man_solver.digits_to_mask({2, 5, 9})
+    assert man_solver.mask_to_digits(mask) == {2, 5, 9}
+    assert man_solver.popcount(mask) == 3
+    assert man_solver.lowest_digit(mask) == 2
+    assert man_solver.lowest_bit(mask) == 1 << 2
+    assert man_solver.intersect_masks([mask, man_solver.digits_to_mask({5, 9, 1})]) == man_solver.digits_to_mask({5, 9})
+
+
+def test_bitmask_matches_set():
+    set_solver = man_solver.KillerSudokuSolver(cage_constraints=CAGE_CONSTRAINTS)
+    mask_solver = man_solver.KillerSudokuSolver(cage_constraints=CAGE_CONSTRAINTS, bitmask=True)
+
+    set_solved, _ = set_solver.solve()
+    mask_solved, _ = mask_solver.solve()
+
+    assert set_solved == mask_solved
+    assert set_solver.board() == mask_solver.board()
+    assert set_solver.solution() == mask_solver.solution()
+
+
+def test_cage_combinations():
+    as_digits = lambda masks: {man_solver.MASK_DIGITS[mask] for mask in masks}
+
+    assert as_digits(man_solver.cage_combinations(17, 2)) == {(8, 9)}
+    assert as_digits(man_solver.cage_combinations(10, 3)) == {(1, 2, 7), (1, 3, 6), (1, 4, 5), (2, 3, 5)}
+    allowed = man_solver.digits_to_mask({1, 2, 3, 5, 7})
+    assert as_digits(man_solver.cage_combinations(10, 3, allowed)) == {(1, 2, 7), (2, 3, 5)}
+    assert man_solver.cage_combinations(46, 9) == ()
+    assert sum(len(masks) for masks in man_solver.COMBINATION_TABLE.values()) == 512
+
+
+def test_matching_support_matches_permutations():
+    rng = random.Random(0)
+    for _ in range(200):
+        size = rng.randint(2, 6)
+        digits = tuple(sorted(rng.sample(range(1, 10), size)))
+        masks = [man_solver.digits_to_mask(rng.sample(range(1, 10), rng.randint(1, 9))) for _ in range(size)]
+
+        expected = [0] * size
+        possible = False
+        for perm in permutations(digits):
+            if all(mask >> number & 1 for mask, number in zip(masks, perm)):
+                possible = True
+                for index, number in enumerate(perm):
+                    expected[index] |= 1 << number
+
+        assert man_solver.matching_support(digits, masks) == (expected if possible else None)
+
+
+def test_queue_propagation():
+    sweep_solver = man_solver.KillerSudokuSolver(cage_constraints=CAGE_CONSTRAINTS)
+    queue_solver = man_solver.KillerSudokuSolver(cage_constraints=CAGE_CONSTRAINTS, propagation="queue")
+
+    sweep_solved, _ = sweep_solver.solve()
+    queue_solved, _ = queue_solver.solve()
+
+    assert sweep_solved and queue_solved
+    assert sweep_solver.solution() == queue_solver.solution()
+    assert 0 < queue_solver.unit_scans() <= sweep_solver.unit_scans()
+    assert not queue_solver.queue and not queue_solver.cage_queue
+
+
+def test_unknown_propagation():
+    with pytest.raises(ValueError):
+        man_solver.KillerSudokuSolver(cage_constraints=CAGE_CONSTRAINTS, propagation="depth")
+
+
+def test_rule45_does_not_repeat_derived_cages():
+    killer_solver = man_solver.KillerSudokuSolver(cage_constraints=CAGE_CONSTRAINTS)
+
+    killer_solver.rule45()
+    cage_count = len(killer_solver.cages)
+    killer_solver.rule45()
+
+    assert len(killer_solver.cages) == cage_count
+
+
+def test_rule45_coverage_follows_splits():
+    solved_solver = man_solver.KillerSudokuSolver(cage_constraints=CAGE_CONSTRAINTS, trace=False)
+    solved_solver.solve()
+    solution = solved_solver.solution()
+    killer_solver = man_solver.KillerSudokuSolver(cage_constraints=CAGE_CONSTRAINTS, trace=False)
+    killer_solver.rule45()
+    for row, col in ((0, 0), (2, 6), (4, 4), (8, 8)):
+        killer_solver.set_number(killer_solver.cell[row][col], solution[row][col], "update", "")
+    # with cages split and some cells solved, derive cage by cage and compare with the matrix result
+    cells = killer_solver.cell_list
+    cages = {cell.cage: killer_solver.cages[cell.cage] for cell in cells}
+    solved = {cell.index: cell.value() for cell in cells if cell.solved}
+    expected = set()
+    for mask in killer_solver.regions.masks:
+        inside = [cage for cage in cages.values() if not cage.cell_mask & ~mask]
+        touching = [cage for cage in cages.values() if cage.cell_mask & mask]
+        base = 45 * bin(mask).count("1") // 9
+        for cage_mask, cage_sum in (
+            (mask & ~man_solver.union_masks(cage.cell_mask for cage in inside), base - sum(cage.sum for cage in inside)),
+            (man_solver.union_masks(cage.cell_mask for cage in touching) & ~mask, sum(cage.sum for cage in touching) - base),
+        ):
+            for index in man_solver.bit_indices(cage_mask & killer_solver.solved_mask):
+                cage_sum -= solved[index]
+            cage_mask &= ~killer_solver.solved_mask
+            if 0 < bin(cage_mask).count("1") <= 3:
+                expected.add((cage_sum, cage_mask))
+
+    ids = [cell.cage for cell in cells]
+    cage_ids, cage_of = np.unique(ids, return_inverse=True)
+    derived = killer_solver.regions.derived_cages(
+        cage_of, np.array([cages[cage_id].sum for cage_id in cage_ids]), np.array([solved.get(index, 0) for index in range(81)]), 3
+    )
+    assert expected and set(derived) == expected
+    assert [bin(mask).count("1") for _, mask in derived] == sorted(bin(mask).count("1") for _, mask in derived)
+
+
+def test_rule45_refreshes_only_changed_regions():
+    solved_solver = man_solver.KillerSudokuSolver(cage_constraints=CAGE_CONSTRAINTS, trace=False)
+    solved_solver.solve()
+    killer_solver = man_solver.KillerSudokuSolver(cage_constraints=CAGE_CONSTRAINTS, trace=False)
+    killer_solver.rule45()
+    previous = killer_solver.rule45_state
+    cell = killer_solver.cell[4][4]
+    killer_solver.set_number(cell, solved_solver.solution()[4][4], "update", "")
+    regions = killer_solver.changed_regions(previous, (killer_solver.solved_mask, previous[1]))
+    cage_mask = killer_solver.cages[cell.cage].cell_mask
+    touching = [r for r, mask in enumerate(killer_solver.regions.masks) if mask & cage_mask]
+    assert list(regions) == touching and len(touching) < len(killer_solver.regions.masks)
+
+    # after a logic solve, re-deriving every region finds nothing the incremental passes missed
+    killer_solver.solve(search=False)
+    derived = set(killer_solver.derived_cages)
+    killer_solver.rule45_state = None
+    killer_solver.rule45()
+    assert set(killer_solver.derived_cages) == derived
+
+
+def test_region_library():
+    library = man_solver.REGIONS
+    assert len(set(library.masks)) == len(library) > 300
+    # every region is a union of disjoint rows, columns and boxes
+    assert all(bin(mask).count("1") % 9 == 0 for mask in library.masks)
+    assert "row 1 + box 4" in library.names and "box 1+5+9" in library.names
+
+
+def test_cage_registry():
+    killer_solver = man_solver.KillerSudokuSolver(cage_constraints=CAGE_CONSTRAINTS)
+    registry = killer_solver.cages
+    cell = killer_solver.cell[0][0]
+    first = registry.cages_of(cell)[0]
+    active = len(registry)
+
+    duplicate = man_solver.Cage.virtual_cage(first.sum, set(first.cells))
+    assert registry.add(duplicate) is first
+    assert registry[duplicate.ID] is first
+    assert len(registry) == active
+
+    registry.retire(first)
+    assert first not in registry
+    assert registry[first.ID] is first
+    assert registry.cages_of(cell) == []
+    assert registry.stats() == {"active": active - 1, "registered": active, "rejected": 1, "retired": 1}
+
+
+@pytest.mark.parametrize("propagation", ["sweep", "queue"])
+def test_compact_trace_rebuilds_boards(propagation):
+    killer_solver = man_solver.KillerSudokuSolver(cage_constraints=CAGE_CONSTRAINTS, propagation=propagation, trace="compact")
+    trace = killer_solver.steps
+    boards = [killer_solver.board()]
+    record = trace.record
+
+    def record_and_snapshot(*args):
+        record(*args)
+        boards.append(killer_solver.board())
+
+    trace.record = record_and_snapshot
+    solved, steps = killer_solver.solve()
+
+    assert solved and steps is trace
+    assert len(trace) == len(boards) > trace.CHECKPOINT
+    assert [step['board'] for step in trace] == boards
+    for index in (len(boards) - 1, 1, trace.CHECKPOINT + 3, 0, -1):
+        assert trace[index]['board'] == boards[index]
+    assert trace[0]['action'] == "Initializing"
+    assert trace[-1]['action'].startswith(f"[{killer_solver.step}]Solved cell")
+
+
+def test_trace_disabled():
+    full_solver = man_solver.KillerSudokuSolver(cage_constraints=CAGE_CONSTRAINTS)
+    quiet_solver = man_solver.KillerSudokuSolver(cage_constraints=CAGE_CONSTRAINTS, trace=False)
+
+    assert quiet_solver.solve() == (True, [])
+    full_solver.solve()
+    assert quiet_solver.solution() == full_solver.solution()
+    with pytest.raises(ValueError):
+        man_solver.KillerSudokuSolver(cage_constraints=CAGE_CONSTRAINTS, trace="boards")
+
+
+def test_search_fallback():
+    logic_solver = man_solver.KillerSudokuSolver(cage_constraints=CAGE_CONSTRAINTS)
+    search_solver = man_solver.KillerSudokuSolver(cage_constraints=CAGE_CONSTRAINTS)
+
+    assert logic_solver.solve(search=False)[0]
+    assert search_solver.search()
+    assert search_solver.is_solved()
+    assert search_solver.solution() == logic_solver.solution()
+    assert search_solver.search_nodes > 0
+    assert "[search]" in search_solver.steps[-1]['action']
+
+
+@pytest.mark.parametrize("propagation", ["sweep", "queue"])
+def test_profile_report(propagation):
+    plain_solver = man_solver.KillerSudokuSolver(cage_constraints=CAGE_CONSTRAINTS, bitmask=True, propagation=propagation, trace=False)
+    profiled_solver = man_solver.KillerSudokuSolver(cage_constraints=CAGE_CONSTRAINTS, bitmask=True, propagation=propagation, trace=False, profile=True)
+
+    assert len(plain_solver.solve()) == 2
+    solved, steps, report = profiled_solver.solve()
+    assert solved and profiled_solver.solution() == plain_solver.solution()
+
+    techniques = report["techniques"]
+    assert set(techniques) == set(man_solver.PROFILED_METHODS.values())
+    assert techniques["rule45"]["calls"] >= 1 and techniques["cage_update"]["calls"] > 0
+    # nested techniques are counted once, so the techniques add up to the totals
+    assert sum(stats["eliminations"] for stats in techniques.values()) == report["eliminations"] > 0
+    assert sum(stats["seconds"] for stats in techniques.values()) <= report["seconds"]
+    assert report["passes"] and report["passes"][-1]["solved"] == 81
+
+
+def test_subset_unions():
+    items = [(1 << 0, 0b0110), (1 << 1, 0b1100), (1 << 2, 0b1010), (1 << 3, 0b110000)]
+    assert man_solver.subset_unions(items, 3) == [(0b0111, 0b1110)]
+    assert man_solver.subset_unions(items, 2) == []
+
+
+def test_naked_and_hidden_subsets():
+    row_cages = [(45, [[row, col] for col in range(9)]) for row in range(9)]
+    solver = man_solver.KillerSudokuSolver(cage_constraints=row_cages, bitmask=True, trace="compact")
+    row = solver.rows[0]
+    # naked triple {1, 2, 3} in (1,1)-(1,3)
+    for cell, keep in zip(row, ({1, 2}, {2, 3}, {1, 3})):
+        for number in set(range(1, 10)) - keep:
+            solver.exclude(cell, number, "update", "")
+    # hidden pair {4, 5} in (2,1)-(2,2)
+    for cell in solver.rows[1][2:]:
+        for number in (4, 5):
+            solver.exclude(cell, number, "update", "")
+
+    solver.find_subsets(row, 0)
+    solver.find_subsets(solver.rows[1], 1)
+
+    assert all(cell.candidates == set(range(4, 10)) for cell in row[3:])
+    assert [cell.candidates for cell in solver.rows[1][:2]] == [{4, 5}, {4, 5}]
+    assert {man_solver.TECHNIQUES[technique] for technique in solver.steps.techniques} >= {"naked_subset", "hidden_subset"}
+    positions = [0] * 270
+    for cell in solver.cell_list:
+        for unit, bit in solver.cell_units[cell.index]:
+            for number in man_solver.MASK_DIGITS[cell.mask]:
+                positions[unit * 10 + number] |= bit
+    assert positions == solver.digit_positions
+
+
+@pytest.mark.parametrize("bitmask", [False, True])
+def test_cage_subsets_skip_digits_of_solved_cells(bitmask):
+    # the 15-cage {1, 2, 3, 4, 5} spans rows 0-1; the other cells fill out rows 0-1
+    cages = [
+        (15, [[0, 2], [0, 3], [1, 3], [1, 4], [1, 5]]),
+        (39, [[0, col] for col in (0, 1, 4, 5, 6, 7, 8)]),
+        (36, [[1, col] for col in (0, 1, 2, 6, 7, 8)]),
+    ] + [(45, [[row, col] for col in range(9)]) for row in range(2, 9)]
+    solver = man_solver.KillerSudokuSolver(cage_constraints=cages, bitmask=bitmask, trace=False)
+    parent = solver.cages[solver.cell[0][2].cage]
+    # split as rule45 does: {1, 5} or {2, 4} in row 0, {1, 3, 5} or {2, 3, 4} in row 1
+    solver.add_cages(*parent.split(6, [solver.cell[0][2], solver.cell[0][3]]))
+    solver.set_number(solver.cell[0][2], 1, "update", "")
+    solver.exclude(solver.cell[0][3], 2, "update", "")
+    # 1 is placed in one child, the cells of the other child in the still active parent keep it
+    assert all(solver.cell[1][col].has(1) for col in (3, 4, 5))
+
+    solver.find_cage_subsets(parent)
+
+    # 1 is already used, so {1, 2, 3} is no hidden triple and row 1 keeps its 4 ({2, 3, 4} with (0,3) = 5)
+    assert all(solver.cell[1][col].has(4) for col in (3, 4, 5))
+
+
+@pytest.mark.parametrize("propagation", ["sweep", "queue"])
+def test_solve_budgets(propagation):
+    solver = man_solver.KillerSudokuSolver(cage_constraints=CAGE_CONSTRAINTS, propagation=propagation, trace=False)
+    assert solver.solve()[0] and solver.stop_reason == "solved"
+
+    timed_solver = man_solver.KillerSudokuSolver(cage_constraints=CAGE_CONSTRAINTS, propagation=propagation, trace=False)
+    assert not timed_solver.solve(time_budget=0)[0]
+    assert timed_solver.stop_reason == "time" and timed_solver.search_nodes == 0
+
+    stepped_solver = man_solver.KillerSudokuSolver(cage_constraints=CAGE_CONSTRAINTS, propagation=propagation, trace="compact")
+    solved, steps = stepped_solver.solve(max_steps=20)
+    assert not solved and stepped_solver.stop_reason == "steps"
+    assert 20 <= stepped_solver.actions == len(steps) - 1 < solver.actions
+
+
+def test_solve_stops_at_fixpoint():
+    # every row is a 45 cage: nothing can be deduced
+    row_cages = [(45, [[row, col] for col in range(9)]) for row in range(9)]
+    solver = man_solver.KillerSudokuSolver(cage_constraints=row_cages, bitmask=True, trace=False)
+
+    assert not solver.solve(search=False)[0]
+    assert solver.stop_reason == "fixpoint"
+    assert solver.passes == 1 and solver.actions == 0
+
+
+@pytest.mark.parametrize("bitmask", [False, True])
+@pytest.mark.parametrize("propagation", ["sweep", "queue"])
+def test_solve_unsolvable(bitmask, propagation):
+    # moving 1 between two cage sums keeps the cages complete and the total at 405, but leaves no solution
+    cages = [(total, cells) for total, cells in CAGE_CONSTRAINTS]
+    cages[0] = (cages[0][0] + 1, cages[0][1])
+    cages[1] = (cages[1][0] - 1, cages[1][1])
+    solver = man_solver.KillerSudokuSolver(cage_constraints=cages, bitmask=bitmask, propagation=propagation, trace=False)
+
+    assert not solver.solve()[0]
+    assert any(cell.mask == 0 for cell in solver.cell_list) and solver.search_nodes == 0
+
+
+def solver_state(solver):
+    cages = {cage.ID: (cage.solved, frozenset(cage.combinations)) for cage in solver.cages}
+    return (solver.board(), solver.solved_mask, [cell.cage for cell in solver.cell_list], list(solver.digit_positions),
+            cages, solver.cages.stats(), set(solver.derived_cages))
+
+
+@pytest.mark.parametrize("bitmask", [False, True])
+@pytest.mark.parametrize("propagation", ["sweep", "queue"])
+def test_snapshot_restore(bitmask, propagation):
+    solver = man_solver.KillerSudokuSolver(cage_constraints=CAGE_CONSTRAINTS, bitmask=bitmask, propagation=propagation, trace=False)
+    solver.solve(search=False, max_steps=30)
+    snapshot = solver.snapshot()
+    state = solver_state(solver)
+
+    # the right guess, solved to the end by logic
+    assert solver.solve()[0]
+    solution = solver.solution()
+    solver.restore(snapshot)
+    assert solver_state(solver) == state
+    cell = next(cell for cell in solver.cell_list if not cell.solved)
+    solver.set_number(cell, solution[cell.row][cell.col], "search", "Guess")
+    assert solver.solve(search=False)[0] and solver.solution() == solution
+
+    # the same snapshot restores again after a wrong guess
+    solver.restore(snapshot)
+    wrong = next(number for number in cell.candidates if number != solution[cell.row][cell.col])
+    solver.set_number(cell, wrong, "search", "Guess")
+    solver.restore(snapshot)
+    assert solver_state(solver) == state
+    assert solver.solve()[0] and solver.solution() == solution
+
+
+def test_compact_cells_and_cages():
+    solver = man_solver.KillerSudokuSolver(cage_constraints=CAGE_CONSTRAINTS, bitmask=True)
+    cell = solver.cell[4][5]
+    cage = solver.cages[cell.cage]
+
+    assert not hasattr(cell, "__dict__") and not hasattr(cage, "__dict__")
+    assert cell.box == solver.get_box(4, 5) == 4
+    assert [c.index for c in cage.cells] == sorted(c.index for c in cage.cells)
+    # cells may be any iterable, including a one-shot generator
+    virtual = man_solver.Cage.virtual_cage(cage.sum, (c for c in cage.cells))
+    assert virtual.cell_mask == cage.cell_mask and virtual.cells == cage.cells
+    left, right = cage.split(1, (c for c in cage.cells[:1]))
+    assert left.cell_mask | right.cell_mask == cage.cell_mask and not left.cell_mask & right.cell_mask
+    for unit, cells in enumerate(solver.rows + solver.cols + solver.boxes):
+        assert [c.index for c in cells] == list(man_solver.UNIT_CELLS[unit])
+        for position, c in enumerate(cells):
+            assert (unit, 1 << position) in man_solver.CELL_UNITS[c.index]
+
+
+@pytest.mark.parametrize("propagation", ["sweep", "queue"])
+def test_step_budget_is_per_call(propagation):
+    solver = man_solver.KillerSudokuSolver(cage_constraints=CAGE_CONSTRAINTS, propagation=propagation, trace=False)
+    snapshot = solver.snapshot()
+
+    assert not solver.solve(search=False, max_steps=20)[0]
+    first = solver.actions
+    assert first >= 20 and solver.stop_reason == "steps"
+    # a second call gets its own budget instead of stopping at once
+    solved = solver.solve(search=False, max_steps=20)[0]
+    assert solved or solver.actions - first >= 20
+
+    # and so does a call after restore(), which replays the first call exactly
+    solver.restore(snapshot)
+    before = solver.actions
+    assert not solver.solve(search=False, max_steps=20)[0]
+    assert solver.actions - before == first and solver.stop_reason == "steps"
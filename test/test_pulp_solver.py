@@ -1,3 +1,4 @@
+import pytest
 from killer_sudoku import pulp_solver
 import numpy as np
 
@@ -53,3 +54,60 @@ def test_solve():
     solution_array = np.array(solution)
     assert (solution_array.sum(axis=1) == 45).all()
     assert (solution_array.sum(axis=0) == 45).all()
+
+
+def test_template_shared(tmp_path):
+    template = pulp_solver.get_template()
+    first = pulp_solver.KillerSudokuSolver(cage_constraints=CAGE_CONSTRAINTS)
+    second = pulp_solver.KillerSudokuSolver(cage_constraints=CAGE_CONSTRAINTS[:3])
+
+    assert first.template is second.template is pulp_solver.get_template()
+    assert template.problem.numConstraints() == 81 + 9 * 27
+    assert first.problem.numConstraints() == 81 + 9 * 27 + len(CAGE_CONSTRAINTS)
+    assert second.problem.numConstraints() == 81 + 9 * 27 + 3
+
+    template.write(str(tmp_path / "template.lp"))
+    template.write(str(tmp_path / "template.mps"))
+    assert "Choice_0_0_1" in (tmp_path / "template.lp").read_text()
+    assert (tmp_path / "template.mps").read_text().startswith("*SENSE:Minimize")
+
+
+def test_solve_tight():
+    killer_solver = pulp_solver.KillerSudokuSolver(cage_constraints=CAGE_CONSTRAINTS, formulation="tight")
+
+    solution_array = np.array(killer_solver.solve())
+
+    for target, cells in CAGE_CONSTRAINTS:
+        assert sum(solution_array[i, j] for i, j in cells) == target
+        assert len({solution_array[i, j] for i, j in cells}) == len(cells)
+    assert (np.sort(solution_array, axis=0) == np.arange(1, 10)[:, None]).all()
+    assert (np.sort(solution_array, axis=1) == np.arange(1, 10)[None, :]).all()
+
+
+def test_cage_cuts():
+    template = pulp_solver.get_template("tight")
+    problem = template.instantiate([(4, [[0, 0], [0, 1]]), (10, [[1, 0], [1, 1], [1, 2]])])
+    names = {variable.name for variable in problem.variables()}
+    constraints = problem.constraints
+
+    # (4, 2) has the single combination {1, 3}: no combination binaries, digits fixed
+    assert not any(name.startswith("Cage_0_combination") for name in names)
+    assert [constraints[f"Cage_0_digit_{n}"].constant for n in range(1, 10)] == [-1, 0, -1, 0, 0, 0, 0, 0, 0]
+    # (10, 3) has the four combinations {1,2,7}, {1,3,6}, {1,4,5}, {2,3,5}
+    assert len([name for name in names if name.startswith("Cage_1_combination")]) == 4
+    assert constraints["Cage_1_digit_9"].constant == 0 and len(constraints["Cage_1_digit_9"]) == 3
+    with pytest.raises(ValueError):
+        pulp_solver.ModelTemplate("exact")
+
+
+def test_presolve():
+    killer_solver = pulp_solver.KillerSudokuSolver(cage_constraints=CAGE_CONSTRAINTS, formulation="tight", presolve=True)
+    template = pulp_solver.get_template("tight")
+
+    solution = killer_solver.solve()
+
+    assert killer_solver.free_choices < 729
+    assert killer_solver.timings["presolve"] > 0 and killer_solver.timings["milp"] > 0
+    assert template.problem.numConstraints() == 81 + 9 * 27
+    for target, cells in CAGE_CONSTRAINTS:
+        assert sum(solution[i][j] for i, j in cells) == target